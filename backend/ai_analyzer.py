@@ -5,9 +5,105 @@ Uses Azure OpenAI to perform root cause analysis
 
 import os
 import json
+import time
+import uuid
+import queue
 import logging
-from openai import AzureOpenAI
-from typing import Dict, List
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+from openai import AzureOpenAI, RateLimitError
+from typing import Callable, Dict, Iterator, List
+
+from http_probe import http_phase_timings, slowest_phase
+from analysis_cache import fingerprint, get_analysis_cache, get_analysis_updates
+from prompt_encoder import (
+    AI_PROMPT_TOKEN_BUDGET, compact_test, encode_diagnostics, estimate_tokens, fit_to_budget
+)
+from llm_usage import call_usage, get_usage_tracker, merge_usage
+from rate_limiter import RateLimitExceeded, get_rate_limiter
+from circuit_breaker import CircuitOpenError, get_ai_breaker
+from rule_engine import get_rule_engine
+from incident_index import INCIDENT_PROMPT_MIN_SIMILARITY, get_incident_index
+
+# Upper bound on how long a request waits for the LLM; 0 waits indefinitely
+AI_ANALYSIS_DEADLINE_SECONDS = float(os.getenv("AI_ANALYSIS_DEADLINE_SECONDS", "8"))
+AI_ANALYSIS_WORKERS = int(os.getenv("AI_ANALYSIS_WORKERS", "8"))
+# LLM jobs admitted at once (running + queued); beyond this callers get the rule-based answer
+AI_ANALYSIS_MAX_INFLIGHT = int(os.getenv("AI_ANALYSIS_MAX_INFLIGHT", str(AI_ANALYSIS_WORKERS)))
+AI_COMPLETION_MAX_TOKENS = int(os.getenv("AI_COMPLETION_MAX_TOKENS", "2000"))
+# SDK timeout per request (per read when streaming), so a hung call fails and trips the breaker
+AI_REQUEST_TIMEOUT_SECONDS = float(os.getenv("AI_REQUEST_TIMEOUT_SECONDS", "30"))
+
+# Prompt tokens of target data per batch LLM call, and completion cap per call
+AI_BATCH_TOKEN_BUDGET = int(os.getenv("AI_BATCH_TOKEN_BUDGET", "6000"))
+AI_BATCH_MAX_COMPLETION_TOKENS = int(os.getenv("AI_BATCH_MAX_COMPLETION_TOKENS", "8000"))
+
+_executor = None
+_executor_lock = threading.Lock()
+_inflight = 0
+
+
+class AIBusyError(Exception):
+    """Raised when the AI worker pool already holds AI_ANALYSIS_MAX_INFLIGHT jobs"""
+    pass
+
+
+def _get_ai_executor() -> ThreadPoolExecutor:
+    """Shared worker pool for LLM calls, so late answers outlive the request"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=AI_ANALYSIS_WORKERS, thread_name_prefix="ai-analysis")
+        return _executor
+
+
+def _release_ai_slot(future):
+    global _inflight
+    with _executor_lock:
+        _inflight -= 1
+
+
+def _submit_ai(fn, *args) -> Future:
+    """
+    Submit an LLM job, or return an already-failed future (AIBusyError) when the
+    pool is saturated, so a burst cannot queue unbounded work behind slow calls
+    """
+    global _inflight
+    with _executor_lock:
+        admitted = _inflight < AI_ANALYSIS_MAX_INFLIGHT
+        if admitted:
+            _inflight += 1
+    if not admitted:
+        future = Future()
+        future.set_exception(AIBusyError(f"AI worker pool busy ({AI_ANALYSIS_MAX_INFLIGHT} jobs in flight)"))
+        return future
+    
+    future = _get_ai_executor().submit(fn, *args)
+    # Runs on completion and on cancel alike
+    future.add_done_callback(_release_ai_slot)
+    return future
+
+
+def _deliver_late_analysis(future, analysis_id: str, on_update: Callable[[str, Dict], None] = None):
+    """Store (and optionally push) the AI answer that arrived after the deadline"""
+    updates = get_analysis_updates()
+    try:
+        analysis = future.result()
+    except Exception as e:
+        logging.error(f"Late AI analysis {analysis_id} failed: {str(e)}")
+        updates.fail(analysis_id, str(e))
+        return
+    
+    analysis.update(cached=False, analysis_source="ai", ai_pending=False, analysis_id=analysis_id)
+    updates.complete(analysis_id, analysis)
+    logging.info(f"Late AI analysis {analysis_id} stored")
+    
+    if on_update is not None:
+        try:
+            on_update(analysis_id, analysis)
+        except Exception as e:
+            logging.error(f"Analysis update callback failed for {analysis_id}: {str(e)}")
+
 
 class AIAnalyzer:
     def __init__(self):
@@ -21,29 +117,263 @@ class AIAnalyzer:
         self.client = AzureOpenAI(
             azure_endpoint=self.endpoint,
             api_key=self.api_key,
-            api_version="2024-02-15-preview"
+            api_version="2024-02-15-preview",
+            timeout=AI_REQUEST_TIMEOUT_SECONDS,
+            max_retries=0  # Retries and backoff are owned by the shared rate limiter
         )
     
     def analyze_diagnostics(self, target: str, diagnostics: List[Dict], 
-                           incident_context: Dict = None, recent_changes: Dict = None) -> Dict:
+                           incident_context: Dict = None, recent_changes: Dict = None,
+                           deadline: float = None, on_update: Callable[[str, Dict], None] = None) -> Dict:
         """
         Analyze diagnostic results using Azure OpenAI
         ENTERPRISE ENHANCED: Includes incident context and change awareness
+        HEDGED: the rule-based answer is ready immediately and the LLM call races a deadline;
+        a late AI answer is stored under analysis_id (and passed to on_update if given)
         Returns structured AI analysis with root cause and recommendations
         """
         logging.info(f"Starting AI analysis for {target}")
+        deadline = AI_ANALYSIS_DEADLINE_SECONDS if deadline is None else deadline
+        
+        # Incidents that look alike (same status vector, latency buckets, failure
+        # classes and change flags) reuse the previous answer instead of a new LLM call
+        cache = get_analysis_cache()
+        cache_key = fingerprint(target, diagnostics, incident_context, recent_changes, self.deployment)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            logging.info(f"AI analysis served from cache for {target}")
+            cached.update(cached=True, analysis_source="cache", ai_pending=False, analysis_id=None, llm_usage=None)
+            return cached
+        
+        # A verified past RCA for a near-identical diagnosis is reused; otherwise
+        # the closest ones ground the prompt
+        neighbours, reused = self._similar_incidents(diagnostics, recent_changes)
+        if reused is not None:
+            logging.info(f"AI analysis reused from incident {reused['similar_incident']['incident_id']} for {target}")
+            return reused
+        
+        # Best available answer if the AI misses the deadline
+        fallback = self._fallback_analysis(diagnostics, incident_context, recent_changes)
+        fallback.update(cached=False, analysis_source="rule_based", ai_pending=False, analysis_id=None, llm_usage=None)
+        
+        # Azure OpenAI is failing or slow: answer from the rules without waiting on it
+        if get_ai_breaker().is_open():
+            logging.warning(f"AI circuit open, returning rule-based analysis for {target}")
+            return fallback
+        
+        future = _submit_ai(
+            self._ai_analysis, cache_key, target, diagnostics, incident_context, recent_changes, neighbours
+        )
+        
+        try:
+            analysis = future.result(timeout=deadline if deadline and deadline > 0 else None)
+            analysis.update(cached=False, analysis_source="ai", ai_pending=False, analysis_id=None)
+            return analysis
+        
+        except FuturesTimeoutError:
+            return self._deadline_fallback(future, fallback, deadline, target, on_update)
         
+        except (CircuitOpenError, AIBusyError) as e:
+            logging.warning(f"{str(e)}, returning rule-based analysis for {target}")
+            return fallback
+        
+        except Exception as e:
+            logging.error(f"AI analysis failed: {str(e)}", exc_info=True)
+            
+            # Fallback to rule-based analysis (never cached, so the next call retries the AI)
+            logging.warning("Using fallback rule-based analysis")
+            return fallback
+    
+    def _ai_analysis(self, cache_key: str, target: str, diagnostics: List[Dict],
+                     incident_context: Dict = None, recent_changes: Dict = None,
+                     neighbours: List[Dict] = None) -> Dict:
+        """Call Azure OpenAI, then cache and index the parsed answer; raises on any failure"""
         # Build prompt with enterprise context
-        prompt = self._build_analysis_prompt(target, diagnostics, incident_context, recent_changes)
+        prompt = self._build_analysis_prompt(target, diagnostics, incident_context, recent_changes,
+                                             neighbours=neighbours)
+        
+        # Call Azure OpenAI
+        ai_response, usage = self._complete("single", prompt, AI_COMPLETION_MAX_TOKENS)
+        
+        logging.info(f"AI analysis completed successfully ({usage['total_tokens']} tokens, {usage['latency_ms']}ms)")
+        
+        analysis = self._analysis_from_response(ai_response)
+        get_analysis_cache().put(cache_key, analysis)
+        incident_id = get_incident_index().add(target, diagnostics, analysis, recent_changes)
+        analysis.update(llm_usage=usage, incident_id=incident_id)
+        return analysis
+    
+    def stream_analysis(self, target: str, diagnostics: List[Dict],
+                        incident_context: Dict = None, recent_changes: Dict = None,
+                        deadline: float = None) -> Iterator[Dict]:
+        """
+        Streaming variant of analyze_diagnostics
+        Yields {"type": "token", "delta": str} as the model writes, then {"type": "analysis", "analysis": {...}}
+        Cache hits and failures yield only the final analysis
+        Same deadline as analyze_diagnostics: when the stream has not finished in time the
+        rule-based analysis is yielded and the late AI answer is stored under analysis_id
+        """
+        logging.info(f"Starting streamed AI analysis for {target}")
+        deadline = AI_ANALYSIS_DEADLINE_SECONDS if deadline is None else deadline
+        
+        cache = get_analysis_cache()
+        cache_key = fingerprint(target, diagnostics, incident_context, recent_changes, self.deployment)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            cached.update(cached=True, analysis_source="cache", ai_pending=False, analysis_id=None, llm_usage=None)
+            yield {"type": "analysis", "analysis": cached}
+            return
+        
+        neighbours, reused = self._similar_incidents(diagnostics, recent_changes)
+        if reused is not None:
+            yield {"type": "analysis", "analysis": reused}
+            return
+        
+        fallback = self._fallback_analysis(diagnostics, incident_context, recent_changes)
+        fallback.update(cached=False, analysis_source="rule_based", ai_pending=False, analysis_id=None, llm_usage=None)
+        
+        if get_ai_breaker().is_open():
+            logging.warning(f"AI circuit open, returning rule-based analysis for {target}")
+            yield {"type": "analysis", "analysis": fallback}
+            return
+        
+        prompt = self._build_analysis_prompt(target, diagnostics, incident_context, recent_changes,
+                                             neighbours=neighbours)
+        
+        # The model is read on a worker thread so the deadline holds even when it stalls mid-stream
+        deltas = queue.Queue()
+        future = _submit_ai(self._stream_ai_analysis, cache_key, target, diagnostics, recent_changes,
+                            prompt, deltas.put)
+        future.add_done_callback(lambda f: deltas.put(None))
+        expires_at = time.monotonic() + deadline if deadline and deadline > 0 else None
+        
+        while True:
+            try:
+                delta = deltas.get(timeout=None if expires_at is None else max(0.0, expires_at - time.monotonic()))
+            except queue.Empty:
+                yield {"type": "analysis", "analysis": self._deadline_fallback(future, fallback, deadline, target)}
+                return
+            if delta is None:
+                break
+            yield {"type": "token", "delta": delta}
         
         try:
-            # Call Azure OpenAI
-            response = self.client.chat.completions.create(
+            analysis = future.result()
+        except (CircuitOpenError, AIBusyError) as e:
+            logging.warning(f"{str(e)}, returning rule-based analysis for {target}")
+            yield {"type": "analysis", "analysis": fallback}
+            return
+        except Exception as e:
+            logging.error(f"Streamed AI analysis failed: {str(e)}", exc_info=True)
+            logging.warning("Using fallback rule-based analysis")
+            yield {"type": "analysis", "analysis": fallback}
+            return
+        
+        analysis.update(cached=False, analysis_source="ai", ai_pending=False, analysis_id=None)
+        yield {"type": "analysis", "analysis": analysis}
+    
+    def _stream_ai_analysis(self, cache_key: str, target: str, diagnostics: List[Dict],
+                            recent_changes: Dict, prompt: str, on_delta: Callable[[str], None]) -> Dict:
+        """Streamed Azure OpenAI call; passes each delta to on_delta, then caches and indexes the answer"""
+        system_prompt = self._get_enterprise_system_prompt()
+        tracker = get_usage_tracker()
+        limiter = get_rate_limiter()
+        breaker = get_ai_breaker()
+        reserved = estimate_tokens(system_prompt) + estimate_tokens(prompt) + AI_COMPLETION_MAX_TOKENS
+        start = time.perf_counter()
+        content = []
+        stream = None
+        settled = False
+        
+        try:
+            # The breaker times the call up to the response headers, not the whole stream
+            stream = limiter.call(lambda: breaker.call(lambda: self.client.chat.completions.create(
                 model=self.deployment,
                 messages=[
                     {
                         "role": "system",
-                        "content": self._get_enterprise_system_prompt()
+                        "content": system_prompt
+                    },
+                    {
+                        "role": "user",
+                        "content": prompt
+                    }
+                ],
+                temperature=0.3,
+                max_tokens=AI_COMPLETION_MAX_TOKENS,
+                response_format={"type": "json_object"},
+                stream=True
+            ), ignore=(RateLimitError,)), reserved)
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    content.append(delta)
+                    on_delta(delta)
+            
+            text = "".join(content)
+            # Streamed responses carry no usage block, so both sides are estimated
+            usage = call_usage(None, (time.perf_counter() - start) * 1000,
+                               estimate_tokens(system_prompt) + estimate_tokens(prompt), estimate_tokens(text))
+            limiter.settle(reserved, usage["total_tokens"])
+            settled = True
+            analysis = self._analysis_from_response(json.loads(text))
+        except Exception:
+            if stream is not None and not settled:
+                # Broke off mid-stream: keep only what was sent and received so far
+                limiter.settle(reserved, estimate_tokens(system_prompt) + estimate_tokens(prompt)
+                               + estimate_tokens("".join(content)))
+            tracker.record("stream", error=True)
+            raise
+        
+        tracker.record("stream", usage)
+        get_analysis_cache().put(cache_key, analysis)
+        incident_id = get_incident_index().add(target, diagnostics, analysis, recent_changes)
+        analysis.update(llm_usage=usage, incident_id=incident_id)
+        return analysis
+    
+    def _deadline_fallback(self, future, fallback: Dict, deadline: float, target: str,
+                           on_update: Callable[[str, Dict], None] = None) -> Dict:
+        """
+        Rule-based answer for an AI job that missed the deadline
+        A job still queued is cancelled; a running one delivers its answer under analysis_id
+        """
+        if future.cancel():
+            # Still queued behind other calls: drop it rather than run it for nobody
+            logging.warning(f"AI analysis missed the {deadline}s deadline for {target} before starting, "
+                            f"returning rule-based analysis")
+            return fallback
+        
+        analysis_id = uuid.uuid4().hex
+        logging.warning(f"AI analysis missed the {deadline}s deadline for {target}, "
+                        f"returning rule-based analysis (analysis_id={analysis_id})")
+        get_analysis_updates().pending(analysis_id)
+        future.add_done_callback(lambda f: _deliver_late_analysis(f, analysis_id, on_update))
+        fallback.update(ai_pending=True, analysis_id=analysis_id)
+        return fallback
+    
+    def _complete(self, operation: str, prompt: str, max_tokens: int):
+        """
+        One chat completion with usage accounting
+        Returns (parsed JSON answer, usage); failures are counted and re-raised
+        """
+        system_prompt = self._get_enterprise_system_prompt()
+        tracker = get_usage_tracker()
+        limiter = get_rate_limiter()
+        breaker = get_ai_breaker()
+        # Reserve prompt + worst-case completion against the TPM budget; refund after
+        reserved = estimate_tokens(system_prompt) + estimate_tokens(prompt) + max_tokens
+        start = time.perf_counter()
+        try:
+            # Each attempt goes through the breaker; throttling (429) is the limiter's
+            # concern and does not count as a dependency failure
+            response = limiter.call(lambda: breaker.call(lambda: self.client.chat.completions.create(
+                model=self.deployment,
+                messages=[
+                    {
+                        "role": "system",
+                        "content": system_prompt
                     },
                     {
                         "role": "user",
@@ -51,36 +381,250 @@ class AIAnalyzer:
                     }
                 ],
                 temperature=0.3,  # Low temperature for deterministic output
-                max_tokens=2000,  # Increased for enterprise context
+                max_tokens=max_tokens,
                 response_format={"type": "json_object"}
-            )
+            ), ignore=(RateLimitError,)), reserved)
+            usage = call_usage(response, (time.perf_counter() - start) * 1000,
+                               estimate_tokens(system_prompt) + estimate_tokens(prompt))
+            limiter.settle(reserved, usage["total_tokens"])
+            answer = json.loads(response.choices[0].message.content)
+        except (RateLimitExceeded, CircuitOpenError) as e:
+            tracker.record(operation, error=True)
+            logging.warning(f"AI call not admitted: {str(e)}")
+            raise
+        except Exception:
+            tracker.record(operation, error=True)
+            raise
+        
+        tracker.record(operation, usage)
+        return answer, usage
+    
+    def _similar_incidents(self, diagnostics: List[Dict], recent_changes: Dict = None):
+        """
+        Nearest past incidents for the prompt, and a ready analysis when the closest
+        verified one is similar enough to reuse (else None)
+        """
+        index = get_incident_index()
+        try:
+            neighbours = index.search(diagnostics, recent_changes, min_similarity=INCIDENT_PROMPT_MIN_SIMILARITY)
+        except Exception as e:
+            logging.warning(f"Incident index search failed: {str(e)}")
+            return [], None
+        
+        match = index.reusable(neighbours, diagnostics)
+        if match is None:
+            return neighbours, None
+        
+        analysis = match["analysis"]
+        analysis.update(cached=False, analysis_source="incident_index", ai_pending=False, analysis_id=None,
+                        llm_usage=None, similar_incident={
+                            "incident_id": match["incident_id"],
+                            "target": match["target"],
+                            "similarity": match["similarity"]
+                        })
+        return neighbours, analysis
+    
+    def _analysis_from_response(self, ai_response: Dict) -> Dict:
+        """Normalize one parsed AI answer into the analysis schema"""
+        return {
+            "root_cause": ai_response.get("root_cause", "Unknown"),
+            "confidence_percentage": ai_response.get("confidence_percentage", 0),
+            "reasoning": ai_response.get("reasoning", ""),
+            "evidence": ai_response.get("evidence", []),
+            "remediation_steps": ai_response.get("remediation_steps", []),
+            "severity": ai_response.get("severity", "MEDIUM"),
+            "category": ai_response.get("category", "UNKNOWN"),
+            # ENTERPRISE FEATURE 4: Responsibility Classification
+            "root_cause_category": ai_response.get("root_cause_category", "Network Issue"),
+            "responsibility_reason": ai_response.get("responsibility_reason", ""),
+            "responsible_team": ai_response.get("responsible_team", "Network Operations"),
+            # Change correlation
+            "change_correlation": ai_response.get("change_correlation", None)
+        }
+    
+    def analyze_batch(self, targets: List[Dict], token_budget: int = AI_BATCH_TOKEN_BUDGET,
+                      incident_context: Dict = None, recent_changes: Dict = None,
+                      deadline: float = None) -> Dict:
+        """
+        Analyze many targets that failed together
+        targets: [{"target": "a.com", "diagnostics": [...]}, ...]
+        Packs targets into token-budgeted chunks that share one system prompt,
+        runs the chunks concurrently, and returns one analysis per target plus a common_cause
+        All chunks share one deadline (AI_ANALYSIS_DEADLINE_SECONDS by default); targets in a
+        chunk that misses it get the rule-based analysis, and a late answer is still cached
+        """
+        logging.info(f"Starting batch AI analysis for {len(targets)} targets")
+        deadline = AI_ANALYSIS_DEADLINE_SECONDS if deadline is None else deadline
+        expires_at = time.monotonic() + deadline if deadline and deadline > 0 else None
+        cache = get_analysis_cache()
+        
+        results = [None] * len(targets)
+        keys = []
+        pending = []
+        for index, entry in enumerate(targets):
+            key = fingerprint(entry["target"], entry["diagnostics"], incident_context, recent_changes, self.deployment)
+            keys.append(key)
+            cached = cache.get(key)
+            if cached is not None:
+                cached.update(cached=True, analysis_source="cache", llm_usage=None)
+                results[index] = cached
+                continue
             
-            # Parse AI response
-            ai_response = json.loads(response.choices[0].message.content)
+            _, reused = self._similar_incidents(entry["diagnostics"], recent_changes)
+            if reused is not None:
+                for flag in ("ai_pending", "analysis_id"):
+                    reused.pop(flag, None)
+                results[index] = reused
+            else:
+                pending.append(index)
+        
+        # Greedy packing: each chunk holds as many compact target summaries as fit the budget
+        chunks, chunk, used = [], [], 0
+        for index in pending:
+            summary = self._compact_target(targets[index])
+            cost = estimate_tokens(json.dumps(summary, separators=(",", ":")))
+            if chunk and used + cost > token_budget:
+                chunks.append(chunk)
+                chunk, used = [], 0
+            chunk.append((index, summary))
+            used += cost
+        if chunk:
+            chunks.append(chunk)
+        
+        if chunks and get_ai_breaker().is_open():
+            logging.warning(f"AI circuit open, skipping {len(chunks)} batch LLM calls")
+            chunks = []
+        
+        # Chunks not admitted to the pool fall back to the rule-based analysis below
+        futures = [_submit_ai(self._analyze_chunk, chunk, incident_context, recent_changes) for chunk in chunks]
+        
+        verdicts = []
+        usages = []
+        for chunk, future in zip(chunks, futures):
+            try:
+                answer, usage = future.result(
+                    timeout=None if expires_at is None else max(0.0, expires_at - time.monotonic())
+                )
+                usages.append(usage)
+            except FuturesTimeoutError:
+                if not future.cancel():
+                    # Already running: keep its answer for the next request that looks alike
+                    future.add_done_callback(
+                        lambda f, chunk=chunk: self._store_late_chunk(f, chunk, targets, keys, recent_changes)
+                    )
+                logging.warning(f"Batch AI analysis chunk of {len(chunk)} targets missed the {deadline}s deadline, "
+                                f"using rule-based analysis")
+                continue
+            except Exception as e:
+                logging.error(f"Batch AI analysis chunk failed: {str(e)}", exc_info=True)
+                continue
             
-            logging.info("AI analysis completed successfully")
+            for index, analysis in self._store_chunk(answer, chunk, targets, keys, recent_changes).items():
+                # Tokens are accounted once for the whole batch (llm_usage at the top level)
+                analysis.update(cached=False, analysis_source="ai", llm_usage=None)
+                results[index] = analysis
             
-            return {
-                "root_cause": ai_response.get("root_cause", "Unknown"),
-                "confidence_percentage": ai_response.get("confidence_percentage", 0),
-                "reasoning": ai_response.get("reasoning", ""),
-                "evidence": ai_response.get("evidence", []),
-                "remediation_steps": ai_response.get("remediation_steps", []),
-                "severity": ai_response.get("severity", "MEDIUM"),
-                "category": ai_response.get("category", "UNKNOWN"),
-                # ENTERPRISE FEATURE 4: Responsibility Classification
-                "root_cause_category": ai_response.get("root_cause_category", "Network Issue"),
-                "responsibility_reason": ai_response.get("responsibility_reason", ""),
-                "responsible_team": ai_response.get("responsible_team", "Network Operations"),
-                # Change correlation
-                "change_correlation": ai_response.get("change_correlation", None)
-            }
+            if isinstance(answer.get("common_cause"), dict):
+                verdicts.append(answer["common_cause"])
         
+        # Targets the AI skipped or whose chunk failed get the rule-based analysis
+        for index, entry in enumerate(targets):
+            if results[index] is None:
+                analysis = self._fallback_analysis(entry["diagnostics"], incident_context, recent_changes)
+                analysis.update(cached=False, analysis_source="rule_based", llm_usage=None)
+                results[index] = analysis
+        
+        if verdicts:
+            # Chunks see disjoint targets; keep the verdict that explains the most of them
+            common_cause = max(verdicts, key=lambda v: len(v.get("affected_targets") or []))
+            common_cause = dict(common_cause, analysis_source="ai")
+        else:
+            common_cause = self._fallback_common_cause(targets, results)
+        
+        logging.info(f"Batch AI analysis completed: {len(targets)} targets, {len(chunks)} LLM calls")
+        
+        return {
+            "results": [{"target": entry["target"], "ai_analysis": analysis} for entry, analysis in zip(targets, results)],
+            "common_cause": common_cause,
+            "llm_calls": len(chunks),
+            "llm_usage": merge_usage(usages)
+        }
+    
+    def _compact_target(self, entry: Dict) -> Dict:
+        """Minimal per-target summary for batch prompts (no per-test details)"""
+        return {"target": entry["target"], "tests": [compact_test(test, detail_level=0) for test in entry["diagnostics"]]}
+    
+    def _store_chunk(self, answer: Dict, chunk: List, targets: List[Dict], keys: List[str],
+                     recent_changes: Dict = None) -> Dict[int, Dict]:
+        """Cache and index each target's analysis from one chunk answer; returns them by target index"""
+        by_target = {item.get("target"): item for item in answer.get("results", []) if isinstance(item, dict)}
+        analyses = {}
+        for index, summary in chunk:
+            item = by_target.get(summary["target"])
+            if item is None:
+                continue
+            analysis = self._analysis_from_response(item)
+            get_analysis_cache().put(keys[index], analysis)
+            analysis["incident_id"] = get_incident_index().add(summary["target"], targets[index]["diagnostics"],
+                                                                 analysis, recent_changes)
+            analyses[index] = analysis
+        return analyses
+    
+    def _store_late_chunk(self, future: Future, chunk: List, targets: List[Dict], keys: List[str],
+                          recent_changes: Dict = None):
+        """Done-callback for a chunk that missed the batch deadline"""
+        if future.cancelled() or future.exception() is not None:
+            return
+        try:
+            self._store_chunk(future.result()[0], chunk, targets, keys, recent_changes)
         except Exception as e:
-            logging.error(f"AI analysis failed: {str(e)}", exc_info=True)
-            
-            # Fallback to rule-based analysis
-            return self._fallback_analysis(diagnostics, incident_context, recent_changes)
+            logging.error(f"Could not store late batch AI analysis: {str(e)}")
+    
+    def _analyze_chunk(self, chunk: List, incident_context: Dict = None, recent_changes: Dict = None):
+        """One LLM call covering every target in the chunk; returns (answer, usage)"""
+        prompt = f"""Perform root cause analysis for {len(chunk)} targets that are failing at the same time.
+
+TARGETS:
+{json.dumps([summary for _, summary in chunk], separators=(",", ":"))}
+"""
+        if incident_context:
+            prompt += f"""
+INCIDENT CONTEXT: {json.dumps(incident_context, separators=(",", ":"))}
+"""
+        if recent_changes:
+            changes = [name for name, flag in recent_changes.items() if flag]
+            prompt += f"""
+RECENT CHANGES REPORTED: {', '.join(changes) if changes else 'None'}
+"""
+        prompt += """
+Return JSON: {"results": [one object per target with "target" plus every field required by the system prompt],
+"common_cause": {"verdict": str, "confidence_percentage": int, "affected_targets": [str], "reasoning": str} or null}"""
+        
+        return self._complete("batch", prompt, min(AI_BATCH_MAX_COMPLETION_TOKENS, 400 * len(chunk) + 300))
+    
+    def _fallback_common_cause(self, targets: List[Dict], analyses: List[Dict]) -> Dict:
+        """Rule-based common cause: the root cause shared by most failing targets"""
+        groups = {}
+        for entry, analysis in zip(targets, analyses):
+            if analysis.get("category") == "HEALTHY":
+                continue
+            groups.setdefault(analysis.get("root_cause"), []).append(entry["target"])
+        
+        if not groups:
+            return None
+        
+        root_cause, affected = max(groups.items(), key=lambda item: len(item[1]))
+        if len(affected) < 2:
+            return None
+        
+        failing = sum(len(members) for members in groups.values())
+        return {
+            "verdict": f"Shared {root_cause} across {len(affected)} of {failing} failing targets",
+            "confidence_percentage": round(100 * len(affected) / failing),
+            "affected_targets": affected,
+            "reasoning": "Targets grouped by the first failing diagnostic stage",
+            "analysis_source": "rule_based"
+        }
     
     def _get_system_prompt(self) -> str:
         """System prompt for AI analyzer"""
@@ -173,6 +717,9 @@ CRITICAL RULES:
 - Base confidence on ACTUAL test results, not assumptions
 - Be specific about which tests passed/failed
 - If all tests pass but latency is high, mention performance degradation
+- If a LATENCY DISTRIBUTION is provided, use tail latency (p99), jitter and loss, not just the average
+- If HTTP PHASE TIMINGS are provided, name the phase that dominates latency
+  (DNS lookup, TCP connect, TLS handshake, time to first byte = backend processing, body transfer)
 
 Output valid JSON only.
 - ALWAYS explain WHY a change is relevant (or not)
@@ -188,31 +735,61 @@ The high business criticality (affecting 500+ users) requires immediate escalati
 Output valid JSON only."""
     
     def _build_analysis_prompt(self, target: str, diagnostics: List[Dict],
-                               incident_context: Dict = None, recent_changes: Dict = None) -> str:
-        """Build user prompt with diagnostic data and enterprise context"""
-        
-        # Format diagnostics for AI
-        diagnostic_summary = []
-        for test in diagnostics:
-            diagnostic_summary.append({
-                "test": test["test_name"],
-                "status": test["status"],
-                "latency_ms": test["latency_ms"],
-                "failure_reason": test.get("failure_reason"),
-                "details": test.get("details")
-            })
-        
-        prompt = f"""Perform root cause analysis for network diagnostics.
+                               incident_context: Dict = None, recent_changes: Dict = None,
+                               token_budget: int = AI_PROMPT_TOKEN_BUDGET, neighbours: List[Dict] = None) -> str:
+        """
+        Build user prompt with diagnostic data and enterprise context
+        Diagnostics are minified and trimmed so the whole prompt stays within token_budget
+        neighbours (from the incident index) are added as compact past-incident examples
+        """
+        
+        context = ""
+        
+        # Break HTTP latency down by phase so the RCA can say which one regressed
+        phase_timings = http_phase_timings(diagnostics)
+        if phase_timings:
+            context += f"""
 
-TARGET: {target}
+HTTP PHASE TIMINGS (ms):
+- DNS Lookup: {phase_timings.get('dns_ms')}
+- TCP Connect: {phase_timings.get('connect_ms')}
+- TLS Handshake: {phase_timings.get('tls_ms')}
+- Time To First Byte: {phase_timings.get('ttfb_ms')}
+- Body Transfer: {phase_timings.get('transfer_ms')}
+- Total: {phase_timings.get('total_ms')}
+- Slowest Phase: {slowest_phase(phase_timings) or 'n/a'}
+"""
+        
+        # Latency distribution from the sampling stage
+        latency_test = next((t for t in diagnostics if t["test_name"] == "LATENCY_CHECK" and t.get("details")), None)
+        if latency_test and latency_test["details"].get("p50_ms") is not None:
+            stats = latency_test["details"]
+            context += f"""
 
-DIAGNOSTIC RESULTS:
-{json.dumps(diagnostic_summary, indent=2)}
+LATENCY DISTRIBUTION ({stats.get('samples')} of {stats.get('samples_sent')} samples answered):
+- p50 / p90 / p99: {stats.get('p50_ms')} / {stats.get('p90_ms')} / {stats.get('p99_ms')} ms
+- Std Dev: {stats.get('stddev_ms')} ms
+- Jitter: {stats.get('jitter_ms')} ms
+- Loss: {stats.get('loss_pct')}%
+"""
+        
+        # Past RCAs for diagnoses that looked like this one
+        if neighbours:
+            examples = "\n".join(
+                f"- {n['similarity']:.2f} similar{', verified' if n['verified'] else ''}: {n['summary']} -> "
+                f"{n['analysis'].get('root_cause')} [{n['analysis'].get('category')}, "
+                f"{n['analysis'].get('confidence_percentage')}%]"
+                for n in neighbours
+            )
+            context += f"""
+
+SIMILAR PAST INCIDENTS (reference only; the current results take precedence):
+{examples}
 """
         
         # Add enterprise context if provided
         if incident_context:
-            prompt += f"""
+            context += f"""
 
 INCIDENT CONTEXT:
 - Start Time: {incident_context.get('incident_start_time', 'Not specified')}
@@ -231,7 +808,7 @@ INCIDENT CONTEXT:
                 changes_reported.append("Application deployment")
             
             if changes_reported:
-                prompt += f"""
+                context += f"""
 
 RECENT CHANGES REPORTED:
 {', '.join(changes_reported)}
@@ -239,165 +816,34 @@ RECENT CHANGES REPORTED:
 IMPORTANT: Analyze correlation between these changes and the observed failures.
 """
             else:
-                prompt += """
+                context += """
 
 RECENT CHANGES: None reported
 """
         
-        prompt += """
+        header = f"""Perform root cause analysis for network diagnostics.
+
+TARGET: {target}
+
+DIAGNOSTIC RESULTS:
+"""
+        trailer = """
 
 Analyze these results and provide your assessment in JSON format."""
         
-        return prompt
+        # Context sections are small; the diagnostics get whatever budget is left
+        fixed_tokens = estimate_tokens(header) + estimate_tokens(trailer)
+        context = fit_to_budget(context, max(0, token_budget // 2))
+        diagnostics_budget = max(0, token_budget - fixed_tokens - estimate_tokens(context))
+        # Already within budget and valid JSON at every budget
+        encoded = encode_diagnostics(diagnostics, diagnostics_budget)
+        
+        return header + encoded + "\n" + context + trailer
     
     def _fallback_analysis(self, diagnostics: List[Dict], 
                            incident_context: Dict = None, recent_changes: Dict = None) -> Dict:
         """
         Rule-based fallback analysis if AI fails
-        ENTERPRISE ENHANCED: Includes responsibility categorization
-        Provides basic but accurate analysis
+        Evaluated by the compiled decision table in rule_engine (same schema as the AI answer)
         """
-        logging.warning("Using fallback rule-based analysis")
-        
-        # Find first failure
-        first_failure = None
-        for test in diagnostics:
-            if test["status"] in ["FAIL", "INFERRED_FAIL"]:
-                first_failure = test
-                break
-        
-        if not first_failure:
-            # All tests passed - calculate confidence based on latency
-            avg_latency = sum(d.get('latency_ms', 0) for d in diagnostics) / len(diagnostics) if diagnostics else 0
-            
-            # Dynamic confidence based on latency
-            if avg_latency < 100:
-                confidence = 95  # Excellent performance
-            elif avg_latency < 200:
-                confidence = 90  # Good performance
-            elif avg_latency < 500:
-                confidence = 75  # Degraded performance
-            else:
-                confidence = 65  # Poor performance
-            
-            return {
-                "root_cause": "No issues detected; all tests passed successfully",
-                "confidence_percentage": confidence,
-                "reasoning": f"All diagnostic tests (DNS, TCP, HTTP, latency) passed successfully. Average latency: {avg_latency:.0f}ms. The target is reachable and responding normally.",
-                "evidence": [
-                    "DNS resolution successful",
-                    "TCP connectivity established",
-                    "HTTP response received",
-                    f"Average latency: {avg_latency:.0f}ms"
-                ],
-                "remediation_steps": ["No action required - system is healthy"],
-                "severity": "INFO",
-                "category": "HEALTHY",
-                "root_cause_category": "Network Issue",
-                "responsibility_reason": "All network layers functioning normally - no issues detected",
-                "responsible_team": "Network Operations",
-                "change_correlation": None
-            }
-        
-        # Analyze based on first failure
-        test_name = first_failure["test_name"]
-        
-        # Check for change correlation
-        change_correlation = None
-        if recent_changes:
-            if recent_changes.get('recent_dns_change') and test_name == "DNS_RESOLUTION":
-                change_correlation = "High correlation: Recent DNS change likely caused resolution failure"
-            elif recent_changes.get('recent_firewall_change') and test_name == "TCP_CONNECTIVITY":
-                change_correlation = "High correlation: Recent firewall change likely blocked the port"
-            elif recent_changes.get('recent_deployment') and test_name == "HTTP_STATUS":
-                change_correlation = "High correlation: Recent deployment may have broken the service"
-        
-        if test_name == "DNS_RESOLUTION":
-            return {
-                "root_cause": "DNS resolution failure",
-                "confidence_percentage": 90,
-                "reasoning": "The domain name could not be resolved to an IP address. This is the root cause preventing all downstream connectivity.",
-                "evidence": [
-                    f"DNS lookup failed: {first_failure.get('failure_reason', 'Unknown error')}",
-                    "All downstream tests inferred as failed due to DNS failure"
-                ],
-                "remediation_steps": [
-                    "Verify the domain name is correct and exists",
-                    "Check DNS server configuration",
-                    "Try alternative DNS servers (e.g., 8.8.8.8, 1.1.1.1)",
-                    "Verify domain registration and nameserver configuration"
-                ],
-                "severity": "HIGH",
-                "category": "DNS",
-                "root_cause_category": "Network Issue",
-                "responsibility_reason": "DNS resolution is a network-layer service managed by network operations",
-                "responsible_team": "Network Operations",
-                "change_correlation": change_correlation
-            }
-        
-        elif test_name == "TCP_CONNECTIVITY":
-            return {
-                "root_cause": "TCP port connectivity failure",
-                "confidence_percentage": 85,
-                "reasoning": "DNS resolution succeeded but TCP connection to the target port failed. This suggests a firewall, network ACL, or service availability issue.",
-                "evidence": [
-                    "DNS resolution successful",
-                    f"TCP connection failed: {first_failure.get('failure_reason', 'Port unreachable')}"
-                ],
-                "remediation_steps": [
-                    "Verify the service is running on the target host",
-                    "Check firewall rules (host-based and network-based)",
-                    "Verify network ACLs and security groups",
-                    "Confirm the correct port number",
-                    "Check if the service is bound to the correct interface"
-                ],
-                "severity": "HIGH",
-                "category": "FIREWALL",
-                "root_cause_category": "Network Issue",
-                "responsibility_reason": "Port blocking indicates firewall or network ACL configuration issue",
-                "responsible_team": "Network Operations",
-                "change_correlation": change_correlation
-            }
-        
-        elif test_name == "HTTP_STATUS":
-            return {
-                "root_cause": "HTTP/Application layer failure",
-                "confidence_percentage": 80,
-                "reasoning": "Network connectivity is established but the HTTP request failed. This indicates an application-level issue.",
-                "evidence": [
-                    "DNS and TCP connectivity successful",
-                    f"HTTP request failed: {first_failure.get('failure_reason', 'Unknown error')}"
-                ],
-                "remediation_steps": [
-                    "Check web server logs for errors",
-                    "Verify SSL/TLS certificate validity",
-                    "Check application configuration",
-                    "Verify web server is running and not overloaded",
-                    "Review recent application deployments or changes"
-                ],
-                "severity": "MEDIUM",
-                "category": "APPLICATION",
-                "root_cause_category": "Application Issue",
-                "responsibility_reason": "HTTP layer failure with successful network connectivity indicates application-level problem",
-                "responsible_team": "Application Team",
-                "change_correlation": change_correlation
-            }
-        
-        else:
-            return {
-                "root_cause": "Unknown failure",
-                "confidence_percentage": 50,
-                "reasoning": "A failure was detected but the specific cause could not be determined.",
-                "evidence": [f"Test {test_name} failed"],
-                "remediation_steps": [
-                    "Review detailed diagnostic logs",
-                    "Perform manual troubleshooting",
-                    "Contact network administrator"
-                ],
-                "severity": "MEDIUM",
-                "category": "UNKNOWN",
-                "root_cause_category": "Network Issue",
-                "responsibility_reason": "Unable to determine specific category - defaulting to network operations",
-                "responsible_team": "Network Operations",
-                "change_correlation": change_correlation
-            }
+        return get_rule_engine().evaluate(diagnostics, incident_context, recent_changes)
@@ -0,0 +1,325 @@
+"""
+Analysis Cache Module
+Memoizes AI root cause analyses by a normalized incident fingerprint
+LRU + TTL eviction with optional on-disk persistence
+Also holds late AI answers for deadline-bounded requests
+"""
+
+import os
+import re
+import json
+import copy
+import atexit
+import hashlib
+import threading
+import time
+import logging
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+ANALYSIS_CACHE_MAX_ENTRIES = int(os.getenv("ANALYSIS_CACHE_MAX_ENTRIES", "1024"))
+ANALYSIS_CACHE_TTL_SECONDS = float(os.getenv("ANALYSIS_CACHE_TTL_SECONDS", "900"))
+# Optional JSON file that survives restarts; empty disables persistence
+ANALYSIS_CACHE_PATH = os.getenv("ANALYSIS_CACHE_PATH", "")
+# Changes are written to the file at most this often, off the request thread; 0 writes on every change
+ANALYSIS_CACHE_FLUSH_SECONDS = float(os.getenv("ANALYSIS_CACHE_FLUSH_SECONDS", "2"))
+
+ANALYSIS_UPDATE_MAX_ENTRIES = int(os.getenv("ANALYSIS_UPDATE_MAX_ENTRIES", "1024"))
+ANALYSIS_UPDATE_TTL_SECONDS = float(os.getenv("ANALYSIS_UPDATE_TTL_SECONDS", "3600"))
+
+# Same bands the AI prompt uses: excellent / good / degraded / poor
+LATENCY_BUCKETS = ((50, "excellent"), (200, "good"), (500, "degraded"))
+
+CHANGE_FLAGS = ("recent_firewall_change", "recent_dns_change", "recent_deployment")
+
+# Ordered: first match wins
+FAILURE_CLASSES = (
+    (re.compile(r"^Inferred failure", re.I), "inferred"),
+    (re.compile(r"NXDOMAIN|No A/AAAA records|Name or service not known|nodename nor servname", re.I), "dns_nxdomain"),
+    (re.compile(r"DNS resolution failed", re.I), "dns_error"),
+    (re.compile(r"SSL|TLS|certificate", re.I), "tls"),
+    (re.compile(r"timeout|timed out", re.I), "timeout"),
+    (re.compile(r"closed or unreachable|refused", re.I), "port_closed"),
+    (re.compile(r"unreachable|no route", re.I), "unreachable"),
+    (re.compile(r"reset|broken pipe|closed connection", re.I), "connection_reset"),
+)
+HTTP_STATUS_REASON = re.compile(r"^HTTP (\d)\d\d$")
+
+
+def latency_bucket(latency_ms) -> Optional[str]:
+    if latency_ms is None:
+        return None
+    for limit, name in LATENCY_BUCKETS:
+        if latency_ms < limit:
+            return name
+    return "poor"
+
+
+def failure_class(reason: str) -> Optional[str]:
+    """Collapse a free-text failure reason into a small set of classes"""
+    if not reason:
+        return None
+    match = HTTP_STATUS_REASON.match(reason.strip())
+    if match:
+        return f"http_{match.group(1)}xx"
+    for pattern, name in FAILURE_CLASSES:
+        if pattern.search(reason):
+            return name
+    return "other"
+
+
+def fingerprint(target: str, diagnostics: List[Dict], incident_context: Dict = None,
+                recent_changes: Dict = None, model: str = None) -> str:
+    """
+    Stable key for 'incidents that look alike'
+    Built from the status vector, latency buckets, failure-reason classes and change flags
+    """
+    incident_context = incident_context or {}
+    recent_changes = recent_changes or {}
+
+    material = {
+        "target": (target or "").strip().lower(),
+        "model": model,
+        "tests": [
+            [
+                test.get("test_name"),
+                test.get("status"),
+                latency_bucket(test.get("latency_ms")) if test.get("status") == "PASS" else None,
+                failure_class(test.get("failure_reason"))
+            ]
+            for test in diagnostics
+        ],
+        "changes": [bool(recent_changes.get(flag)) for flag in CHANGE_FLAGS],
+        # Criticality shifts severity and escalation, so it is part of the key
+        "criticality": str(incident_context.get("business_criticality", "Medium")).lower()
+    }
+    encoded = json.dumps(material, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class DebouncedWriter:
+    """
+    Persists a JSON snapshot at most once per delay seconds from a timer thread
+    mark_dirty() is all a change costs; snapshot() runs under the owner's lock and should only
+    copy, while encode() (snapshot to JSON-ready data), serialising and the disk write run
+    outside it, so they never hold up readers. Pending changes are written at interpreter exit
+    """
+
+    def __init__(self, path: str, lock: threading.Lock, snapshot: Callable[[], object],
+                 delay: float, description: str, encode: Callable[[object], object] = None):
+        self.path = path
+        self.delay = delay
+        self.description = description
+        self._owner_lock = lock
+        self._snapshot = snapshot
+        self._encode = encode
+        self._state_lock = threading.Lock()
+        # Writes never overlap, so an older snapshot cannot replace a newer one
+        self._write_lock = threading.Lock()
+        self._timer = None
+        self._dirty = False
+        self.writes = 0
+        atexit.register(self.flush)
+
+    def mark_dirty(self):
+        with self._state_lock:
+            self._dirty = True
+            if self.delay > 0:
+                if self._timer is None:
+                    self._timer = threading.Timer(self.delay, self.flush)
+                    self._timer.daemon = True
+                    self._timer.start()
+                return
+        self.flush()
+
+    def flush(self):
+        """Write now if anything changed since the last write"""
+        with self._write_lock:
+            with self._state_lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                if not self._dirty:
+                    return
+                self._dirty = False
+            with self._owner_lock:
+                data = self._snapshot()
+
+            tmp_path = f"{self.path}.tmp"
+            try:
+                if self._encode:
+                    data = self._encode(data)
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(data, f)
+                os.replace(tmp_path, self.path)
+                self.writes += 1
+            except (OSError, TypeError, ValueError) as e:
+                logging.warning(f"Could not persist {self.description} to {self.path}: {str(e)}")
+
+
+class AnalysisCache:
+    def __init__(self, max_entries: int = ANALYSIS_CACHE_MAX_ENTRIES,
+                 ttl: float = ANALYSIS_CACHE_TTL_SECONDS, path: str = ANALYSIS_CACHE_PATH,
+                 flush_delay: float = ANALYSIS_CACHE_FLUSH_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path or None
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._writer = None
+        if self.path:
+            self._load()
+            self._writer = DebouncedWriter(self.path, self._lock, self._snapshot, flush_delay, "analysis cache")
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Return a copy of a live cached analysis, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry["expires_at"] <= time.time():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return copy.deepcopy(entry["analysis"])
+
+    def put(self, key: str, analysis: Dict):
+        with self._lock:
+            self._entries[key] = {
+                "analysis": copy.deepcopy(analysis),
+                "expires_at": time.time() + self.ttl
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        if self._writer:
+            self._writer.mark_dirty()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self._writer:
+            self._writer.mark_dirty()
+
+    def flush(self):
+        """Write pending changes to the cache file now"""
+        if self._writer:
+            self._writer.flush()
+
+    def _load(self):
+        """Load persisted entries, dropping expired ones"""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring unreadable analysis cache {self.path}: {str(e)}")
+            return
+
+        now = time.time()
+        for key, entry in stored.get("entries", []):
+            if entry.get("expires_at", 0) > now:
+                self._entries[key] = entry
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        logging.info(f"Loaded {len(self._entries)} cached analyses from {self.path}")
+
+    def _snapshot(self) -> Dict:
+        """What the writer persists; caller holds the lock. Entries are never mutated, so a shallow copy will do"""
+        return {"entries": list(self._entries.items())}
+
+    def stats(self) -> Dict:
+        """Hit/miss counters for monitoring"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "persistent": bool(self.path),
+                "writes": self._writer.writes if self._writer else 0,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_analysis_cache() -> AnalysisCache:
+    """Return the process-wide analysis cache"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = AnalysisCache()
+            logging.info(f"Analysis cache initialised (max_entries={_cache.max_entries}, ttl={_cache.ttl}s)")
+        return _cache
+
+
+class AnalysisUpdateStore:
+    """
+    Late AI answers for requests that returned the rule-based analysis at the deadline
+    Polled by analysis_id; entries expire after ttl seconds
+    """
+
+    def __init__(self, max_entries: int = ANALYSIS_UPDATE_MAX_ENTRIES, ttl: float = ANALYSIS_UPDATE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _set(self, analysis_id: str, status: str, analysis: Dict = None, error: str = None):
+        with self._lock:
+            self._entries[analysis_id] = {
+                "analysis_id": analysis_id,
+                "status": status,
+                "ai_analysis": copy.deepcopy(analysis),
+                "error": error,
+                "updated_at": time.time()
+            }
+            self._entries.move_to_end(analysis_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def pending(self, analysis_id: str):
+        self._set(analysis_id, "pending")
+
+    def complete(self, analysis_id: str, analysis: Dict):
+        self._set(analysis_id, "complete", analysis)
+
+    def fail(self, analysis_id: str, error: str):
+        self._set(analysis_id, "failed", error=error)
+
+    def get(self, analysis_id: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(analysis_id)
+            if entry is not None and entry["updated_at"] + self.ttl <= time.time():
+                del self._entries[analysis_id]
+                entry = None
+            return copy.deepcopy(entry)
+
+
+_updates = None
+_updates_lock = threading.Lock()
+
+
+def get_analysis_updates() -> AnalysisUpdateStore:
+    """Return the process-wide store of late AI answers"""
+    global _updates
+    with _updates_lock:
+        if _updates is None:
+            _updates = AnalysisUpdateStore()
+        return _updates
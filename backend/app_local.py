@@ -2,7 +2,7 @@
 Simple Flask API for local testing
 Run this instead of Azure Functions for local development
 """
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 import sys
 import os
@@ -24,8 +24,27 @@ else:
 sys.path.insert(0, os.path.dirname(__file__))
 
 from diagnostics import NetworkDiagnostics
-from ai_analyzer import AIAnalyzer
-from rca_generator import RCAGenerator
+from rca_generator import parse_report_formats
+from datetime import datetime
+from components import (
+    get_ai_analyzer, get_rca_generator, warm_up_in_background, COMPONENTS_WARM_UP,
+    stats as component_stats
+)
+from async_diagnostics import get_event_loop, probe_options
+from analysis_cache import get_analysis_cache, get_analysis_updates
+from dns_cache import get_dns_cache
+from http_probe import get_connection_pool
+from llm_usage import get_usage_tracker
+from rate_limiter import get_rate_limiter
+from circuit_breaker import get_ai_breaker
+from incident_index import get_incident_index
+from report_uploader import get_report_uploader
+from report_history import get_report_history, parse_history_query, report_history_stats
+from sse_stream import stream_diagnosis, request_context, SSE_HEADERS
+from batch_diagnostics import (
+    parse_batch_request, run_batch_diagnostics, analyze_fleet,
+    DEFAULT_MAX_CONCURRENCY, DEFAULT_PER_HOST_CONCURRENCY
+)
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
@@ -36,6 +55,8 @@ def diagnose():
         data = request.get_json()
         target = data.get('target')
         service_type = data.get('service_type', 'web')
+        options = probe_options(data)  # http_probe_mode, http_fetch_mode, ...
+        formats = parse_report_formats(data.get('formats'))
         
         # Get optional enterprise context
         incident_context = data.get('incident_context')
@@ -44,18 +65,19 @@ def diagnose():
         print(f"Running diagnostics for: {target}")
         
         # Run diagnostics
-        diag = NetworkDiagnostics(target, service_type)
+        diag = NetworkDiagnostics(target, service_type, **options)
         diagnostics = diag.run_all_diagnostics()
         
         # AI Analysis
-        analyzer = AIAnalyzer()
+        analyzer = get_ai_analyzer()
         ai_analysis = analyzer.analyze_diagnostics(target, diagnostics, incident_context, recent_changes)
         
-        # Generate reports
-        generator = RCAGenerator()
-        technical_report = generator.generate_report(target, diagnostics, ai_analysis, incident_context, recent_changes)
-        executive_report = generator.generate_executive_report(target, diagnostics, ai_analysis, incident_context, recent_changes)
-        json_report = generator.generate_technical_report(target, diagnostics, ai_analysis, incident_context, recent_changes)
+        # Generate reports (one model, only the requested formats)
+        generator = get_rca_generator()
+        generated = generator.generate_reports(target, diagnostics, ai_analysis, incident_context, recent_changes, formats)
+        reports = generated["reports"]
+        history = get_report_history()
+        report_id = history.record(generated["model"]["technical"]) if history else None
         
         # Build response
         response = {
@@ -63,21 +85,146 @@ def diagnose():
             "timestamp": diagnostics[0].get('timestamp', ''),
             "diagnostics": diagnostics,
             "ai_analysis": ai_analysis,
-            "technical_report": technical_report,
-            "executive_report": executive_report,
-            "json_report": json_report
+            "technical_report": reports.get("text"),
+            "executive_report": reports.get("executive"),
+            "json_report": generated["model"]["technical"] if "json" in reports else None,
+            "markdown_report": reports.get("markdown"),
+            "html_report": reports.get("html"),
+            "report_id": report_id
         }
         
         return jsonify(response), 200
         
+    except ValueError as e:
+        return jsonify({"error": str(e), "status": "validation_error"}), 400
+        
     except Exception as e:
         print(f"Error: {str(e)}")
         import traceback
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/diagnose/stream', methods=['POST'])
+def diagnose_stream():
+    """Server-Sent Events: each result is pushed as soon as it is ready"""
+    data = request.get_json()
+    target = (data or {}).get('target')
+    if not target:
+        return jsonify({"error": "Missing 'target' parameter"}), 400
+
+    try:
+        target = target.replace('http://', '').replace('https://', '').strip()
+        diag = NetworkDiagnostics(target, data.get('service_type', 'web'), **probe_options(data))
+        formats = parse_report_formats(data.get('formats'))
+    except ValueError as e:
+        return jsonify({"error": str(e), "status": "validation_error"}), 400
+
+    incident_context, recent_changes = request_context(data)
+    events = stream_diagnosis(diag, incident_context, recent_changes, formats)
+    return Response(stream_with_context(events), mimetype='text/event-stream', headers=SSE_HEADERS)
+
+@app.route('/api/diagnose/batch', methods=['POST'])
+def diagnose_batch():
+    try:
+        data = request.get_json()
+        specs = parse_batch_request(data)
+
+        max_concurrency = min(int(data.get('max_concurrency', DEFAULT_MAX_CONCURRENCY)), DEFAULT_MAX_CONCURRENCY)
+        per_host_concurrency = min(int(data.get('per_host_concurrency', DEFAULT_PER_HOST_CONCURRENCY)), DEFAULT_PER_HOST_CONCURRENCY)
+
+        print(f"Running batch diagnostics for {len(specs)} targets")
+
+        batch = run_batch_diagnostics(specs, max_concurrency, per_host_concurrency)
+
+        response = {
+            "results": batch["results"],
+            "summary": batch["summary"],
+            "status": "success"
+        }
+        if data.get('analyze'):
+            response["fleet_analysis"] = analyze_fleet(batch, get_ai_analyzer())
+        if data.get('report'):
+            generator = get_rca_generator()
+            response.update(get_report_uploader().submit_plan(
+                generator, generator.plan_fleet_report_upload(batch, response.get("fleet_analysis"))
+            ))
+
+        return jsonify(response), 200
+
+    except ValueError as e:
+        return jsonify({"error": str(e), "status": "validation_error"}), 400
+
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/analysis/<analysis_id>', methods=['GET'])
+def analysis_update(analysis_id):
+    """Poll for a late AI answer (ai_analysis.ai_pending == true)"""
+    update = get_analysis_updates().get(analysis_id)
+    if update is None:
+        return jsonify({"error": f"Unknown or expired analysis_id: {analysis_id}", "status": "not_found"}), 404
+    return jsonify(update), 200
+
+@app.route('/api/uploads/<upload_id>', methods=['GET'])
+def upload_status(upload_id):
+    """Poll the background upload of streamed reports (report_upload.upload_id)"""
+    status = get_report_uploader().status(upload_id)
+    if status is None:
+        return jsonify({"error": f"Unknown or expired upload_id: {upload_id}", "status": "not_found"}), 404
+    return jsonify(status), 200
+
+@app.route('/api/incidents/<incident_id>/verify', methods=['POST'])
+def verify_incident(incident_id):
+    """Confirm (or reject) a stored RCA so it can be reused"""
+    verified = bool((request.get_json(silent=True) or {}).get('verified', True))
+    if not get_incident_index().verify(incident_id, verified):
+        return jsonify({"error": f"Unknown incident_id: {incident_id}", "status": "not_found"}), 404
+    return jsonify({"incident_id": incident_id, "verified": verified}), 200
+
+@app.route('/api/reports', methods=['GET'])
+def query_reports():
+    """RCA history, newest first; filter by target/category/severity/responsible_team/since/until, page with cursor"""
+    history = get_report_history()
+    if history is None:
+        return jsonify({"error": "Report history is unavailable", "status": "unavailable"}), 503
+    try:
+        return jsonify(history.query(**parse_history_query(request.args))), 200
+    except ValueError as e:
+        return jsonify({"error": str(e), "status": "validation_error"}), 400
+
+@app.route('/api/health', methods=['GET'])
+def health_check():
+    """Health check endpoint"""
+    return jsonify({
+        "status": "healthy",
+        "service": "Network RCA Platform",
+        "timestamp": datetime.utcnow().isoformat(),
+        "dns_cache": get_dns_cache().stats(),
+        "http_pool": get_connection_pool(get_event_loop()).stats(),
+        "analysis_cache": get_analysis_cache().stats(),
+        "components": component_stats(),
+        "llm_usage": get_usage_tracker().stats(),
+        "ai_rate_limiter": get_rate_limiter().stats(),
+        "ai_circuit_breaker": get_ai_breaker().stats(),
+        "incident_index": get_incident_index().stats(),
+        "report_uploader": get_report_uploader().stats(),
+        "report_history": report_history_stats()
+    }), 200
+
 if __name__ == '__main__':
     print("🚀 Starting Flask API on http://localhost:7071")
     print("📡 API endpoint: http://localhost:7071/api/diagnose")
+    print("📡 Stream endpoint: http://localhost:7071/api/diagnose/stream")
+    print("📡 Batch endpoint: http://localhost:7071/api/diagnose/batch")
+    print("📡 Analysis poll: http://localhost:7071/api/analysis/<analysis_id>")
+    print("📡 Upload status: http://localhost:7071/api/uploads/<upload_id>")
+    print("📡 Incident verify: http://localhost:7071/api/incidents/<incident_id>/verify")
+    print("📡 Report history: http://localhost:7071/api/reports")
+    print("📡 Health: http://localhost:7071/api/health")
     print("Press Ctrl+C to stop")
+    if COMPONENTS_WARM_UP:
+        warm_up_in_background()
     app.run(host='0.0.0.0', port=7071, debug=True)
@@ -0,0 +1,503 @@
+"""
+Async Network Diagnostics Engine
+Non-blocking DNS, TCP, HTTP and latency tests on a shared asyncio event loop
+"""
+
+import os
+import asyncio
+import ipaddress
+import socket
+import threading
+import time
+import logging
+from typing import Callable, Dict, List, Tuple
+
+from http_probe import (
+    fetch, slowest_phase, HTTPSSLError, HTTPTimeoutError,
+    PROBE_MODES, FETCH_MODES, HTTP_MAX_BODY_BYTES
+)
+from dns_cache import get_dns_cache, DNSLookupError
+from dns_client import dns_lookup, DNSResolverError
+from latency_stats import StreamingStats
+from probe_registry import ProbeRegistry, get_probe_registry, run_probe_graph
+
+DNS_TIMEOUT_SECONDS = 5
+TCP_TIMEOUT_SECONDS = 5
+HTTP_TIMEOUT_SECONDS = 10
+LATENCY_SAMPLES = int(os.getenv("LATENCY_SAMPLES", "3"))
+# Cap on simultaneous latency handshakes; 0 (default) runs every sample at once
+LATENCY_CONCURRENCY = int(os.getenv("LATENCY_CONCURRENCY", "0"))
+MAX_LATENCY_SAMPLES = 1000
+MAX_TCP_PORTS = 32
+MAX_TCP_ADDRESSES = 16
+HTTP_PROBE_MODE = os.getenv("HTTP_PROBE_MODE", "warm")
+HTTP_FETCH_MODE = os.getenv("HTTP_FETCH_MODE", "full")
+
+# Request fields that tune the probes (see AsyncNetworkDiagnostics.__init__)
+PROBE_OPTION_KEYS = (
+    "http_probe_mode", "http_fetch_mode", "http_max_body_bytes",
+    "latency_samples", "latency_interval_ms", "latency_concurrency",
+    "tcp_ports"
+)
+
+_loop = None
+_loop_thread = None
+_loop_lock = threading.Lock()
+
+
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """Return the process-wide diagnostics event loop, starting it on first use"""
+    global _loop, _loop_thread
+
+    with _loop_lock:
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+            _loop_thread = threading.Thread(
+                target=_loop.run_forever,
+                name="diagnostics-event-loop",
+                daemon=True
+            )
+            _loop_thread.start()
+        return _loop
+
+
+def run_sync(coro, timeout: float = None):
+    """
+    Run a coroutine on the shared diagnostics loop and block for its result
+    Lets synchronous callers (Flask, Azure Functions) share one event loop
+    """
+    loop = get_event_loop()
+    if threading.current_thread() is _loop_thread:
+        coro.close()
+        raise RuntimeError("run_sync() called from the diagnostics event loop; await the coroutine instead")
+    return asyncio.run_coroutine_threadsafe(coro, loop).result(timeout)
+
+
+def parse_target(target: str, service_type: str = "web") -> Tuple[str, int]:
+    """Split 'host[:port]' into hostname and port, defaulting by service type"""
+    if ':' in target:
+        hostname, port_str = target.split(':', 1)
+        return hostname, int(port_str)
+    return target, 443 if service_type == "web" else 80
+
+
+def probe_options(req_body: Dict) -> Dict:
+    """Pick the probe tuning fields out of a request body"""
+    return {key: req_body[key] for key in PROBE_OPTION_KEYS if req_body.get(key) is not None}
+
+
+def _preferred_address(addresses: List[str]) -> str:
+    """Prefer IPv4 for connection tests, falling back to the first address"""
+    for address in addresses:
+        if ":" not in address:
+            return address
+    return addresses[0]
+
+
+def _elapsed_ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 2)
+
+
+class AsyncNetworkDiagnostics:
+    def __init__(self, target: str, service_type: str = "web", http_probe_mode: str = None,
+                 http_fetch_mode: str = None, http_max_body_bytes: int = None,
+                 latency_samples: int = None, latency_interval_ms: float = None,
+                 latency_concurrency: int = None, tcp_ports: List[int] = None,
+                 registry: ProbeRegistry = None):
+        self.target = target
+        self.service_type = service_type
+        self.results = []
+        self.hostname, self.port = parse_target(target, service_type)
+
+        # "warm" reuses pooled connections, "cold" measures a fresh handshake
+        self.http_probe_mode = http_probe_mode or HTTP_PROBE_MODE
+        if self.http_probe_mode not in PROBE_MODES:
+            raise ValueError(f"Invalid http_probe_mode '{self.http_probe_mode}' (expected one of {', '.join(PROBE_MODES)})")
+
+        # full / head / headers / capped - how much of the response body to download
+        self.http_fetch_mode = http_fetch_mode or HTTP_FETCH_MODE
+        if self.http_fetch_mode not in FETCH_MODES:
+            raise ValueError(f"Invalid http_fetch_mode '{self.http_fetch_mode}' (expected one of {', '.join(FETCH_MODES)})")
+        self.http_max_body_bytes = int(http_max_body_bytes or HTTP_MAX_BODY_BYTES)
+
+        # Latency sampling: how many handshakes, how far apart, how many at once
+        self.latency_samples = int(latency_samples or LATENCY_SAMPLES)
+        if not 1 <= self.latency_samples <= MAX_LATENCY_SAMPLES:
+            raise ValueError(f"latency_samples must be between 1 and {MAX_LATENCY_SAMPLES}")
+        self.latency_interval_ms = float(latency_interval_ms or 0)
+        self.latency_concurrency = max(1, int(latency_concurrency or LATENCY_CONCURRENCY or self.latency_samples))
+
+        # Extra ports probed by the connectivity stage; the service port always comes first
+        self.tcp_ports = [self.port]
+        for port in tcp_ports or []:
+            port = int(port)
+            if not 0 < port < 65536:
+                raise ValueError(f"Invalid TCP port: {port}")
+            if port not in self.tcp_ports:
+                self.tcp_ports.append(port)
+        if len(self.tcp_ports) > MAX_TCP_PORTS:
+            raise ValueError(f"Too many tcp_ports (max {MAX_TCP_PORTS})")
+
+        # Filled in by the DNS stage and reused by every later stage
+        self.ip_address = None
+        self.addresses = []
+
+        # Probes to run; defaults to the process-wide registry with the built-in probes
+        self.registry = registry or get_probe_registry()
+
+    async def run_all(self, on_result: Callable[[Dict], None] = None) -> List[Dict]:
+        """
+        Run every registered probe without blocking the event loop
+        Independent branches (HTTP and latency) run concurrently; failures short-circuit dependants
+        on_result is called with each result as soon as it is available (for streaming)
+        Returns the same structured results as NetworkDiagnostics.run_all_diagnostics
+        """
+        logging.info(f"Starting diagnostics for {self.target}")
+        self.results = await run_probe_graph(self, self.registry, on_result)
+        return self.results
+
+    async def _resolve_host(self, hostname: str) -> str:
+        """Resolve a hostname through the shared DNS cache"""
+        try:
+            ipaddress.ip_address(hostname)
+            return hostname
+        except ValueError:
+            pass
+
+        if hostname == self.hostname and self.ip_address:
+            return self.ip_address
+
+        answer, _ = await asyncio.wait_for(
+            get_dns_cache().resolve(hostname, dns_lookup),
+            timeout=DNS_TIMEOUT_SECONDS
+        )
+        address = _preferred_address(answer["addresses"])
+        if hostname == self.hostname:
+            self.ip_address = address
+            self.addresses = list(answer["addresses"])
+        return address
+
+    async def _resolve_addresses(self) -> List[str]:
+        """Every address the target resolves to (one entry for IP literals)"""
+        ip_address = await self._resolve_host(self.hostname)
+        return self.addresses or [ip_address]
+
+    async def test_dns_resolution(self) -> Dict:
+        """Test DNS resolution"""
+        test_name = "DNS_RESOLUTION"
+        start_time = time.perf_counter()
+
+        try:
+            answer, cache_hit = await asyncio.wait_for(
+                get_dns_cache().resolve(self.hostname, dns_lookup),
+                timeout=DNS_TIMEOUT_SECONDS
+            )
+            self.ip_address = _preferred_address(answer["addresses"])
+            self.addresses = list(answer["addresses"])
+            latency_ms = _elapsed_ms(start_time)
+
+            logging.info(f"DNS resolved: {self.hostname} -> {self.ip_address} (cache_hit={cache_hit})")
+
+            details = {
+                "hostname": self.hostname,
+                "ip_address": self.ip_address,
+                "addresses": answer["addresses"],
+                "records": answer.get("records", []),
+                "cache_hit": cache_hit
+            }
+            # Per-resolver timing is only meaningful for a live query
+            if not cache_hit and answer.get("resolvers"):
+                details["resolvers"] = answer["resolvers"]
+
+            return {
+                "test_name": test_name,
+                "status": "PASS",
+                "latency_ms": latency_ms,
+                "details": details,
+                "failure_reason": None
+            }
+
+        except (DNSLookupError, DNSResolverError, socket.gaierror, asyncio.TimeoutError) as e:
+            latency_ms = _elapsed_ms(start_time)
+            reason = f"no answer within {DNS_TIMEOUT_SECONDS}s" if isinstance(e, asyncio.TimeoutError) else str(e)
+            logging.warning(f"DNS resolution failed for {self.hostname}: {reason}")
+
+            return {
+                "test_name": test_name,
+                "status": "FAIL",
+                "latency_ms": latency_ms,
+                "details": None,
+                "failure_reason": f"DNS resolution failed: {reason}"
+            }
+
+    async def _probe_port(self, address: str, port: int) -> Dict:
+        """Non-blocking connect to one address/port; the loop's epoll selector drives all probes"""
+        loop = asyncio.get_running_loop()
+        family = socket.AF_INET6 if ":" in address else socket.AF_INET
+        start = time.perf_counter()
+
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.setblocking(False)
+        try:
+            await asyncio.wait_for(loop.sock_connect(sock, (address, port)), timeout=TCP_TIMEOUT_SECONDS)
+            status, error = "open", None
+        except asyncio.TimeoutError:
+            status, error = "timeout", "Connection timeout"
+        except ConnectionRefusedError:
+            status, error = "refused", "Connection refused"
+        except OSError as e:
+            status, error = "unreachable", str(e)
+        finally:
+            sock.close()
+
+        return {
+            "address": address,
+            "port": port,
+            "status": status,
+            "latency_ms": _elapsed_ms(start),
+            "error": error
+        }
+
+    async def test_tcp_connectivity(self) -> Dict:
+        """
+        Test TCP connectivity on every resolved address and every configured port at once
+        Passes when the service port answers on at least one address
+        """
+        test_name = "TCP_CONNECTIVITY"
+        start_time = time.perf_counter()
+
+        try:
+            addresses = await self._resolve_addresses()
+        except asyncio.TimeoutError:
+            return {
+                "test_name": test_name,
+                "status": "FAIL",
+                "latency_ms": _elapsed_ms(start_time),
+                "details": None,
+                "failure_reason": "Connection timeout"
+            }
+        except (DNSLookupError, DNSResolverError, socket.gaierror) as e:
+            return {
+                "test_name": test_name,
+                "status": "FAIL",
+                "latency_ms": _elapsed_ms(start_time),
+                "details": None,
+                "failure_reason": str(e)
+            }
+
+        addresses = addresses[:MAX_TCP_ADDRESSES]
+        probes = await asyncio.gather(*(
+            self._probe_port(address, port) for address in addresses for port in self.tcp_ports
+        ))
+
+        primary = [p for p in probes if p["port"] == self.port]
+        primary_open = [p for p in primary if p["status"] == "open"]
+
+        by_port = {}
+        for probe in probes:
+            counts = by_port.setdefault(str(probe["port"]), {"open": 0, "closed": 0})
+            counts["open" if probe["status"] == "open" else "closed"] += 1
+
+        partial_failure = None
+        if primary_open and len(primary_open) < len(primary):
+            partial_failure = f"{len(primary) - len(primary_open)} of {len(primary)} addresses failed on port {self.port}"
+            logging.warning(f"TCP partial failure for {self.hostname}: {partial_failure}")
+
+        details = {
+            "hostname": self.hostname,
+            "port": self.port,
+            "ports": self.tcp_ports,
+            "addresses": addresses,
+            "reachable_addresses": len(primary_open),
+            "by_port": by_port,
+            "partial_failure": partial_failure,
+            "results": probes
+        }
+
+        if primary_open:
+            logging.info(f"TCP connection successful: {self.hostname}:{self.port} ({len(primary_open)}/{len(primary)} addresses)")
+            return {
+                "test_name": test_name,
+                "status": "PASS",
+                "latency_ms": min(p["latency_ms"] for p in primary_open),
+                "details": details,
+                "failure_reason": None
+            }
+
+        logging.warning(f"TCP connection failed: {self.hostname}:{self.port}")
+        all_timed_out = all(p["status"] == "timeout" for p in primary)
+        return {
+            "test_name": test_name,
+            "status": "FAIL",
+            "latency_ms": max(p["latency_ms"] for p in primary),
+            "details": details,
+            "failure_reason": "Connection timeout" if all_timed_out else f"Port {self.port} is closed or unreachable"
+        }
+
+    async def test_http_status(self) -> Dict:
+        """Test HTTP/HTTPS status"""
+        test_name = "HTTP_STATUS"
+        start_time = time.perf_counter()
+
+        # Determine protocol
+        protocol = "https" if self.port == 443 else "http"
+        url = f"{protocol}://{self.hostname}"
+        if self.port not in [80, 443]:
+            url = f"{protocol}://{self.hostname}:{self.port}"
+
+        try:
+            response = await fetch(url, timeout=HTTP_TIMEOUT_SECONDS, allow_redirects=True,
+                                   resolve=self._resolve_host, mode=self.http_probe_mode,
+                                   fetch_mode=self.http_fetch_mode,
+                                   max_body_bytes=self.http_max_body_bytes)
+            latency_ms = _elapsed_ms(start_time)
+            status_code = response["status_code"]
+
+            logging.info(f"HTTP request successful: {url} -> {status_code}")
+
+            return {
+                "test_name": test_name,
+                "status": "PASS" if status_code < 400 else "FAIL",
+                "latency_ms": latency_ms,
+                "details": {
+                    "url": url,
+                    "status_code": status_code,
+                    "response_time_ms": response["elapsed_ms"],
+                    "probe_mode": response["probe_mode"],
+                    "connection_reused": response["connection_reused"],
+                    "proxy": response["proxy"],
+                    "phase_timings_ms": response["timings"],
+                    "slowest_phase": slowest_phase(response["timings"]),
+                    "fetch_mode": response["fetch_mode"],
+                    "final_url": response["url"],
+                    "body_bytes": response["body_bytes"],
+                    "body_truncated": response["body_truncated"],
+                    "redirects": response["redirects"]
+                },
+                "failure_reason": None if status_code < 400 else f"HTTP {status_code}"
+            }
+
+        except HTTPSSLError as e:
+            return {
+                "test_name": test_name,
+                "status": "FAIL",
+                "latency_ms": _elapsed_ms(start_time),
+                "details": {"url": url},
+                "failure_reason": f"SSL/TLS error: {str(e)}"
+            }
+
+        except HTTPTimeoutError:
+            return {
+                "test_name": test_name,
+                "status": "FAIL",
+                "latency_ms": _elapsed_ms(start_time),
+                "details": {"url": url},
+                "failure_reason": "HTTP request timeout"
+            }
+
+        except Exception as e:
+            return {
+                "test_name": test_name,
+                "status": "FAIL",
+                "latency_ms": _elapsed_ms(start_time),
+                "details": {"url": url},
+                "failure_reason": str(e)
+            }
+
+    async def _latency_sample(self, ip_address: str, index: int, gate: asyncio.Semaphore) -> float:
+        """Time one TCP handshake, staggered by the configured interval"""
+        if self.latency_interval_ms:
+            await asyncio.sleep(index * self.latency_interval_ms / 1000)
+        async with gate:
+            start = time.perf_counter()
+            try:
+                _, writer = await asyncio.wait_for(
+                    asyncio.open_connection(ip_address, self.port),
+                    timeout=TCP_TIMEOUT_SECONDS
+                )
+            except asyncio.TimeoutError:
+                raise TimeoutError("timed out")
+            elapsed = (time.perf_counter() - start) * 1000
+            writer.close()
+            try:
+                # Let the transport finish closing instead of leaving it to GC
+                await writer.wait_closed()
+            except (OSError, asyncio.IncompleteReadError):
+                pass
+            return elapsed
+
+    async def test_latency(self) -> Dict:
+        """Measure round-trip latency with concurrent TCP handshake samples"""
+        test_name = "LATENCY_CHECK"
+
+        try:
+            # Measure multiple samples against the resolved address
+            ip_address = await self._resolve_host(self.hostname)
+            gate = asyncio.Semaphore(self.latency_concurrency)
+            stats = StreamingStats()
+            last_error = None
+
+            async def _indexed(index: int):
+                try:
+                    return index, await self._latency_sample(ip_address, index, gate), None
+                except OSError as e:
+                    return index, None, e
+
+            # Feed the estimator as samples complete; the send index keeps jitter in send order
+            pending = [_indexed(i) for i in range(self.latency_samples)]
+            for sample in asyncio.as_completed(pending):
+                index, elapsed, error = await sample
+                if error is None:
+                    stats.add(elapsed, seq=index)
+                else:
+                    stats.add_loss(seq=index)
+                    last_error = error
+
+            summary = stats.summary()
+            if not summary["samples"]:
+                raise last_error
+
+            logging.info(f"Latency measured: avg={summary['avg_ms']}ms p99={summary['p99_ms']}ms loss={summary['loss_pct']}%")
+
+            return {
+                "test_name": test_name,
+                "status": "PASS",
+                "latency_ms": summary["avg_ms"],
+                "details": summary,
+                "failure_reason": None
+            }
+
+        except Exception as e:
+            return {
+                "test_name": test_name,
+                "status": "FAIL",
+                "latency_ms": 0,
+                "details": None,
+                "failure_reason": str(e)
+            }
+
+    def _infer_failure(self, test_name: str, reason: str) -> Dict:
+        """Create inferred failure result"""
+        return {
+            "test_name": test_name,
+            "status": "INFERRED_FAIL",
+            "latency_ms": 0,
+            "details": None,
+            "failure_reason": f"Inferred failure: {reason}"
+        }
+
+
+def _register_builtin_probes(registry: ProbeRegistry):
+    """DNS -> TCP -> (HTTP | LATENCY); extra probes can hang off any of these"""
+    registry.register("DNS_RESOLUTION", AsyncNetworkDiagnostics.test_dns_resolution,
+                      failure_reason="DNS resolution failed")
+    registry.register("TCP_CONNECTIVITY", AsyncNetworkDiagnostics.test_tcp_connectivity,
+                      depends_on=("DNS_RESOLUTION",), failure_reason="TCP connection failed")
+    registry.register("HTTP_STATUS", AsyncNetworkDiagnostics.test_http_status,
+                      depends_on=("TCP_CONNECTIVITY",), failure_reason="HTTP check failed")
+    registry.register("LATENCY_CHECK", AsyncNetworkDiagnostics.test_latency,
+                      depends_on=("TCP_CONNECTIVITY",), inferred_name="LATENCY",
+                      failure_reason="Latency check failed")
+
+
+_register_builtin_probes(get_probe_registry())
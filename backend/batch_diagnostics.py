@@ -0,0 +1,164 @@
+"""
+Batch Diagnostics Module
+Runs network diagnostics for a fleet of targets under bounded concurrency
+"""
+
+import os
+import asyncio
+import time
+import logging
+from typing import Dict, List
+
+from async_diagnostics import AsyncNetworkDiagnostics, parse_target, probe_options, run_sync
+
+DEFAULT_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "200"))
+DEFAULT_PER_HOST_CONCURRENCY = int(os.getenv("BATCH_PER_HOST_CONCURRENCY", "4"))
+MAX_BATCH_TARGETS = int(os.getenv("BATCH_MAX_TARGETS", "5000"))
+
+# Bulk sweeps only need status codes, so skip response bodies by default
+BATCH_HTTP_FETCH_MODE = os.getenv("BATCH_HTTP_FETCH_MODE", "headers")
+
+
+def clean_target(target: str) -> str:
+    """Remove protocol prefix and surrounding whitespace from a target"""
+    return target.replace('http://', '').replace('https://', '').strip()
+
+
+def parse_batch_request(req_body: Dict) -> List[Dict]:
+    """
+    Validate a batch request body and return normalized target specs
+    Accepts: { "targets": ["a.com", {"target": "b.com:8080", "service_type": "api"}], "service_type": "web" }
+    Probe options (http_probe_mode, http_fetch_mode, ...) may be set at the top level or per target
+    Raises ValueError on invalid input
+    """
+    targets = req_body.get('targets')
+    default_service_type = req_body.get('service_type', 'web')
+    default_options = dict({"http_fetch_mode": BATCH_HTTP_FETCH_MODE}, **probe_options(req_body))
+
+    if not isinstance(targets, list) or not targets:
+        raise ValueError("'targets' must be a non-empty list")
+    if len(targets) > MAX_BATCH_TARGETS:
+        raise ValueError(f"Too many targets: {len(targets)} (max {MAX_BATCH_TARGETS})")
+
+    specs = []
+    for index, item in enumerate(targets):
+        if isinstance(item, str):
+            target, service_type, options = item, default_service_type, default_options
+        elif isinstance(item, dict) and item.get('target'):
+            target = item['target']
+            service_type = item.get('service_type', default_service_type)
+            options = dict(default_options, **probe_options(item))
+        else:
+            raise ValueError(f"Invalid target at index {index}")
+
+        target = clean_target(target)
+        if not target:
+            raise ValueError(f"Empty target at index {index}")
+        specs.append({"target": target, "service_type": service_type, "options": options})
+
+    return specs
+
+
+def _first_failure(diagnostics: List[Dict]) -> str:
+    """Name of the first test that failed outright, or None"""
+    for test in diagnostics:
+        if test["status"] == "FAIL":
+            return test["test_name"]
+    return None
+
+
+def summarize_fleet(results: List[Dict], duration_ms: float) -> Dict:
+    """Aggregate per-target results into a fleet-wide summary"""
+    failures_by_test = {}
+    for result in results:
+        if result.get("first_failure"):
+            failures_by_test[result["first_failure"]] = failures_by_test.get(result["first_failure"], 0) + 1
+
+    return {
+        "total_targets": len(results),
+        "healthy": sum(1 for r in results if r["status"] == "healthy"),
+        "unhealthy": sum(1 for r in results if r["status"] == "unhealthy"),
+        "errors": sum(1 for r in results if r["status"] == "error"),
+        "failures_by_test": failures_by_test,
+        "unhealthy_targets": [r["target"] for r in results if r["status"] != "healthy"],
+        "duration_ms": duration_ms
+    }
+
+
+async def run_batch(specs: List[Dict], max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                    per_host_concurrency: int = DEFAULT_PER_HOST_CONCURRENCY) -> Dict:
+    """
+    Diagnose every target concurrently on the current event loop
+    Bounded by a global limit and a per-host limit
+    """
+    global_limit = asyncio.Semaphore(max(1, max_concurrency))
+    host_limits = {}
+    start_time = time.perf_counter()
+
+    async def _diagnose(spec: Dict) -> Dict:
+        target, service_type = spec["target"], spec["service_type"]
+        try:
+            hostname = parse_target(target, service_type)[0].lower()
+        except ValueError as e:
+            return {"target": target, "service_type": service_type, "status": "error",
+                    "error": f"Invalid target: {str(e)}", "first_failure": None, "diagnostics": []}
+
+        host_limit = host_limits.setdefault(hostname, asyncio.Semaphore(max(1, per_host_concurrency)))
+
+        # Take the per-host slot first so queued hosts don't hold global slots
+        async with host_limit:
+            async with global_limit:
+                target_start = time.perf_counter()
+                try:
+                    engine = AsyncNetworkDiagnostics(target, service_type, **spec.get("options", {}))
+                    diagnostics = await engine.run_all()
+                except Exception as e:
+                    logging.error(f"Batch diagnostics failed for {target}: {str(e)}")
+                    return {"target": target, "service_type": service_type, "status": "error",
+                            "error": str(e), "first_failure": None, "diagnostics": []}
+
+        first_failure = _first_failure(diagnostics)
+        return {
+            "target": target,
+            "service_type": service_type,
+            "status": "unhealthy" if first_failure else "healthy",
+            "first_failure": first_failure,
+            "duration_ms": round((time.perf_counter() - target_start) * 1000, 2),
+            "diagnostics": diagnostics
+        }
+
+    results = await asyncio.gather(*(_diagnose(spec) for spec in specs))
+    duration_ms = round((time.perf_counter() - start_time) * 1000, 2)
+
+    logging.info(f"Batch diagnostics completed: {len(results)} targets in {duration_ms}ms")
+
+    return {
+        "results": results,
+        "summary": summarize_fleet(results, duration_ms)
+    }
+
+
+def run_batch_diagnostics(specs: List[Dict], max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                          per_host_concurrency: int = DEFAULT_PER_HOST_CONCURRENCY) -> Dict:
+    """Synchronous entry point for HTTP handlers"""
+    return run_sync(run_batch(specs, max_concurrency, per_host_concurrency))
+
+
+def analyze_fleet(batch: Dict, analyzer) -> Dict:
+    """
+    Batched AI analysis of every unhealthy target (one LLM call per token-budgeted chunk)
+    Attaches ai_analysis to each unhealthy result and returns the fleet-wide verdict
+    """
+    unhealthy = [r for r in batch["results"] if r["status"] == "unhealthy"]
+    if not unhealthy:
+        return {"common_cause": None, "analyzed_targets": 0, "llm_calls": 0}
+
+    analysis = analyzer.analyze_batch([{"target": r["target"], "diagnostics": r["diagnostics"]} for r in unhealthy])
+    for result, item in zip(unhealthy, analysis["results"]):
+        result["ai_analysis"] = item["ai_analysis"]
+
+    return {
+        "common_cause": analysis["common_cause"],
+        "analyzed_targets": len(unhealthy),
+        "llm_calls": analysis["llm_calls"]
+    }
@@ -0,0 +1,169 @@
+"""
+Circuit Breaker Module
+Stops calling a degraded dependency (Azure OpenAI) once errors or slow calls
+cross a threshold, and probes it periodically to detect recovery
+"""
+
+import os
+import threading
+import time
+import logging
+from collections import deque
+from typing import Callable, Dict, Tuple
+
+AI_BREAKER_WINDOW = int(os.getenv("AI_BREAKER_WINDOW", "20"))
+AI_BREAKER_MIN_CALLS = int(os.getenv("AI_BREAKER_MIN_CALLS", "5"))
+AI_BREAKER_FAILURE_RATE = float(os.getenv("AI_BREAKER_FAILURE_RATE", "0.5"))
+# Calls slower than this count as failures
+AI_BREAKER_SLOW_CALL_SECONDS = float(os.getenv("AI_BREAKER_SLOW_CALL_SECONDS", "15"))
+AI_BREAKER_OPEN_SECONDS = float(os.getenv("AI_BREAKER_OPEN_SECONDS", "30"))
+AI_BREAKER_HALF_OPEN_CALLS = int(os.getenv("AI_BREAKER_HALF_OPEN_CALLS", "1"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """The breaker is open; the call was not attempted"""
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, window: int = AI_BREAKER_WINDOW, min_calls: int = AI_BREAKER_MIN_CALLS,
+                 failure_rate: float = AI_BREAKER_FAILURE_RATE, slow_call_seconds: float = AI_BREAKER_SLOW_CALL_SECONDS,
+                 open_seconds: float = AI_BREAKER_OPEN_SECONDS, half_open_calls: int = AI_BREAKER_HALF_OPEN_CALLS):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.half_open_calls = max(1, half_open_calls)
+
+        self._lock = threading.Lock()
+        self._outcomes = deque(maxlen=max(1, window))  # True = failure or slow
+        self.state = CLOSED
+        self._opened_at = None
+        self._trials_in_flight = 0
+        self._trial_successes = 0
+
+        self.short_circuited = 0
+        self.times_opened = 0
+
+    def _transition(self, state: str):
+        if state != self.state:
+            logging.warning(f"Circuit breaker '{self.name}': {self.state} -> {state}")
+        self.state = state
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+            self.times_opened += 1
+        if state in (OPEN, HALF_OPEN):
+            self._trials_in_flight = 0
+            self._trial_successes = 0
+        if state == CLOSED:
+            self._outcomes.clear()
+
+    def is_open(self) -> bool:
+        """
+        True while calls would be short-circuited; callers that skip the call on True
+        are counted as short-circuited (no trial permit is taken)
+        """
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+                return False
+            blocked = self.state == OPEN or (self.state == HALF_OPEN and self._trials_in_flight >= self.half_open_calls)
+            if blocked:
+                self.short_circuited += 1
+            return blocked
+
+    def allow(self) -> bool:
+        """Admit one call; in half-open only a limited number of trial calls get through"""
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+                self._transition(HALF_OPEN)
+
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and self._trials_in_flight < self.half_open_calls:
+                self._trials_in_flight += 1
+                return True
+
+            self.short_circuited += 1
+            return False
+
+    def record(self, failed: bool, duration: float = 0.0):
+        """Report the outcome of an admitted call"""
+        failed = failed or duration > self.slow_call_seconds
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._trials_in_flight = max(0, self._trials_in_flight - 1)
+                if failed:
+                    self._transition(OPEN)
+                else:
+                    self._trial_successes += 1
+                    if self._trial_successes >= self.half_open_calls:
+                        self._transition(CLOSED)
+                return
+
+            if self.state != CLOSED:
+                return
+
+            self._outcomes.append(failed)
+            failures = sum(self._outcomes)
+            if len(self._outcomes) >= self.min_calls and failures / len(self._outcomes) >= self.failure_rate:
+                self._transition(OPEN)
+
+    def release(self):
+        """Give back an admitted call's trial permit without recording an outcome"""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._trials_in_flight = max(0, self._trials_in_flight - 1)
+
+    def call(self, fn: Callable, ignore: Tuple = ()):
+        """
+        Run fn() through the breaker; raises CircuitOpenError when short-circuited
+        Exceptions in ignore (e.g. local backpressure) do not count against the dependency
+        """
+        if not self.allow():
+            raise CircuitOpenError(f"Circuit '{self.name}' is open")
+
+        start = time.monotonic()
+        try:
+            result = fn()
+        except ignore:
+            # Says nothing about the dependency's health: neither success nor failure
+            self.release()
+            raise
+        except Exception:
+            self.record(True, time.monotonic() - start)
+            raise
+        self.record(False, time.monotonic() - start)
+        return result
+
+    def stats(self) -> Dict:
+        with self._lock:
+            retry_in = None
+            if self.state == OPEN:
+                retry_in = round(max(0.0, self.open_seconds - (time.monotonic() - self._opened_at)), 2)
+            return {
+                "state": self.state,
+                "window_calls": len(self._outcomes),
+                "window_failure_rate": round(sum(self._outcomes) / len(self._outcomes), 4) if self._outcomes else 0.0,
+                "failure_rate_threshold": self.failure_rate,
+                "slow_call_seconds": self.slow_call_seconds,
+                "retry_in_seconds": retry_in,
+                "times_opened": self.times_opened,
+                "short_circuited": self.short_circuited
+            }
+
+
+_breaker = None
+_breaker_lock = threading.Lock()
+
+
+def get_ai_breaker() -> CircuitBreaker:
+    """Return the process-wide breaker for Azure OpenAI"""
+    global _breaker
+    with _breaker_lock:
+        if _breaker is None:
+            _breaker = CircuitBreaker("azure-openai")
+        return _breaker
@@ -0,0 +1,153 @@
+"""
+Component Registry Module
+Process-wide AIAnalyzer and RCAGenerator, created lazily and reused across requests
+so their AzureOpenAI / BlobServiceClient connection pools stay warm
+"""
+
+import os
+import time
+import logging
+import threading
+from typing import Callable, Dict, Tuple
+
+from ai_analyzer import AIAnalyzer
+from async_diagnostics import get_event_loop
+from rca_generator import RCAGenerator
+from rule_engine import get_rule_engine
+
+COMPONENTS_WARM_UP = os.getenv("COMPONENTS_WARM_UP", "true").lower() == "true"
+# Cap on the warm-up connection probe; it is a courtesy, never worth a slow start
+COMPONENTS_WARM_UP_TIMEOUT_SECONDS = float(os.getenv("COMPONENTS_WARM_UP_TIMEOUT_SECONDS", "3"))
+
+
+def _ai_credentials() -> Tuple:
+    return (
+        os.getenv("AZURE_OPENAI_ENDPOINT"),
+        os.getenv("AZURE_OPENAI_API_KEY"),
+        os.getenv("AZURE_OPENAI_DEPLOYMENT", "gpt-4")
+    )
+
+
+def _storage_credentials() -> Tuple:
+    return (
+        os.getenv("AZURE_STORAGE_CONNECTION_STRING"),
+        os.getenv("BLOB_CONTAINER_NAME", "rca-reports")
+    )
+
+
+class _Component:
+    """
+    One lazily built instance, rebuilt when its credentials change (e.g. key rotation)
+    A replaced instance is not closed: in-flight calls keep using it until they finish
+    """
+
+    def __init__(self, name: str, factory: Callable, credentials: Callable[[], Tuple]):
+        self.name = name
+        self._factory = factory
+        self._credentials = credentials
+        self._instance = None
+        self._signature = None
+        self._lock = threading.Lock()
+        self.builds = 0
+
+    def get(self):
+        signature = self._credentials()
+        instance = self._instance
+        if instance is not None and signature == self._signature:
+            return instance
+
+        with self._lock:
+            if self._instance is None or signature != self._signature:
+                if self._instance is not None:
+                    logging.info(f"Credentials changed, rebuilding {self.name}")
+                # Constructor errors (missing credentials) propagate as before
+                self._instance = self._factory()
+                self._signature = signature
+                self.builds += 1
+            return self._instance
+
+    def reset(self):
+        with self._lock:
+            self._instance = None
+            self._signature = None
+
+    def stats(self) -> Dict:
+        return {"initialised": self._instance is not None, "builds": self.builds}
+
+
+_ai_analyzer = _Component("AIAnalyzer", AIAnalyzer, _ai_credentials)
+_rca_generator = _Component("RCAGenerator", RCAGenerator, _storage_credentials)
+
+
+def get_ai_analyzer() -> AIAnalyzer:
+    """Shared AIAnalyzer; raises ValueError when Azure OpenAI is not configured"""
+    return _ai_analyzer.get()
+
+
+def get_rca_generator() -> RCAGenerator:
+    """Shared RCAGenerator (blob container checked once, not per request)"""
+    return _rca_generator.get()
+
+
+def refresh():
+    """Drop cached components so the next call rebuilds them from the environment"""
+    _ai_analyzer.reset()
+    _rca_generator.reset()
+
+
+def warm_up() -> Dict:
+    """
+    Build components and open their connections ahead of the first request
+    Intended for cold start; never raises. Blocks, so startup code should use warm_up_in_background
+    """
+    report = {}
+
+    for name, component in (("ai_analyzer", _ai_analyzer), ("rca_generator", _rca_generator)):
+        start = time.perf_counter()
+        try:
+            component.get()
+            report[name] = {"status": "ready", "duration_ms": round((time.perf_counter() - start) * 1000, 2)}
+        except Exception as e:
+            logging.warning(f"Warm-up could not build {name}: {str(e)}")
+            report[name] = {"status": "unavailable", "error": str(e)}
+
+    # Open the AzureOpenAI connection (TLS handshake) with a call that spends no tokens
+    if report["ai_analyzer"]["status"] == "ready":
+        start = time.perf_counter()
+        try:
+            client = _ai_analyzer.get().client.with_options(
+                timeout=COMPONENTS_WARM_UP_TIMEOUT_SECONDS, max_retries=0
+            )
+            client.models.list()
+            report["ai_analyzer"]["connection_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        except Exception as e:
+            logging.warning(f"Warm-up request to Azure OpenAI failed: {str(e)}")
+
+    # Compile the rule-based decision table (also the fallback when the AI is unavailable)
+    report["rule_engine"] = {"status": "ready", "rules": get_rule_engine().rule_count}
+
+    # Start the diagnostics event loop ahead of the first request
+    get_event_loop()
+
+    logging.info(f"Component warm-up: {report}")
+    return report
+
+
+def warm_up_in_background() -> threading.Thread:
+    """Run warm_up on a daemon thread so module import and worker start never wait on the network"""
+    def _run():
+        try:
+            warm_up()
+        except Exception as e:
+            logging.warning(f"Component warm-up failed: {str(e)}")
+
+    thread = threading.Thread(target=_run, name="components-warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
+def stats() -> Dict:
+    return {
+        "ai_analyzer": _ai_analyzer.stats(),
+        "rca_generator": _rca_generator.stats()
+    }
@@ -0,0 +1,176 @@
+"""
+DNS Cache Module
+Process-wide, TTL-aware resolver cache with negative caching and LRU eviction
+"""
+
+import os
+import asyncio
+import socket
+import threading
+import time
+import logging
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+DNS_CACHE_MAX_ENTRIES = int(os.getenv("DNS_CACHE_MAX_ENTRIES", "4096"))
+DNS_CACHE_DEFAULT_TTL = float(os.getenv("DNS_CACHE_DEFAULT_TTL", "60"))
+DNS_CACHE_NEGATIVE_TTL = float(os.getenv("DNS_CACHE_NEGATIVE_TTL", "10"))
+DNS_CACHE_MAX_TTL = float(os.getenv("DNS_CACHE_MAX_TTL", "3600"))
+
+
+class DNSLookupError(Exception):
+    """Authoritative lookup failure (e.g. NXDOMAIN), safe to cache negatively"""
+
+
+class DNSCache:
+    def __init__(self, max_entries: int = DNS_CACHE_MAX_ENTRIES,
+                 default_ttl: float = DNS_CACHE_DEFAULT_TTL,
+                 negative_ttl: float = DNS_CACHE_NEGATIVE_TTL,
+                 max_ttl: float = DNS_CACHE_MAX_TTL):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.negative_ttl = negative_ttl
+        self.max_ttl = max_ttl
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._inflight = {}
+
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, hostname: str) -> Optional[Dict]:
+        """Return a live cache entry for hostname, or None"""
+        key = hostname.lower()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry["expires_at"] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, hostname: str, addresses: List[str], ttl: float = None, records: List[Dict] = None):
+        """Cache a positive answer, honouring the record TTL when known"""
+        ttl = self.default_ttl if ttl is None else min(max(ttl, 0), self.max_ttl)
+        self._store(hostname, {
+            "addresses": addresses,
+            "records": records or [],
+            "error": None,
+            "ttl": ttl,
+            "expires_at": time.monotonic() + ttl
+        })
+
+    def put_negative(self, hostname: str, error: str, ttl: float = None):
+        """Cache an authoritative failure for a short negative TTL"""
+        ttl = self.negative_ttl if ttl is None else min(ttl, self.negative_ttl)
+        self._store(hostname, {
+            "addresses": [],
+            "records": [],
+            "error": error,
+            "ttl": ttl,
+            "expires_at": time.monotonic() + ttl
+        })
+
+    def _store(self, hostname: str, entry: Dict):
+        key = hostname.lower()
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    async def resolve(self, hostname: str, lookup: Callable[[str], Awaitable[Dict]]) -> Tuple[Dict, bool]:
+        """
+        Resolve hostname through the cache
+        lookup(hostname) returns {"addresses": [...], "ttl": seconds or None, "records": [...]}
+        or raises DNSLookupError for authoritative failures
+        Concurrent misses for the same name share one lookup
+        Returns (answer, cache_hit); raises DNSLookupError for negative entries
+        """
+        entry = self.get(hostname)
+        if entry is not None:
+            with self._lock:
+                if entry["error"]:
+                    self.negative_hits += 1
+                else:
+                    self.hits += 1
+            if entry["error"]:
+                raise DNSLookupError(entry["error"])
+            return entry, True
+
+        key = hostname.lower()
+        with self._lock:
+            self.misses += 1
+        pending = self._inflight.get(key)
+        if pending is None:
+            pending = asyncio.ensure_future(self._lookup(hostname, lookup))
+            self._inflight[key] = pending
+            pending.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(pending), False
+
+    async def _lookup(self, hostname: str, lookup: Callable[[str], Awaitable[Dict]]) -> Dict:
+        try:
+            answer = await lookup(hostname)
+        except DNSLookupError as e:
+            self.put_negative(hostname, str(e))
+            raise
+        self.put(hostname, answer["addresses"], answer.get("ttl"), answer.get("records"))
+        return dict(answer, error=None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        """Hit/miss counters for monitoring"""
+        with self._lock:
+            lookups = self.hits + self.negative_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "negative_hits": self.negative_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round((self.hits + self.negative_hits) / lookups, 4) if lookups else 0.0
+            }
+
+
+async def system_lookup(hostname: str) -> Dict:
+    """
+    Resolve via the system resolver (getaddrinfo)
+    The libc resolver does not expose TTLs, so the cache default applies
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        infos = await loop.getaddrinfo(hostname, None, family=socket.AF_INET, type=socket.SOCK_STREAM)
+    except socket.gaierror as e:
+        if e.errno in (socket.EAI_NONAME, getattr(socket, "EAI_NODATA", socket.EAI_NONAME)):
+            raise DNSLookupError(str(e))
+        raise
+
+    addresses = []
+    for info in infos:
+        if info[4][0] not in addresses:
+            addresses.append(info[4][0])
+    return {"addresses": addresses, "ttl": None}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_dns_cache() -> DNSCache:
+    """Return the process-wide DNS cache"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = DNSCache()
+            logging.info(f"DNS cache initialised (max_entries={_cache.max_entries})")
+        return _cache
@@ -0,0 +1,437 @@
+"""
+DNS Client Module
+Non-blocking UDP/TCP DNS queries against several resolvers in parallel
+Returns all A/AAAA records with TTLs and per-resolver latency
+"""
+
+import os
+import asyncio
+import ipaddress
+import random
+import socket
+import struct
+import threading
+import time
+import logging
+from typing import Callable, Dict, List, Tuple
+
+from dns_cache import DNSLookupError, system_lookup
+
+DNS_PORT = 53
+DNS_QUERY_DEADLINE = float(os.getenv("DNS_QUERY_DEADLINE", "2.0"))
+# After the first resolver answers, how long the others get to add their records
+DNS_ANSWER_GRACE_SECONDS = float(os.getenv("DNS_ANSWER_GRACE_SECONDS", "0.05"))
+RESOLV_CONF_PATH = "/etc/resolv.conf"
+HOSTS_PATH = os.getenv("HOSTS_FILE", "/etc/hosts")
+
+TYPE_A = 1
+TYPE_CNAME = 5
+TYPE_AAAA = 28
+CLASS_IN = 1
+
+FLAG_RD = 0x0100
+FLAG_TC = 0x0200
+
+RCODE_NAMES = {
+    0: "NOERROR",
+    1: "FORMERR",
+    2: "SERVFAIL",
+    3: "NXDOMAIN",
+    4: "NOTIMP",
+    5: "REFUSED"
+}
+
+
+class DNSResolverError(Exception):
+    """No resolver produced a usable answer (timeouts, SERVFAIL, network errors)"""
+
+
+class DNSProtocolError(Exception):
+    """Malformed or unexpected DNS message"""
+
+
+def build_query(hostname: str, qtype: int, query_id: int) -> bytes:
+    """Encode a recursive query for hostname/qtype"""
+    header = struct.pack("!HHHHHH", query_id, FLAG_RD, 1, 0, 0, 0)
+    qname = b""
+    for label in hostname.rstrip(".").encode("idna").split(b"."):
+        if not label or len(label) > 63:
+            raise DNSProtocolError(f"Invalid hostname: {hostname}")
+        qname += bytes([len(label)]) + label
+    return header + qname + b"\x00" + struct.pack("!HH", qtype, CLASS_IN)
+
+
+def _read_name(data: bytes, offset: int) -> Tuple[str, int]:
+    """Decode a possibly compressed domain name, returning (name, next offset)"""
+    labels = []
+    end = None
+    jumps = 0
+
+    while True:
+        if offset >= len(data):
+            raise DNSProtocolError("Name runs past end of message")
+        length = data[offset]
+        if length & 0xC0 == 0xC0:
+            if end is None:
+                end = offset + 2
+            offset = ((length & 0x3F) << 8) | data[offset + 1]
+            jumps += 1
+            if jumps > 64:
+                raise DNSProtocolError("Compression pointer loop")
+        elif length == 0:
+            offset += 1
+            break
+        else:
+            labels.append(data[offset + 1:offset + 1 + length].decode("ascii", "replace"))
+            offset += 1 + length
+
+    return ".".join(labels), end if end is not None else offset
+
+
+def parse_response(data: bytes) -> Dict:
+    """Decode a DNS response into rcode, truncation flag and answer records"""
+    if len(data) < 12:
+        raise DNSProtocolError("Response shorter than DNS header")
+
+    query_id, flags, qdcount, ancount, _, _ = struct.unpack("!HHHHHH", data[:12])
+    offset = 12
+
+    for _ in range(qdcount):
+        _, offset = _read_name(data, offset)
+        offset += 4
+
+    answers = []
+    for _ in range(ancount):
+        name, offset = _read_name(data, offset)
+        rtype, _, ttl, rdlength = struct.unpack("!HHIH", data[offset:offset + 10])
+        offset += 10
+        rdata = data[offset:offset + rdlength]
+
+        if rtype == TYPE_A and rdlength == 4:
+            answers.append({"name": name, "type": "A", "ttl": ttl, "address": socket.inet_ntop(socket.AF_INET, rdata)})
+        elif rtype == TYPE_AAAA and rdlength == 16:
+            answers.append({"name": name, "type": "AAAA", "ttl": ttl, "address": socket.inet_ntop(socket.AF_INET6, rdata)})
+        elif rtype == TYPE_CNAME:
+            answers.append({"name": name, "type": "CNAME", "ttl": ttl, "address": _read_name(data, offset)[0]})
+
+        offset += rdlength
+
+    return {
+        "id": query_id,
+        "rcode": flags & 0x000F,
+        "truncated": bool(flags & FLAG_TC),
+        "answers": answers
+    }
+
+
+class _UDPQueryProtocol(asyncio.DatagramProtocol):
+    def __init__(self, query_id: int, future: asyncio.Future):
+        self.query_id = query_id
+        self.future = future
+
+    def datagram_received(self, data, addr):
+        # Ignore stray datagrams that don't match our query id
+        if len(data) >= 2 and struct.unpack("!H", data[:2])[0] == self.query_id and not self.future.done():
+            self.future.set_result(data)
+
+    def error_received(self, exc):
+        if not self.future.done():
+            self.future.set_exception(exc)
+
+    def connection_lost(self, exc):
+        if not self.future.done():
+            self.future.set_exception(exc or ConnectionError("UDP socket closed"))
+
+
+async def _query_udp(server: Tuple[str, int], query: bytes, query_id: int) -> bytes:
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+    transport, _ = await loop.create_datagram_endpoint(
+        lambda: _UDPQueryProtocol(query_id, future),
+        remote_addr=server
+    )
+    try:
+        transport.sendto(query)
+        return await future
+    finally:
+        transport.close()
+
+
+async def _query_tcp(server: Tuple[str, int], query: bytes) -> bytes:
+    reader, writer = await asyncio.open_connection(server[0], server[1])
+    try:
+        writer.write(struct.pack("!H", len(query)) + query)
+        await writer.drain()
+        length = struct.unpack("!H", await reader.readexactly(2))[0]
+        return await reader.readexactly(length)
+    finally:
+        writer.close()
+
+
+async def query(server: Tuple[str, int], hostname: str, qtype: int) -> Dict:
+    """Query one resolver over UDP, retrying over TCP when the answer is truncated"""
+    query_id = random.randint(0, 0xFFFF)
+    message = build_query(hostname, qtype, query_id)
+
+    response = parse_response(await _query_udp(server, message, query_id))
+    if response["truncated"]:
+        response = parse_response(await _query_tcp(server, message))
+        response["transport"] = "tcp"
+    else:
+        response["transport"] = "udp"
+    return response
+
+
+def parse_resolver(value: str) -> Tuple[str, int]:
+    """Parse 'ip', 'ip:port' or '[ipv6]:port'"""
+    value = value.strip()
+    if value.startswith("["):
+        host, _, port = value[1:].partition("]:")
+        return host.rstrip("]"), int(port) if port else DNS_PORT
+    if value.count(":") == 1:
+        host, port = value.split(":")
+        return host, int(port)
+    return value, DNS_PORT
+
+
+_parsed_files = {}
+_parsed_files_lock = threading.Lock()
+
+
+def _read_parsed(path: str, parse: Callable[[str], object]):
+    """parse(path), re-read only when the file's mtime or size changes (a missing file parses once too)"""
+    try:
+        stat = os.stat(path)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        stamp = None
+    key = (path, parse)
+    with _parsed_files_lock:
+        cached = _parsed_files.get(key)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+    value = parse(path)
+    with _parsed_files_lock:
+        _parsed_files[key] = (stamp, value)
+    return value
+
+
+def read_resolv_conf(path: str = None) -> Dict:
+    """nameservers, search domains and ndots from resolv.conf (libc defaults when absent)"""
+    return _read_parsed(path or RESOLV_CONF_PATH, _parse_resolv_conf)
+
+
+def _parse_resolv_conf(path: str) -> Dict:
+    conf = {"nameservers": [], "search": [], "ndots": 1}
+    try:
+        with open(path) as f:
+            for line in f:
+                parts = line.split("#", 1)[0].split()
+                if len(parts) < 2:
+                    continue
+                if parts[0] == "nameserver":
+                    conf["nameservers"].append((parts[1], DNS_PORT))
+                elif parts[0] in ("search", "domain"):
+                    # The last search/domain line wins, as in libc
+                    conf["search"] = [domain.strip(".") for domain in parts[1:] if domain.strip(".")]
+                elif parts[0] == "options":
+                    for option in parts[1:]:
+                        if option.startswith("ndots:") and option[6:].isdigit():
+                            conf["ndots"] = min(int(option[6:]), 15)
+    except OSError:
+        pass
+    return conf
+
+
+def configured_resolvers() -> List[Tuple[str, int]]:
+    """Resolvers from DNS_RESOLVERS (comma separated), else /etc/resolv.conf"""
+    configured = os.getenv("DNS_RESOLVERS", "")
+    if configured.strip():
+        return [parse_resolver(item) for item in configured.split(",") if item.strip()]
+    return list(read_resolv_conf()["nameservers"])
+
+
+def hosts_file_lookup(hostname: str, path: str = None) -> List[str]:
+    """Addresses /etc/hosts gives hostname (IPv4 first); empty when it is not listed"""
+    hosts = _read_parsed(path or HOSTS_PATH, _parse_hosts_file)
+    return list(hosts.get(hostname.rstrip(".").lower(), ()))
+
+
+def _parse_hosts_file(path: str) -> Dict[str, List[str]]:
+    hosts = {}
+    try:
+        with open(path) as f:
+            for line in f:
+                parts = line.split("#", 1)[0].split()
+                for alias in parts[1:]:
+                    addresses = hosts.setdefault(alias.lower(), [])
+                    if parts[0] not in addresses:
+                        addresses.append(parts[0])
+    except OSError:
+        pass
+    for addresses in hosts.values():
+        addresses.sort(key=lambda address: ":" in address)
+    return hosts
+
+
+def search_names(hostname: str, search: List[str], ndots: int) -> List[str]:
+    """
+    Names to query, in resolver order: a trailing dot means absolute; names with at least
+    ndots dots are tried as given first, shorter ones after the search domains
+    """
+    if hostname.endswith("."):
+        return [hostname.rstrip(".")]
+    expanded = [f"{hostname}.{domain}" for domain in search]
+    if hostname.count(".") >= ndots:
+        return [hostname] + expanded
+    return expanded + [hostname]
+
+
+async def _query_resolver(server: Tuple[str, int], hostname: str) -> Dict:
+    """Query A and AAAA on one resolver and time the pair"""
+    start = time.perf_counter()
+    outcomes = await asyncio.gather(
+        query(server, hostname, TYPE_A),
+        query(server, hostname, TYPE_AAAA),
+        return_exceptions=True
+    )
+    latency_ms = round((time.perf_counter() - start) * 1000, 2)
+
+    # A missing AAAA answer must not hide a good A answer (and vice versa)
+    responses = [o for o in outcomes if not isinstance(o, BaseException)]
+    if not responses:
+        raise outcomes[0]
+
+    rcode = responses[0]["rcode"]
+    records = [r for response in responses for r in response["answers"] if r["type"] in ("A", "AAAA")]
+    return {
+        "resolver": f"{server[0]}:{server[1]}",
+        "status": RCODE_NAMES.get(rcode, f"RCODE{rcode}"),
+        "latency_ms": latency_ms,
+        "transport": "tcp" if any(r["transport"] == "tcp" for r in responses) else "udp",
+        "records": records
+    }
+
+
+async def resolve(hostname: str, resolvers: List[Tuple[str, int]] = None,
+                  deadline: float = DNS_QUERY_DEADLINE) -> Dict:
+    """
+    Resolve hostname against every resolver in parallel under a hard deadline
+    Returns as soon as one resolver has records (plus DNS_ANSWER_GRACE_SECONDS for the rest),
+    so a dead nameserver does not cost the whole deadline; resolvers still out are TIMEOUT
+    Returns addresses (A before AAAA), records with TTLs and per-resolver timing
+    Raises DNSLookupError for NXDOMAIN/NODATA and DNSResolverError when nobody answered
+    """
+    resolvers = resolvers if resolvers is not None else configured_resolvers()
+    if not resolvers:
+        raise DNSResolverError("No DNS resolvers configured")
+
+    loop = asyncio.get_running_loop()
+    give_up_at = loop.time() + deadline
+    tasks = [asyncio.ensure_future(_query_resolver(server, hostname)) for server in resolvers]
+    pending = set(tasks)
+    while pending:
+        done, pending = await asyncio.wait(pending, timeout=max(0.0, give_up_at - loop.time()),
+                                           return_when=asyncio.FIRST_COMPLETED)
+        if not done:
+            break
+        if any(_has_records(task) for task in done):
+            grace = min(DNS_ANSWER_GRACE_SECONDS, give_up_at - loop.time())
+            if pending and grace > 0:
+                _, pending = await asyncio.wait(pending, timeout=grace)
+            break
+    for task in pending:
+        task.cancel()
+
+    resolver_reports = []
+    for server, task in zip(resolvers, tasks):
+        if task in pending:
+            resolver_reports.append({"resolver": f"{server[0]}:{server[1]}", "status": "TIMEOUT",
+                                     "latency_ms": None, "records": []})
+        elif task.exception() is not None:
+            resolver_reports.append({"resolver": f"{server[0]}:{server[1]}", "status": "ERROR",
+                                     "latency_ms": None, "error": str(task.exception()), "records": []})
+        else:
+            resolver_reports.append(task.result())
+
+    # Union of answers from every resolver, keeping the lowest TTL per address
+    merged = {}
+    for report in resolver_reports:
+        if report["status"] != "NOERROR":
+            continue
+        for record in report["records"]:
+            key = (record["type"], record["address"])
+            if key not in merged or record["ttl"] < merged[key]["ttl"]:
+                merged[key] = {"type": record["type"], "address": record["address"], "ttl": record["ttl"]}
+
+    records = sorted(merged.values(), key=lambda r: (r["type"] != "A", r["address"]))
+    summary = [{k: v for k, v in report.items() if k != "records"} for report in resolver_reports]
+    statuses = ", ".join(f"{r['resolver']}={r['status']}" for r in summary)
+
+    if records:
+        return {
+            "addresses": [r["address"] for r in records],
+            "ttl": min(r["ttl"] for r in records),
+            "records": records,
+            "resolvers": summary
+        }
+
+    if any(r["status"] == "NXDOMAIN" for r in summary):
+        raise DNSLookupError(f"NXDOMAIN for {hostname} ({statuses})")
+    if any(r["status"] == "NOERROR" for r in summary):
+        raise DNSLookupError(f"No A/AAAA records for {hostname} ({statuses})")
+    raise DNSResolverError(f"No usable answer within {deadline}s ({statuses})")
+
+
+def _has_records(task: asyncio.Future) -> bool:
+    if task.exception() is not None:
+        return False
+    report = task.result()
+    return report["status"] == "NOERROR" and bool(report["records"])
+
+
+async def _bounded_system_lookup(hostname: str) -> Dict:
+    """getaddrinfo under the same deadline as the resolvers"""
+    try:
+        return await asyncio.wait_for(system_lookup(hostname), DNS_QUERY_DEADLINE)
+    except asyncio.TimeoutError:
+        raise DNSResolverError(f"System resolver gave no answer for {hostname} within {DNS_QUERY_DEADLINE}s")
+
+
+async def dns_lookup(hostname: str) -> Dict:
+    """
+    Lookup adapter for DNSCache.resolve, in the system resolver's order:
+    IP literals and /etc/hosts first, then the resolvers with resolv.conf search/ndots
+    NXDOMAIN from the resolvers is final; single-label names (localhost) and hosts without
+    configured resolvers go to the system resolver, bounded by DNS_QUERY_DEADLINE
+    """
+    try:
+        ipaddress.ip_address(hostname)
+        return {"addresses": [hostname], "ttl": None}
+    except ValueError:
+        pass
+
+    addresses = hosts_file_lookup(hostname)
+    if addresses:
+        return {"addresses": addresses, "ttl": None, "source": "hosts"}
+
+    if "." not in hostname.strip("."):
+        return await _bounded_system_lookup(hostname)
+
+    resolvers = configured_resolvers()
+    if not resolvers:
+        logging.warning("No DNS resolvers configured, using system resolver")
+        return await _bounded_system_lookup(hostname)
+
+    conf = read_resolv_conf()
+    first_error = None
+    for name in search_names(hostname, conf["search"], conf["ndots"]):
+        try:
+            answer = await resolve(name, resolvers)
+        except DNSLookupError as e:
+            first_error = first_error or e
+            continue
+        if name != hostname:
+            answer["query_name"] = name
+        return answer
+    raise first_error
@@ -10,17 +10,40 @@ import os
 from datetime import datetime
 
 from diagnostics import NetworkDiagnostics
-from ai_analyzer import AIAnalyzer
-from rca_generator import RCAGenerator
+from rca_generator import parse_report_formats
+from components import (
+    get_ai_analyzer, get_rca_generator, warm_up_in_background, COMPONENTS_WARM_UP,
+    stats as component_stats
+)
+from dns_cache import get_dns_cache
+from analysis_cache import get_analysis_cache, get_analysis_updates
+from llm_usage import get_usage_tracker
+from rate_limiter import get_rate_limiter
+from circuit_breaker import get_ai_breaker
+from incident_index import get_incident_index
+from report_uploader import get_report_uploader
+from report_history import get_report_history, parse_history_query, report_history_stats
+from sse_stream import stream_diagnosis, request_context, format_sse, SSE_HEADERS
+from http_probe import get_connection_pool
+from async_diagnostics import get_event_loop, probe_options
+from batch_diagnostics import (
+    parse_batch_request, run_batch_diagnostics, analyze_fleet,
+    DEFAULT_MAX_CONCURRENCY, DEFAULT_PER_HOST_CONCURRENCY
+)
 
 app = func.FunctionApp(http_auth_level=func.AuthLevel.ANONYMOUS)
 
+# Build shared clients on a background thread while the worker starts, not on the first request
+if COMPONENTS_WARM_UP:
+    warm_up_in_background()
+
 @app.route(route="diagnose", methods=["POST"])
 def diagnose(req: func.HttpRequest) -> func.HttpResponse:
     """
     Main diagnostic endpoint
-    Accepts: { "target": "domain.com", "service_type": "web" }
-    Returns: Full diagnostic results + AI RCA
+    Accepts: { "target": "domain.com", "service_type": "web",
+               "formats": ["text", "executive", "json", "markdown", "html"] (optional) }
+    Returns: Full diagnostic results + AI RCA; only the requested report formats are rendered and uploaded
     """
     logging.info('Network RCA diagnostic request received')
     
@@ -29,6 +52,8 @@ def diagnose(req: func.HttpRequest) -> func.HttpResponse:
         req_body = req.get_json()
         target = req_body.get('target')
         service_type = req_body.get('service_type', 'web')
+        options = probe_options(req_body)  # http_probe_mode, http_fetch_mode, ...
+        formats = parse_report_formats(req_body.get('formats'))
         
         # ENTERPRISE FEATURE 1: Incident Context Awareness
         incident_context = {
@@ -60,11 +85,11 @@ def diagnose(req: func.HttpRequest) -> func.HttpResponse:
         logging.info(f'Recent changes: {recent_changes}')
         
         # Step 1: Run network diagnostics
-        diagnostics = NetworkDiagnostics(target, service_type)
+        diagnostics = NetworkDiagnostics(target, service_type, **options)
         diagnostic_results = diagnostics.run_all_diagnostics()
         
         # Step 2: AI Root Cause Analysis (with enterprise context)
-        ai_analyzer = AIAnalyzer()
+        ai_analyzer = get_ai_analyzer()
         ai_analysis = ai_analyzer.analyze_diagnostics(
             target, 
             diagnostic_results,
@@ -72,39 +97,24 @@ def diagnose(req: func.HttpRequest) -> func.HttpResponse:
             recent_changes=recent_changes
         )
         
-        # Step 3: Generate RCA Report (dual output)
-        rca_generator = RCAGenerator()
-        
-        # Generate both human and machine-readable reports
-        executive_report = rca_generator.generate_executive_report(
-            target=target,
-            diagnostics=diagnostic_results,
-            ai_analysis=ai_analysis,
-            incident_context=incident_context,
-            recent_changes=recent_changes
-        )
-        
-        technical_report_json = rca_generator.generate_technical_report(
+        # Step 3: Generate RCA Reports (one model, only the requested formats)
+        rca_generator = get_rca_generator()
+        generated = rca_generator.generate_reports(
             target=target,
             diagnostics=diagnostic_results,
             ai_analysis=ai_analysis,
             incident_context=incident_context,
-            recent_changes=recent_changes
+            recent_changes=recent_changes,
+            formats=formats
         )
+        reports = generated["reports"]
         
-        # Legacy text report (for backward compatibility)
-        rca_report = rca_generator.generate_report(
-            target=target,
-            diagnostics=diagnostic_results,
-            ai_analysis=ai_analysis,
-            incident_context=incident_context,
-            recent_changes=recent_changes
-        )
+        # Step 4: Store reports in Blob Storage (background; poll report_upload.upload_id)
+        upload = get_report_uploader().submit(rca_generator, reports, target, model=generated["model"])
         
-        # Step 4: Store reports in Blob Storage
-        report_url = rca_generator.save_to_blob(rca_report, target)
-        executive_url = rca_generator.save_to_blob(executive_report, target, suffix='_executive')
-        technical_url = rca_generator.save_technical_json_to_blob(technical_report_json, target)
+        # Step 5: Index the technical RCA in the local history store (/api/reports)
+        history = get_report_history()
+        report_id = history.record(generated["model"]["technical"], upload["report_urls"]) if history else None
         
         # Prepare response
         response = {
@@ -114,14 +124,15 @@ def diagnose(req: func.HttpRequest) -> func.HttpResponse:
             "ai_analysis": ai_analysis,
             "incident_context": incident_context,
             "recent_changes": recent_changes,
-            "rca_report": rca_report,
-            "executive_report": executive_report,
-            "technical_report": technical_report_json,
-            "report_urls": {
-                "technical_text": report_url,
-                "executive_summary": executive_url,
-                "machine_readable_json": technical_url
-            },
+            "rca_report": reports.get("text"),
+            "executive_report": reports.get("executive"),
+            "technical_report": generated["model"]["technical"] if "json" in reports else None,
+            "markdown_report": reports.get("markdown"),
+            "html_report": reports.get("html"),
+            "report_formats": list(formats),
+            "report_urls": upload["report_urls"],
+            "report_upload": upload["report_upload"],
+            "report_id": report_id,
             "status": "success"
         }
         
@@ -159,6 +170,241 @@ def diagnose(req: func.HttpRequest) -> func.HttpResponse:
         )
 
 
+@app.route(route="diagnose/stream", methods=["POST"])
+def diagnose_stream(req: func.HttpRequest) -> func.HttpResponse:
+    """
+    Server-Sent Events variant of /diagnose (same request body)
+    Events: start, diagnostic, diagnostics, ai_token, ai_analysis, reports, done | error
+    NOTE: streaming is Flask-only (app_local). The classic Functions HttpResponse
+    cannot stream, so here every event is buffered and sent as one body when the
+    diagnosis finishes; the frames and their order are the same
+    """
+    logging.info('Network RCA streaming diagnostic request received')
+
+    try:
+        req_body = req.get_json()
+        target = req_body.get('target')
+        if not target:
+            return func.HttpResponse(
+                json.dumps({"error": "Missing 'target' parameter"}),
+                status_code=400,
+                mimetype="application/json"
+            )
+
+        target = target.replace('http://', '').replace('https://', '').strip()
+        diagnostics = NetworkDiagnostics(target, req_body.get('service_type', 'web'), **probe_options(req_body))
+        formats = parse_report_formats(req_body.get('formats'))
+        incident_context, recent_changes = request_context(req_body)
+        events = stream_diagnosis(diagnostics, incident_context, recent_changes, formats)
+
+        return func.HttpResponse(
+            "".join(events),
+            status_code=200,
+            mimetype="text/event-stream",
+            headers=SSE_HEADERS
+        )
+
+    except ValueError as e:
+        logging.error(f'Validation error: {str(e)}')
+        return func.HttpResponse(
+            json.dumps({"error": str(e), "status": "validation_error"}),
+            status_code=400,
+            mimetype="application/json"
+        )
+
+    except Exception as e:
+        # Clients already expect an event stream, so report the failure as one
+        logging.error(f'Streaming diagnosis failed: {str(e)}', exc_info=True)
+        return func.HttpResponse(
+            format_sse("error", {"error": "Internal server error", "details": str(e), "status": "error"}),
+            status_code=500,
+            mimetype="text/event-stream",
+            headers=SSE_HEADERS
+        )
+
+
+@app.route(route="diagnose/batch", methods=["POST"])
+def diagnose_batch(req: func.HttpRequest) -> func.HttpResponse:
+    """
+    Fleet diagnostic endpoint
+    Accepts: { "targets": ["a.com", {"target": "b.com:8080", "service_type": "api"}],
+               "max_concurrency": 200, "per_host_concurrency": 4, "analyze": false, "report": false }
+    Returns: Per-target diagnostic results + fleet summary (+ batched AI analysis when analyze is true,
+             + report_urls/report_upload for the streamed fleet report when report is true)
+    """
+    logging.info('Network RCA batch diagnostic request received')
+
+    try:
+        req_body = req.get_json()
+        specs = parse_batch_request(req_body)
+
+        # Caller may lower the limits but never exceed the configured ceilings
+        max_concurrency = min(int(req_body.get('max_concurrency', DEFAULT_MAX_CONCURRENCY)), DEFAULT_MAX_CONCURRENCY)
+        per_host_concurrency = min(int(req_body.get('per_host_concurrency', DEFAULT_PER_HOST_CONCURRENCY)), DEFAULT_PER_HOST_CONCURRENCY)
+
+        logging.info(f'Running batch diagnostics for {len(specs)} targets')
+
+        batch = run_batch_diagnostics(specs, max_concurrency, per_host_concurrency)
+
+        response = {
+            "timestamp": datetime.utcnow().isoformat(),
+            "results": batch["results"],
+            "summary": batch["summary"],
+            "status": "success"
+        }
+
+        # Optional: one batched AI analysis for all unhealthy targets
+        if req_body.get('analyze'):
+            response["fleet_analysis"] = analyze_fleet(batch, get_ai_analyzer())
+
+        # Optional: fleet report, streamed to storage in the background (poll report_upload.upload_id)
+        if req_body.get('report'):
+            rca_generator = get_rca_generator()
+            response.update(get_report_uploader().submit_plan(
+                rca_generator, rca_generator.plan_fleet_report_upload(batch, response.get("fleet_analysis"))
+            ))
+
+        return func.HttpResponse(
+            json.dumps(response),
+            status_code=200,
+            mimetype="application/json",
+            headers={
+                "Access-Control-Allow-Origin": "*",
+                "Access-Control-Allow-Methods": "POST, OPTIONS",
+                "Access-Control-Allow-Headers": "Content-Type"
+            }
+        )
+
+    except ValueError as e:
+        logging.error(f'Validation error: {str(e)}')
+        return func.HttpResponse(
+            json.dumps({"error": str(e), "status": "validation_error"}),
+            status_code=400,
+            mimetype="application/json"
+        )
+
+    except Exception as e:
+        logging.error(f'Unexpected error: {str(e)}', exc_info=True)
+        return func.HttpResponse(
+            json.dumps({
+                "error": "Internal server error",
+                "details": str(e),
+                "status": "error"
+            }),
+            status_code=500,
+            mimetype="application/json"
+        )
+
+
+@app.route(route="analysis/{analysis_id}", methods=["GET"])
+def analysis_update(req: func.HttpRequest) -> func.HttpResponse:
+    """
+    Poll for the AI answer of a diagnose call that returned the rule-based
+    analysis at the deadline (ai_analysis.ai_pending == true)
+    Returns: { "analysis_id", "status": "pending|complete|failed", "ai_analysis", "error" }
+    """
+    analysis_id = req.route_params.get('analysis_id')
+    update = get_analysis_updates().get(analysis_id)
+
+    if update is None:
+        return func.HttpResponse(
+            json.dumps({"error": f"Unknown or expired analysis_id: {analysis_id}", "status": "not_found"}),
+            status_code=404,
+            mimetype="application/json"
+        )
+
+    return func.HttpResponse(
+        json.dumps(update),
+        status_code=200,
+        mimetype="application/json",
+        headers={"Access-Control-Allow-Origin": "*"}
+    )
+
+
+@app.route(route="uploads/{upload_id}", methods=["GET"])
+def upload_status(req: func.HttpRequest) -> func.HttpResponse:
+    """
+    Poll the background upload of a diagnose call's reports (report_upload.upload_id)
+    Returns: { "upload_id", "status": "pending|complete|failed", "uploads": {report_urls key: {...}} }
+    """
+    upload_id = req.route_params.get('upload_id')
+    status = get_report_uploader().status(upload_id)
+
+    if status is None:
+        return func.HttpResponse(
+            json.dumps({"error": f"Unknown or expired upload_id: {upload_id}", "status": "not_found"}),
+            status_code=404,
+            mimetype="application/json"
+        )
+
+    return func.HttpResponse(
+        json.dumps(status),
+        status_code=200,
+        mimetype="application/json",
+        headers={"Access-Control-Allow-Origin": "*"}
+    )
+
+
+@app.route(route="incidents/{incident_id}/verify", methods=["POST"])
+def verify_incident(req: func.HttpRequest) -> func.HttpResponse:
+    """
+    Confirm (or reject) a stored RCA; verified incidents are reused for near-identical diagnoses
+    Request body (optional): { "verified": true }
+    """
+    incident_id = req.route_params.get('incident_id')
+    try:
+        verified = bool((req.get_json() or {}).get('verified', True))
+    except ValueError:
+        verified = True
+
+    if not get_incident_index().verify(incident_id, verified):
+        return func.HttpResponse(
+            json.dumps({"error": f"Unknown incident_id: {incident_id}", "status": "not_found"}),
+            status_code=404,
+            mimetype="application/json"
+        )
+
+    return func.HttpResponse(
+        json.dumps({"incident_id": incident_id, "verified": verified}),
+        status_code=200,
+        mimetype="application/json",
+        headers={"Access-Control-Allow-Origin": "*"}
+    )
+
+
+@app.route(route="reports", methods=["GET"])
+def query_reports(req: func.HttpRequest) -> func.HttpResponse:
+    """
+    Query the RCA history, newest first
+    Query parameters: target, category, severity, responsible_team, root_cause_category,
+                      since, until (ISO-8601), limit, cursor, include_technical
+    Returns: { "reports": [...], "count", "next_cursor" } (pass next_cursor back for the next page)
+    """
+    history = get_report_history()
+    if history is None:
+        return func.HttpResponse(
+            json.dumps({"error": "Report history is unavailable", "status": "unavailable"}),
+            status_code=503,
+            mimetype="application/json"
+        )
+
+    try:
+        result = history.query(**parse_history_query(req.params))
+    except ValueError as e:
+        return func.HttpResponse(
+            json.dumps({"error": str(e), "status": "validation_error"}),
+            status_code=400,
+            mimetype="application/json"
+        )
+
+    return func.HttpResponse(
+        json.dumps(result),
+        status_code=200,
+        mimetype="application/json",
+        headers={"Access-Control-Allow-Origin": "*"}
+    )
+
+
 @app.route(route="health", methods=["GET"])
 def health_check(req: func.HttpRequest) -> func.HttpResponse:
     """Health check endpoint"""
@@ -166,7 +412,17 @@ def health_check(req: func.HttpRequest) -> func.HttpResponse:
         json.dumps({
             "status": "healthy",
             "service": "Network RCA Platform",
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": datetime.utcnow().isoformat(),
+            "dns_cache": get_dns_cache().stats(),
+            "http_pool": get_connection_pool(get_event_loop()).stats(),
+            "analysis_cache": get_analysis_cache().stats(),
+            "components": component_stats(),
+            "llm_usage": get_usage_tracker().stats(),
+            "ai_rate_limiter": get_rate_limiter().stats(),
+            "ai_circuit_breaker": get_ai_breaker().stats(),
+            "incident_index": get_incident_index().stats(),
+            "report_uploader": get_report_uploader().stats(),
+            "report_history": report_history_stats()
         }),
         status_code=200,
         mimetype="application/json"
@@ -0,0 +1,498 @@
+"""
+HTTP Probe Module
+Minimal asyncio HTTP/1.1 client used by the diagnostics engine
+Keeps a shared, bounded per-host pool of keep-alive connections
+Honours HTTP(S)_PROXY / NO_PROXY and REQUESTS_CA_BUNDLE / CURL_CA_BUNDLE like requests does
+"""
+
+import os
+import asyncio
+import base64
+import ssl
+import threading
+import time
+import weakref
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+from urllib.parse import unquote, urlsplit, urljoin
+from urllib.request import getproxies_environment, proxy_bypass_environment
+
+USER_AGENT = "ai-network-rca/2.0"
+MAX_REDIRECTS = 30
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+
+HTTP_MAX_BODY_BYTES = int(os.getenv("HTTP_MAX_BODY_BYTES", "65536"))
+HTTP_POOL_MAX_PER_HOST = int(os.getenv("HTTP_POOL_MAX_PER_HOST", "4"))
+HTTP_POOL_IDLE_SECONDS = float(os.getenv("HTTP_POOL_IDLE_SECONDS", "30"))
+
+# "warm" reuses pooled connections, "cold" always pays for a new handshake
+PROBE_MODES = ("warm", "cold")
+
+# How much of the response to download:
+#   full    - GET, read the whole body
+#   head    - HEAD request, no body
+#   headers - GET, stop as soon as the headers arrive
+#   capped  - GET, read at most max_body_bytes of the body
+FETCH_MODES = ("full", "head", "headers", "capped")
+
+# Per-request phases, in the order they happen
+PHASES = ("dns_ms", "connect_ms", "tls_ms", "ttfb_ms", "transfer_ms")
+
+
+class HTTPProbeError(Exception):
+    """Generic HTTP probe failure"""
+
+
+class HTTPTimeoutError(HTTPProbeError):
+    """HTTP probe exceeded its deadline"""
+
+
+class HTTPSSLError(HTTPProbeError):
+    """TLS handshake or certificate verification failed"""
+
+
+def _split_url(url: str) -> Tuple[str, str, int, str]:
+    """Return (scheme, host, port, request path) for an absolute URL"""
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    if scheme not in ("http", "https") or not parts.hostname:
+        raise HTTPProbeError(f"Invalid URL: {url}")
+    port = parts.port or (443 if scheme == "https" else 80)
+    path = parts.path or "/"
+    if parts.query:
+        path = f"{path}?{parts.query}"
+    return scheme, parts.hostname, port, path
+
+
+async def _read_headers(reader: asyncio.StreamReader) -> Tuple[int, Dict[str, str], float]:
+    """
+    Read a status line and header block, skipping 1xx interim responses
+    Returns (status_code, headers, perf_counter time the first status line arrived)
+    """
+    first_byte_at = None
+    while True:
+        status_line = await reader.readline()
+        if not status_line:
+            raise HTTPProbeError("Connection closed before response was received")
+        if first_byte_at is None:
+            first_byte_at = time.perf_counter()
+        parts = status_line.decode("latin-1").split(None, 2)
+        if len(parts) < 2 or not parts[0].startswith("HTTP/"):
+            raise HTTPProbeError(f"Malformed status line: {status_line[:80]!r}")
+        status_code = int(parts[1])
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if not 100 <= status_code < 200:
+            return status_code, headers, first_byte_at
+
+
+async def _read_body(reader: asyncio.StreamReader, headers: Dict[str, str],
+                     limit: int = None) -> Tuple[int, bool, bool]:
+    """
+    Drain the response body, stopping after limit bytes when given
+    Returns (bytes received, reusable, truncated)
+    Only a fully consumed, length-delimited body leaves the connection reusable
+    """
+    received = 0
+
+    def _budget(wanted: int) -> int:
+        return wanted if limit is None else min(wanted, limit - received)
+
+    if "chunked" in headers.get("transfer-encoding", "").lower():
+        while True:
+            if limit is not None and received >= limit:
+                return received, False, True
+            size_line = await reader.readline()
+            if not size_line:
+                return received, False, False
+            size = int(size_line.split(b";", 1)[0].strip() or b"0", 16)
+            if size == 0:
+                # Consume trailers up to the terminating blank line
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                return received, True, False
+            if _budget(size) < size:
+                received += len(await reader.read(_budget(size)))
+                return received, False, True
+            await reader.readexactly(size + 2)
+            received += size
+
+    if "content-length" in headers:
+        remaining = int(headers["content-length"])
+        while remaining > 0:
+            if limit is not None and received >= limit:
+                return received, False, True
+            chunk = await reader.read(_budget(min(remaining, 65536)))
+            if not chunk:
+                return received, False, False
+            received += len(chunk)
+            remaining -= len(chunk)
+        return received, True, False
+
+    # Body delimited by connection close
+    while True:
+        if limit is not None and received >= limit:
+            return received, False, True
+        chunk = await reader.read(_budget(65536))
+        if not chunk:
+            return received, False, False
+        received += len(chunk)
+
+
+_ssl_context = None
+_ssl_context_lock = threading.Lock()
+
+
+def _get_ssl_context() -> ssl.SSLContext:
+    """
+    Build the TLS context once; loading CA certificates is not free
+    A custom CA bundle (REQUESTS_CA_BUNDLE, else CURL_CA_BUNDLE) replaces the system store, as in requests
+    """
+    global _ssl_context
+    with _ssl_context_lock:
+        if _ssl_context is None:
+            bundle = os.getenv("REQUESTS_CA_BUNDLE") or os.getenv("CURL_CA_BUNDLE")
+            if bundle and os.path.isdir(bundle):
+                _ssl_context = ssl.create_default_context(capath=bundle)
+            elif bundle:
+                _ssl_context = ssl.create_default_context(cafile=bundle)
+            else:
+                _ssl_context = ssl.create_default_context()
+        return _ssl_context
+
+
+def proxy_for(scheme: str, host: str, port: int) -> Optional[str]:
+    """Proxy URL from the environment (HTTP_PROXY, HTTPS_PROXY, ALL_PROXY) for a request, None if NO_PROXY matches"""
+    proxies = getproxies_environment()
+    proxy = proxies.get(scheme) or proxies.get("all")
+    if not proxy or proxy_bypass_environment(f"{host}:{port}", proxies):
+        return None
+    return proxy if "://" in proxy else f"http://{proxy}"
+
+
+def _proxy_parts(proxy: str) -> Tuple[str, int, Optional[str], str]:
+    """(host, port, Proxy-Authorization value or None, URL without credentials) for an http:// proxy URL"""
+    parts = urlsplit(proxy)
+    if parts.scheme != "http" or not parts.hostname:
+        raise HTTPProbeError(f"Unsupported proxy: {parts.scheme}://{parts.hostname} (only http:// proxies are supported)")
+    port = parts.port or 80
+    authorization = None
+    if parts.username:
+        credentials = f"{unquote(parts.username)}:{unquote(parts.password or '')}"
+        authorization = "Basic " + base64.b64encode(credentials.encode("utf-8")).decode("ascii")
+    return parts.hostname, port, authorization, f"http://{parts.hostname}:{port}"
+
+
+class PooledConnection:
+    def __init__(self, key: Tuple, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.key = key
+        self.reader = reader
+        self.writer = writer
+        self.last_used = time.monotonic()
+
+    def is_usable(self, idle_timeout: float) -> bool:
+        return (not self.writer.is_closing()
+                and not self.reader.at_eof()
+                and time.monotonic() - self.last_used < idle_timeout)
+
+    def close(self):
+        self.writer.close()
+
+
+class ConnectionPool:
+    """
+    Per-host keep-alive connection pool
+    At most max_per_host connections per (scheme, host, port, address) are in use at once
+    """
+
+    def __init__(self, max_per_host: int = HTTP_POOL_MAX_PER_HOST,
+                 idle_timeout: float = HTTP_POOL_IDLE_SECONDS):
+        self.max_per_host = max_per_host
+        self.idle_timeout = idle_timeout
+        self._idle = {}
+        self._limits = {}
+
+        self.connections_opened = 0
+        self.connections_reused = 0
+
+    async def acquire(self, key: Tuple, connect: Callable[[], Awaitable[Tuple]],
+                      fresh: bool = False) -> Tuple[PooledConnection, bool]:
+        """
+        Return (connection, reused)
+        fresh=True skips idle connections so the caller measures a full handshake
+        """
+        limit = self._limits.setdefault(key, asyncio.Semaphore(self.max_per_host))
+        await limit.acquire()
+
+        try:
+            idle = self._idle.get(key, [])
+            while idle and not fresh:
+                conn = idle.pop()
+                if conn.is_usable(self.idle_timeout):
+                    self.connections_reused += 1
+                    return conn, True
+                conn.close()
+
+            reader, writer = await connect()
+            self.connections_opened += 1
+            return PooledConnection(key, reader, writer), False
+
+        except BaseException:
+            limit.release()
+            raise
+
+    def release(self, conn: PooledConnection, reusable: bool):
+        """Return a connection to the pool, or close it"""
+        self._limits[conn.key].release()
+
+        idle = self._idle.setdefault(conn.key, [])
+        if reusable and len(idle) < self.max_per_host and conn.is_usable(self.idle_timeout):
+            conn.last_used = time.monotonic()
+            idle.append(conn)
+        else:
+            conn.close()
+
+    def close_all(self):
+        for idle in self._idle.values():
+            for conn in idle:
+                conn.close()
+        self._idle.clear()
+
+    def stats(self) -> Dict:
+        return {
+            "hosts": len(self._limits),
+            "idle_connections": sum(len(idle) for idle in self._idle.values()),
+            "max_per_host": self.max_per_host,
+            "connections_opened": self.connections_opened,
+            "connections_reused": self.connections_reused
+        }
+
+
+_pools = weakref.WeakKeyDictionary()
+
+
+def get_connection_pool(loop: asyncio.AbstractEventLoop = None) -> ConnectionPool:
+    """Return the shared connection pool for an event loop (default: the running loop)"""
+    loop = loop or asyncio.get_running_loop()
+    pool = _pools.get(loop)
+    if pool is None:
+        pool = _pools[loop] = ConnectionPool()
+    return pool
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 2)
+
+
+def slowest_phase(timings: Dict) -> str:
+    """Name of the phase that took longest, or None"""
+    if not timings:
+        return None
+    measured = {phase: timings.get(phase) or 0 for phase in PHASES}
+    phase = max(measured, key=measured.get)
+    return phase if measured[phase] > 0 else None
+
+
+def http_phase_timings(diagnostics) -> Dict:
+    """Phase timings from the HTTP_STATUS entry of a diagnostics list, or None"""
+    for test in diagnostics:
+        if test.get("test_name") == "HTTP_STATUS" and test.get("details"):
+            return test["details"].get("phase_timings_ms")
+    return None
+
+
+async def _request_once(method: str, url: str, resolve: Callable[[str], Awaitable[str]] = None,
+                        mode: str = "warm", pool: ConnectionPool = None, body_limit: int = None) -> Dict:
+    """
+    Perform a single request (no redirect handling) on a pooled or fresh connection
+    Records DNS, TCP connect, TLS handshake, time-to-first-byte and transfer phases
+    body_limit caps how many body bytes are read (0 = stop after headers)
+    Through a proxy, dns_ms is the proxy's lookup and https connect_ms includes the CONNECT tunnel
+    """
+    scheme, host, port, path = _split_url(url)
+    ssl_context = _get_ssl_context() if scheme == "https" else None
+    pool = pool or get_connection_pool()
+
+    proxy = proxy_for(scheme, host, port)
+    proxy_authorization = None
+    if proxy:
+        # The proxy resolves the target; we only look up the proxy itself
+        dial_host, dial_port, proxy_authorization, proxy = _proxy_parts(proxy)
+    else:
+        dial_host, dial_port = host, port
+
+    # Connect to the pre-resolved address but keep the hostname for SNI and Host
+    dns_start = time.perf_counter()
+    connect_host = await resolve(dial_host) if resolve else dial_host
+    dns_ms = _ms(time.perf_counter() - dns_start)
+    key = (scheme, host, port, connect_host, proxy)
+
+    setup = {}
+    host_header = host if port in (80, 443) else f"{host}:{port}"
+
+    async def _tunnel(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """CONNECT through the proxy to host:port"""
+        writer.write((
+            f"CONNECT {host}:{port} HTTP/1.1\r\n"
+            f"Host: {host}:{port}\r\n"
+            + (f"Proxy-Authorization: {proxy_authorization}\r\n" if proxy_authorization else "")
+            + "\r\n"
+        ).encode("latin-1"))
+        await writer.drain()
+        status_code, _, _ = await _read_headers(reader)
+        if status_code != 200:
+            raise HTTPProbeError(f"Proxy {proxy} refused CONNECT to {host}:{port}: HTTP {status_code}")
+
+    async def _connect():
+        connect_start = time.perf_counter()
+        if ssl_context and not hasattr(asyncio.StreamWriter, "start_tls"):
+            if proxy:
+                raise HTTPProbeError("HTTPS through a proxy needs Python 3.11+")
+            # Python < 3.11 cannot upgrade a stream, so TLS is folded into connect
+            streams = await asyncio.open_connection(connect_host, port, ssl=ssl_context, server_hostname=host)
+            setup.update(connect_ms=_ms(time.perf_counter() - connect_start), tls_ms=None)
+            return streams
+
+        reader, writer = await asyncio.open_connection(connect_host, dial_port)
+        try:
+            if proxy and ssl_context:
+                await _tunnel(reader, writer)
+            tls_start = time.perf_counter()
+            setup["connect_ms"] = _ms(tls_start - connect_start)
+            if ssl_context:
+                await writer.start_tls(ssl_context, server_hostname=host)
+        except BaseException:
+            writer.close()
+            raise
+        setup["tls_ms"] = _ms(time.perf_counter() - tls_start) if ssl_context else 0.0
+        return reader, writer
+
+    # Plain HTTP through a proxy is sent to the proxy in absolute form
+    target = f"{scheme}://{host_header}{path}" if proxy and not ssl_context else path
+    request = (
+        f"{method} {target} HTTP/1.1\r\n"
+        f"Host: {host_header}\r\n"
+        + (f"Proxy-Authorization: {proxy_authorization}\r\n" if proxy_authorization and not ssl_context else "")
+        + f"User-Agent: {USER_AGENT}\r\n"
+        "Accept: */*\r\n"
+        "Accept-Encoding: identity\r\n"
+        "Connection: keep-alive\r\n"
+        "\r\n"
+    ).encode("latin-1")
+
+    fresh = mode == "cold"
+    while True:
+        start = time.perf_counter()
+        setup.clear()
+        conn, reused = await pool.acquire(key, _connect, fresh=fresh)
+        reusable = False
+
+        try:
+            try:
+                request_sent_at = time.perf_counter()
+                conn.writer.write(request)
+                await conn.writer.drain()
+                status_code, headers, first_byte_at = await _read_headers(conn.reader)
+            except (HTTPProbeError, ConnectionError, asyncio.IncompleteReadError):
+                # The server may have dropped an idle keep-alive connection (reset on write,
+                # EOF on read); retry once fresh
+                if reused:
+                    fresh = True
+                    continue
+                raise
+            headers_at = time.perf_counter()
+
+            body_bytes, complete, truncated = 0, True, False
+            if method != "HEAD" and status_code not in (204, 304):
+                body_bytes, complete, truncated = await _read_body(conn.reader, headers, body_limit)
+            finished_at = time.perf_counter()
+
+            reusable = complete and headers.get("connection", "").lower() != "close"
+
+            return {
+                "url": url,
+                "status_code": status_code,
+                "headers": headers,
+                "elapsed_ms": _ms(headers_at - start),
+                "body_bytes": body_bytes,
+                "body_truncated": truncated,
+                "probe_mode": mode,
+                "connection_reused": reused,
+                "proxy": proxy,
+                "timings": {
+                    "dns_ms": dns_ms,
+                    # Reused connections skip connect and TLS entirely
+                    "connect_ms": setup.get("connect_ms", 0.0),
+                    "tls_ms": setup.get("tls_ms", 0.0),
+                    "ttfb_ms": _ms(first_byte_at - request_sent_at),
+                    "transfer_ms": _ms(finished_at - headers_at),
+                    "total_ms": _ms(finished_at - start) + dns_ms
+                }
+            }
+        finally:
+            pool.release(conn, reusable)
+
+
+async def fetch(url: str, method: str = None, timeout: float = 10,
+                allow_redirects: bool = True, max_redirects: int = MAX_REDIRECTS,
+                resolve: Callable[[str], Awaitable[str]] = None,
+                mode: str = "warm", pool: ConnectionPool = None,
+                fetch_mode: str = "full", max_body_bytes: int = HTTP_MAX_BODY_BYTES) -> Dict:
+    """
+    Fetch a URL, optionally following redirects
+    The timeout is a hard deadline for the whole exchange
+    resolve(hostname) -> IP lets callers supply cached addresses for every hop
+    mode="warm" reuses pooled keep-alive connections, mode="cold" forces a new one
+    fetch_mode controls how much body is downloaded (see FETCH_MODES)
+    Response "timings" hold per-phase totals (ms) across all redirect hops and
+    "redirects" lists each intermediate hop with its own timings
+    Raises HTTPTimeoutError, HTTPSSLError or HTTPProbeError
+    """
+    if mode not in PROBE_MODES:
+        raise ValueError(f"Invalid probe mode: {mode} (expected one of {', '.join(PROBE_MODES)})")
+    if fetch_mode not in FETCH_MODES:
+        raise ValueError(f"Invalid fetch mode: {fetch_mode} (expected one of {', '.join(FETCH_MODES)})")
+
+    method = method or ("HEAD" if fetch_mode == "head" else "GET")
+    body_limit = {"headers": 0, "capped": max_body_bytes}.get(fetch_mode)
+
+    async def _follow() -> Dict:
+        current_url = url
+        totals = dict.fromkeys(PHASES + ("total_ms",), 0.0)
+        redirects = []
+        for _ in range(max_redirects + 1):
+            response = await _request_once(method, current_url, resolve, mode, pool, body_limit)
+
+            # Phase totals across the whole redirect chain
+            for phase, value in response["timings"].items():
+                totals[phase] = None if value is None or totals[phase] is None else round(totals[phase] + value, 2)
+
+            location = response["headers"].get("location")
+            if not allow_redirects or response["status_code"] not in REDIRECT_CODES or not location:
+                response["timings"] = totals
+                response["redirects"] = redirects
+                response["fetch_mode"] = fetch_mode
+                return response
+
+            redirects.append({
+                "url": current_url,
+                "status_code": response["status_code"],
+                "location": location,
+                "connection_reused": response["connection_reused"],
+                "timings": response["timings"]
+            })
+            current_url = urljoin(current_url, location)
+        raise HTTPProbeError(f"Exceeded {max_redirects} redirects.")
+
+    try:
+        return await asyncio.wait_for(_follow(), timeout=timeout)
+    except asyncio.TimeoutError:
+        raise HTTPTimeoutError("HTTP request timeout")
+    except (ssl.SSLError, ssl.CertificateError) as e:
+        raise HTTPSSLError(str(e))
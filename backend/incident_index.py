@@ -0,0 +1,280 @@
+"""
+Incident Index Module
+Feature vectors of completed RCAs with vectorized cosine kNN search, so a new
+diagnosis can reuse a verified past answer or show the LLM similar incidents
+"""
+
+import os
+import json
+import math
+import time
+import uuid
+import copy
+import logging
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from analysis_cache import CHANGE_FLAGS, DebouncedWriter, failure_class, latency_bucket
+
+INCIDENT_INDEX_MAX_ENTRIES = int(os.getenv("INCIDENT_INDEX_MAX_ENTRIES", "5000"))
+# Optional JSON file that survives restarts; empty disables persistence
+INCIDENT_INDEX_PATH = os.getenv("INCIDENT_INDEX_PATH", "")
+# Changes are written to the file at most this often, off the request thread; 0 writes on every change
+INCIDENT_INDEX_FLUSH_SECONDS = float(os.getenv("INCIDENT_INDEX_FLUSH_SECONDS", "5"))
+# A verified neighbour at least this similar, with the same latency buckets, is reused instead of calling the LLM
+INCIDENT_REUSE_SIMILARITY = float(os.getenv("INCIDENT_REUSE_SIMILARITY", "0.98"))
+# Neighbours attached to the prompt, and the least similarity worth showing
+INCIDENT_PROMPT_NEIGHBOURS = int(os.getenv("INCIDENT_PROMPT_NEIGHBOURS", "3"))
+INCIDENT_PROMPT_MIN_SIMILARITY = float(os.getenv("INCIDENT_PROMPT_MIN_SIMILARITY", "0.8"))
+
+FEATURE_TESTS = ("DNS_RESOLUTION", "TCP_CONNECTIVITY", "HTTP_STATUS", "LATENCY_CHECK")
+# The legacy pipeline reports a skipped latency check as LATENCY
+TEST_ALIASES = {"LATENCY": "LATENCY_CHECK"}
+FEATURE_STATUSES = ("PASS", "FAIL", "INFERRED_FAIL")
+FEATURE_FAILURE_CLASSES = (
+    "inferred", "dns_nxdomain", "dns_error", "tls", "timeout", "port_closed",
+    "unreachable", "connection_reset", "http_4xx", "http_5xx", "other"
+)
+# Latency is log-scaled so 20ms vs 40ms matters as much as 500ms vs 1000ms
+LATENCY_SCALE_MS = 10000.0
+
+# Block weights: which test failed, and how, matters most; latency is weighted so that
+# an all-PASS diagnosis at 20ms and one at 800ms are not near-duplicates (cosine ~0.93)
+STATUS_WEIGHT = 2.0
+FAILURE_CLASS_WEIGHT = 1.5
+LATENCY_WEIGHT = 3.0
+CHANGE_WEIGHT = 1.0
+
+_PER_TEST = len(FEATURE_STATUSES) + 1 + len(FEATURE_FAILURE_CLASSES)
+FEATURE_DIMENSIONS = len(FEATURE_TESTS) * _PER_TEST + len(CHANGE_FLAGS)
+
+
+def feature_vector(diagnostics: List[Dict], recent_changes: Dict = None) -> np.ndarray:
+    """
+    Fixed-width vector per diagnosis: for each test a status one-hot, log latency
+    and failure-class one-hot, followed by the change flags
+    """
+    vector = np.zeros(FEATURE_DIMENSIONS, dtype=np.float32)
+    for test in diagnostics:
+        name = TEST_ALIASES.get(test.get("test_name"), test.get("test_name"))
+        if name not in FEATURE_TESTS:
+            continue
+        offset = FEATURE_TESTS.index(name) * _PER_TEST
+
+        status = test.get("status")
+        if status in FEATURE_STATUSES:
+            vector[offset + FEATURE_STATUSES.index(status)] = STATUS_WEIGHT
+        offset += len(FEATURE_STATUSES)
+
+        latency = test.get("latency_ms") or 0
+        if status == "PASS" and latency > 0:
+            vector[offset] = LATENCY_WEIGHT * min(1.0, math.log1p(latency) / math.log1p(LATENCY_SCALE_MS))
+        offset += 1
+
+        failure = failure_class(test.get("failure_reason"))
+        if failure in FEATURE_FAILURE_CLASSES:
+            vector[offset + FEATURE_FAILURE_CLASSES.index(failure)] = FAILURE_CLASS_WEIGHT
+
+    offset = len(FEATURE_TESTS) * _PER_TEST
+    recent_changes = recent_changes or {}
+    for index, flag in enumerate(CHANGE_FLAGS):
+        if recent_changes.get(flag):
+            vector[offset + index] = CHANGE_WEIGHT
+    return vector
+
+
+def latency_profile(diagnostics: List[Dict]) -> List:
+    """Latency bucket of each passing feature test (None otherwise), in FEATURE_TESTS order"""
+    profile = [None] * len(FEATURE_TESTS)
+    for test in diagnostics:
+        name = TEST_ALIASES.get(test.get("test_name"), test.get("test_name"))
+        if name in FEATURE_TESTS and test.get("status") == "PASS":
+            profile[FEATURE_TESTS.index(name)] = latency_bucket(test.get("latency_ms"))
+    return profile
+
+
+def incident_summary(diagnostics: List[Dict]) -> str:
+    """Compact one-line view of a diagnosis, e.g. 'DNS_RESOLUTION=PASS(12ms) TCP_CONNECTIVITY=FAIL(timeout)'"""
+    parts = []
+    for test in diagnostics:
+        if test.get("status") == "PASS":
+            parts.append(f"{test.get('test_name')}=PASS({round(test.get('latency_ms') or 0)}ms)")
+        else:
+            parts.append(f"{test.get('test_name')}={test.get('status')}({failure_class(test.get('failure_reason')) or '-'})")
+    return " ".join(parts)
+
+
+class IncidentIndex:
+    def __init__(self, max_entries: int = INCIDENT_INDEX_MAX_ENTRIES, path: str = INCIDENT_INDEX_PATH,
+                 flush_delay: float = INCIDENT_INDEX_FLUSH_SECONDS):
+        self.max_entries = max(1, max_entries)
+        self.path = path or None
+
+        # Unit-normalised rows, so cosine similarity is one matrix-vector product
+        self._matrix = np.zeros((min(self.max_entries, 64), FEATURE_DIMENSIONS), dtype=np.float32)
+        # Slot i describes row i; once full, rows are a ring and _head is the oldest slot
+        self._entries = []
+        self._head = 0
+        self._lock = threading.Lock()
+
+        self.searches = 0
+        self.reuses = 0
+
+        self._writer = None
+        if self.path:
+            self._load()
+            self._writer = DebouncedWriter(self.path, self._lock, self._snapshot, flush_delay, "incident index",
+                                           encode=self._encode)
+
+    def _append(self, unit: np.ndarray, entry: Dict):
+        """Add one row, growing the matrix or overwriting the oldest slot at capacity; caller holds the lock"""
+        if len(self._entries) >= self.max_entries:
+            self._matrix[self._head] = unit
+            self._entries[self._head] = entry
+            self._head = (self._head + 1) % self.max_entries
+            return
+        if len(self._entries) == self._matrix.shape[0]:
+            grown = np.zeros((min(self.max_entries, 2 * self._matrix.shape[0]), FEATURE_DIMENSIONS), dtype=np.float32)
+            grown[:len(self._entries)] = self._matrix[:len(self._entries)]
+            self._matrix = grown
+        self._matrix[len(self._entries)] = unit
+        self._entries.append(entry)
+
+    def add(self, target: str, diagnostics: List[Dict], analysis: Dict, recent_changes: Dict = None,
+            verified: bool = False) -> Optional[str]:
+        """
+        Index one completed RCA; returns its incident_id
+        Only verified incidents are reused, and AI answers start unverified: confidence
+        is the model's own opinion, so confirmation comes through verify()
+        """
+        vector = feature_vector(diagnostics, recent_changes)
+        norm = float(np.linalg.norm(vector))
+        if norm == 0:
+            return None
+
+        entry = {
+            "incident_id": uuid.uuid4().hex,
+            "target": target,
+            "summary": incident_summary(diagnostics),
+            "latency_buckets": latency_profile(diagnostics),
+            "analysis": copy.deepcopy(analysis),
+            "verified": bool(verified),
+            "created_at": time.time()
+        }
+        with self._lock:
+            self._append(vector / norm, entry)
+        if self._writer:
+            self._writer.mark_dirty()
+        return entry["incident_id"]
+
+    def verify(self, incident_id: str, verified: bool = True) -> bool:
+        """Mark a stored RCA as confirmed (or not); False if the id is unknown"""
+        with self._lock:
+            entry = next((entry for entry in self._entries if entry["incident_id"] == incident_id), None)
+            if entry is None:
+                return False
+            entry["verified"] = verified
+        if self._writer:
+            self._writer.mark_dirty()
+        return True
+
+    def flush(self):
+        """Write pending changes to the index file now"""
+        if self._writer:
+            self._writer.flush()
+
+    def search(self, diagnostics: List[Dict], recent_changes: Dict = None, k: int = INCIDENT_PROMPT_NEIGHBOURS,
+               min_similarity: float = 0.0) -> List[Dict]:
+        """Top-k most similar past incidents, most similar first"""
+        vector = feature_vector(diagnostics, recent_changes)
+        norm = float(np.linalg.norm(vector))
+        with self._lock:
+            self.searches += 1
+            count = len(self._entries)
+            if norm == 0 or count == 0 or k <= 0:
+                return []
+
+            similarities = self._matrix[:count] @ (vector / norm)
+            k = min(k, count)
+            top = np.argpartition(-similarities, k - 1)[:k]
+            top = top[np.argsort(-similarities[top], kind="stable")]
+            return [
+                dict(copy.deepcopy(self._entries[i]), similarity=round(float(similarities[i]), 4))
+                for i in top if similarities[i] >= min_similarity
+            ]
+
+    def reusable(self, neighbours: List[Dict], diagnostics: List[Dict],
+                 threshold: float = INCIDENT_REUSE_SIMILARITY) -> Optional[Dict]:
+        """
+        The closest verified neighbour, if it is close enough to reuse its analysis
+        It must also fall in the same latency buckets, so a fast and a slow target
+        never share an answer however similar their status vectors are
+        """
+        profile = latency_profile(diagnostics)
+        for neighbour in neighbours:
+            if (neighbour["verified"] and neighbour["similarity"] >= threshold
+                    and neighbour.get("latency_buckets") == profile):
+                with self._lock:
+                    self.reuses += 1
+                return neighbour
+        return None
+
+    def _load(self):
+        """Load persisted incidents"""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring unreadable incident index {self.path}: {str(e)}")
+            return
+
+        for item in stored.get("incidents", [])[-self.max_entries:]:
+            vector = np.asarray(item.pop("vector"), dtype=np.float32)
+            if vector.shape != (FEATURE_DIMENSIONS,):
+                continue  # Written with a different feature layout
+            self._append(vector, item)
+        logging.info(f"Loaded {len(self._entries)} indexed incidents from {self.path}")
+
+    def _snapshot(self):
+        """Copies of the incidents and their rows, oldest first, for the writer; caller holds the lock"""
+        order = list(range(self._head, len(self._entries))) + list(range(self._head))
+        return [dict(self._entries[i]) for i in order], self._matrix[order]
+
+    @staticmethod
+    def _encode(snapshot) -> Dict:
+        """The file layout; runs in the writer, outside the lock"""
+        entries, vectors = snapshot
+        return {"incidents": [
+            dict(entry, vector=[round(float(x), 6) for x in vector]) for entry, vector in zip(entries, vectors)
+        ]}
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "incidents": len(self._entries),
+                "verified": sum(1 for entry in self._entries if entry["verified"]),
+                "max_entries": self.max_entries,
+                "dimensions": FEATURE_DIMENSIONS,
+                "persistent": bool(self.path),
+                "writes": self._writer.writes if self._writer else 0,
+                "searches": self.searches,
+                "reuses": self.reuses,
+                "reuse_similarity": INCIDENT_REUSE_SIMILARITY
+            }
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_incident_index() -> IncidentIndex:
+    """Return the process-wide incident index"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = IncidentIndex()
+        return _index
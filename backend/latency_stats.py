@@ -0,0 +1,157 @@
+"""
+Latency Statistics Module
+Streaming estimators for latency samples: mean/stddev (Welford),
+percentiles (P-square) and jitter, in constant memory
+"""
+
+import math
+from typing import Dict
+
+
+class P2Quantile:
+    """
+    P-square quantile estimator (Jain & Chlamtac, 1985)
+    Tracks one quantile with five markers; exact for the first five samples
+    """
+
+    def __init__(self, p: float):
+        self.p = p
+        self.heights = []
+        self.positions = [1, 2, 3, 4, 5]
+        self.desired = [1, 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5]
+        self.increments = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def add(self, x: float):
+        heights = self.heights
+        if len(heights) < 5:
+            heights.append(x)
+            heights.sort()
+            return
+
+        # Locate the cell containing x, stretching the extremes if needed
+        if x < heights[0]:
+            heights[0] = x
+            k = 0
+        elif x >= heights[4]:
+            heights[4] = x
+            k = 3
+        else:
+            k = next(i for i in range(4) if heights[i] <= x < heights[i + 1])
+
+        for i in range(k + 1, 5):
+            self.positions[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+
+        # Nudge the three middle markers towards their desired positions
+        n = self.positions
+        for i in range(1, 4):
+            d = self.desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                step = 1 if d > 0 else -1
+                candidate = heights[i] + step / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + step) * (heights[i + 1] - heights[i]) / (n[i + 1] - n[i])
+                    + (n[i + 1] - n[i] - step) * (heights[i] - heights[i - 1]) / (n[i] - n[i - 1])
+                )
+                if heights[i - 1] < candidate < heights[i + 1]:
+                    heights[i] = candidate
+                else:
+                    heights[i] += step * (heights[i + step] - heights[i]) / (n[i + step] - n[i])
+                n[i] += step
+
+    def value(self) -> float:
+        heights = self.heights
+        if not heights:
+            return None
+        if len(heights) < 5 or self.positions[4] == 5:
+            # Exact linear-interpolated percentile over what we have
+            rank = self.p * (len(heights) - 1)
+            low = int(math.floor(rank))
+            high = min(low + 1, len(heights) - 1)
+            return heights[low] + (heights[high] - heights[low]) * (rank - low)
+        return heights[2]
+
+
+class StreamingStats:
+    """Constant-memory latency summary fed one sample at a time"""
+
+    def __init__(self, quantiles=(0.5, 0.9, 0.99)):
+        self.count = 0
+        self.lost = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.minimum = None
+        self.maximum = None
+        self._last = None
+        self._jitter_sum = 0.0
+        self._jitter_pairs = 0
+        # Samples that finished ahead of an earlier-sent one, by sequence number
+        self._pending = {}
+        self._next_seq = 0
+        self._quantiles = {q: P2Quantile(q) for q in quantiles}
+
+    def add(self, value: float, seq: int = None):
+        """
+        Record a successful sample (ms)
+        seq is the send order (0, 1, ...); pass it when samples complete out of order
+        """
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+
+        self.minimum = value if self.minimum is None else min(self.minimum, value)
+        self.maximum = value if self.maximum is None else max(self.maximum, value)
+
+        for estimator in self._quantiles.values():
+            estimator.add(value)
+
+        self._sequence(seq, value)
+
+    def add_loss(self, seq: int = None):
+        """Record a sample that got no answer"""
+        self.lost += 1
+        self._sequence(seq, None)
+
+    def _sequence(self, seq: int, value: float):
+        """
+        Jitter runs over send order, not completion order (concurrent samples finish
+        fastest-first); early arrivals wait in a buffer no larger than the concurrency
+        """
+        if seq is None:
+            self._jitter_step(value)
+            return
+        self._pending[seq] = value
+        while self._next_seq in self._pending:
+            self._jitter_step(self._pending.pop(self._next_seq))
+            self._next_seq += 1
+
+    def _jitter_step(self, value: float):
+        # Jitter: mean absolute difference between consecutive answered samples
+        if value is None:
+            return
+        if self._last is not None:
+            self._jitter_sum += abs(value - self._last)
+            self._jitter_pairs += 1
+        self._last = value
+
+    def summary(self) -> Dict:
+        sent = self.count + self.lost
+        stddev = math.sqrt(self._m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+        def _round(value):
+            return round(value, 2) if value is not None else None
+
+        summary = {
+            "samples_sent": sent,
+            "samples": self.count,
+            "loss_pct": round(100.0 * self.lost / sent, 2) if sent else 0.0,
+            "avg_ms": _round(self.mean) if self.count else None,
+            "min_ms": _round(self.minimum),
+            "max_ms": _round(self.maximum),
+            "stddev_ms": _round(stddev),
+            "jitter_ms": _round(self._jitter_sum / self._jitter_pairs) if self._jitter_pairs else 0.0
+        }
+        for q, estimator in self._quantiles.items():
+            summary[f"p{int(round(q * 100))}_ms"] = _round(estimator.value())
+        return summary
@@ -0,0 +1,96 @@
+"""
+LLM Usage Module
+Per-call and aggregate accounting of prompt/completion tokens and latency
+"""
+
+import threading
+import time
+from typing import Dict
+
+
+def call_usage(response, latency_ms: float, prompt_estimate: int = None, completion_estimate: int = None) -> Dict:
+    """Usage for one chat completion, from the API's usage block when present"""
+    usage = getattr(response, "usage", None)
+    prompt_tokens = getattr(usage, "prompt_tokens", None)
+    completion_tokens = getattr(usage, "completion_tokens", None)
+    if completion_tokens is None:
+        completion_tokens = completion_estimate
+    return {
+        "prompt_tokens": prompt_tokens if prompt_tokens is not None else prompt_estimate,
+        "completion_tokens": completion_tokens or 0,
+        "total_tokens": (prompt_tokens if prompt_tokens is not None else prompt_estimate or 0) + (completion_tokens or 0),
+        "prompt_tokens_estimated": prompt_tokens is None,
+        "latency_ms": round(latency_ms, 2)
+    }
+
+
+def merge_usage(usages) -> Dict:
+    """Sum several call usages (e.g. the chunks of a batch analysis)"""
+    usages = [u for u in usages if u]
+    return {
+        "calls": len(usages),
+        "prompt_tokens": sum(u["prompt_tokens"] or 0 for u in usages),
+        "completion_tokens": sum(u["completion_tokens"] for u in usages),
+        "total_tokens": sum(u["total_tokens"] for u in usages),
+        "latency_ms": round(max((u["latency_ms"] for u in usages), default=0.0), 2)
+    }
+
+
+class UsageTracker:
+    """Process-wide counters, grouped by operation (single, batch, ...)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._operations = {}
+        self.started_at = time.time()
+
+    def record(self, operation: str, usage: Dict = None, error: bool = False):
+        with self._lock:
+            counters = self._operations.setdefault(operation, {
+                "calls": 0,
+                "errors": 0,
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+                "total_tokens": 0,
+                "latency_ms_total": 0.0,
+                "latency_ms_max": 0.0
+            })
+            counters["calls"] += 1
+            if error or usage is None:
+                counters["errors"] += 1
+                return
+            counters["prompt_tokens"] += usage["prompt_tokens"] or 0
+            counters["completion_tokens"] += usage["completion_tokens"]
+            counters["total_tokens"] += usage["total_tokens"]
+            counters["latency_ms_total"] += usage["latency_ms"]
+            counters["latency_ms_max"] = max(counters["latency_ms_max"], usage["latency_ms"])
+
+    def stats(self) -> Dict:
+        with self._lock:
+            operations = {}
+            for name, counters in self._operations.items():
+                succeeded = counters["calls"] - counters["errors"]
+                operations[name] = dict(
+                    counters,
+                    latency_ms_total=round(counters["latency_ms_total"], 2),
+                    latency_ms_avg=round(counters["latency_ms_total"] / succeeded, 2) if succeeded else 0.0
+                )
+            return {
+                "since": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(self.started_at)),
+                "total_tokens": sum(c["total_tokens"] for c in operations.values()),
+                "calls": sum(c["calls"] for c in operations.values()),
+                "operations": operations
+            }
+
+
+_tracker = None
+_tracker_lock = threading.Lock()
+
+
+def get_usage_tracker() -> UsageTracker:
+    """Return the process-wide usage tracker"""
+    global _tracker
+    with _tracker_lock:
+        if _tracker is None:
+            _tracker = UsageTracker()
+        return _tracker
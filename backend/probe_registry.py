@@ -0,0 +1,143 @@
+"""
+Probe Registry Module
+Diagnostic probes declare what they depend on; the scheduler runs independent
+branches concurrently and infers downstream failures from the dependency graph
+"""
+
+import asyncio
+import time
+import logging
+import threading
+from typing import Awaitable, Callable, Dict, List, Tuple
+
+FAILED_STATUSES = ("FAIL", "INFERRED_FAIL")
+
+
+class Probe:
+    """One registered diagnostic step"""
+
+    def __init__(self, name: str, run: Callable[..., Awaitable[Dict]], depends_on: Tuple[str, ...] = (),
+                 inferred_name: str = None, failure_reason: str = None, enabled: Callable[..., bool] = None):
+        self.name = name
+        self.run = run
+        self.depends_on = tuple(depends_on)
+        # Name reported when the probe is skipped (the legacy pipeline used 'LATENCY' for LATENCY_CHECK)
+        self.inferred_name = inferred_name or name
+        # Root-cause text given to dependants when this probe fails
+        self.failure_reason = failure_reason or f"{name} failed"
+        self.enabled = enabled
+
+
+class ProbeRegistry:
+    """Ordered set of probes; registration order is the result order"""
+
+    def __init__(self):
+        self._probes = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, run: Callable[..., Awaitable[Dict]], depends_on: Tuple[str, ...] = (),
+                 inferred_name: str = None, failure_reason: str = None,
+                 enabled: Callable[..., bool] = None) -> Probe:
+        """
+        Add a probe. run(engine) must return a result dict
+        Dependencies must already be registered, which keeps the graph acyclic
+        """
+        with self._lock:
+            if name in self._probes:
+                raise ValueError(f"Probe already registered: {name}")
+            missing = [dep for dep in depends_on if dep not in self._probes]
+            if missing:
+                raise ValueError(f"Probe {name} depends on unregistered probes: {', '.join(missing)}")
+
+            probe = Probe(name, run, depends_on, inferred_name, failure_reason, enabled)
+            self._probes[name] = probe
+            return probe
+
+    def unregister(self, name: str):
+        with self._lock:
+            dependants = [p.name for p in self._probes.values() if name in p.depends_on]
+            if dependants:
+                raise ValueError(f"Probe {name} is required by: {', '.join(dependants)}")
+            self._probes.pop(name, None)
+
+    def probes(self) -> List[Probe]:
+        with self._lock:
+            return list(self._probes.values())
+
+
+def _inferred(probe: Probe, reason: str) -> Dict:
+    """Create inferred failure result"""
+    return {
+        "test_name": probe.inferred_name,
+        "status": "INFERRED_FAIL",
+        "latency_ms": 0,
+        "details": None,
+        "failure_reason": f"Inferred failure: {reason}"
+    }
+
+
+async def run_probe_graph(engine, registry: ProbeRegistry,
+                          on_result: Callable[[Dict], None] = None) -> List[Dict]:
+    """
+    Run every enabled probe as soon as its dependencies have passed
+    A failed dependency short-circuits its dependants with INFERRED_FAIL,
+    carrying the root cause (e.g. 'DNS resolution failed') down the graph
+    on_result(result) is called as each probe finishes (completion order)
+    """
+    probes = [p for p in registry.probes() if p.enabled is None or p.enabled(engine)]
+    tasks = {}
+    root_causes = {p.name: p.failure_reason for p in probes}
+
+    async def _run(probe: Probe) -> Dict:
+        result = await _evaluate(probe)
+        if on_result is not None:
+            try:
+                on_result(result)
+            except Exception as e:
+                logging.error(f"Probe result callback failed for {probe.name}: {str(e)}")
+        return result
+
+    async def _evaluate(probe: Probe) -> Dict:
+        for dep in probe.depends_on:
+            if dep not in tasks:
+                # Disabled dependency: nothing to wait for
+                continue
+            result = await tasks[dep]
+            if result["status"] in FAILED_STATUSES:
+                # Dependants of a skipped probe inherit its root cause
+                root_causes[probe.name] = root_causes[dep]
+                return _inferred(probe, root_causes[dep])
+
+        start = time.perf_counter()
+        try:
+            return await probe.run(engine)
+        except Exception as e:
+            # A broken plug-in probe must not take the whole run down
+            logging.error(f"Probe {probe.name} raised: {str(e)}")
+            return {
+                "test_name": probe.name,
+                "status": "FAIL",
+                "latency_ms": round((time.perf_counter() - start) * 1000, 2),
+                "details": None,
+                "failure_reason": str(e)
+            }
+
+    # Registration order is a topological order, so every dependency task exists first
+    for probe in probes:
+        tasks[probe.name] = asyncio.ensure_future(_run(probe))
+
+    return list(await asyncio.gather(*tasks.values()))
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_probe_registry() -> ProbeRegistry:
+    """Process-wide registry used by AsyncNetworkDiagnostics"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ProbeRegistry()
+    return _registry
@@ -0,0 +1,138 @@
+"""
+Prompt Encoder Module
+Compact, token-budgeted encoding of diagnostic results for LLM prompts
+"""
+
+import os
+import json
+from typing import Dict, List
+
+AI_PROMPT_TOKEN_BUDGET = int(os.getenv("AI_PROMPT_TOKEN_BUDGET", "1500"))
+PROMPT_MAX_REASON_CHARS = int(os.getenv("PROMPT_MAX_REASON_CHARS", "160"))
+PROMPT_MAX_STRING_CHARS = 120
+PROMPT_MAX_LIST_ITEMS = 8
+
+# Per-test detail keys that are large and rarely change the verdict; dropped first
+BULKY_DETAIL_KEYS = ("results", "redirects", "records", "resolvers", "addresses", "by_port")
+
+# Dropped from every object, in this order, when JSON still has to shrink to fit a budget
+LOW_PRIORITY_FIELDS = ("details", "latency_ms", "failure_reason")
+
+TRUNCATION_MARKER = "...[truncated]"
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for English/JSON)"""
+    return (len(text) + 3) // 4
+
+
+def truncate(text: str, limit: int) -> str:
+    text = str(text)
+    if len(text) <= limit:
+        return text
+    return text[:max(0, limit - len(TRUNCATION_MARKER))] + TRUNCATION_MARKER
+
+
+def compact(value):
+    """Drop None/empty values, shorten long strings and lists, recursively"""
+    if isinstance(value, dict):
+        result = {}
+        for key, item in value.items():
+            item = compact(item)
+            if item is None or item == "" or item == [] or item == {}:
+                continue
+            result[key] = item
+        return result
+    if isinstance(value, list):
+        items = [compact(item) for item in value[:PROMPT_MAX_LIST_ITEMS]]
+        if len(value) > PROMPT_MAX_LIST_ITEMS:
+            items.append(f"+{len(value) - PROMPT_MAX_LIST_ITEMS} more")
+        return items
+    if isinstance(value, float):
+        return round(value, 1)
+    if isinstance(value, str):
+        return truncate(value, PROMPT_MAX_STRING_CHARS)
+    return value
+
+
+def compact_test(test: Dict, detail_level: int = 2, reason_chars: int = PROMPT_MAX_REASON_CHARS) -> Dict:
+    """
+    One diagnostic result in prompt form
+    detail_level: 2 = compacted details, 1 = details without bulky keys, 0 = no details
+    """
+    item = {
+        "test": test.get("test_name"),
+        "status": test.get("status"),
+        "latency_ms": test.get("latency_ms")
+    }
+    if test.get("failure_reason"):
+        item["failure_reason"] = truncate(test["failure_reason"], reason_chars)
+
+    details = test.get("details")
+    if detail_level > 0 and isinstance(details, dict):
+        if detail_level == 1:
+            details = {k: v for k, v in details.items() if k not in BULKY_DETAIL_KEYS}
+        item["details"] = details
+    return compact(item)
+
+
+def encode_diagnostics(diagnostics: List[Dict], budget: int = AI_PROMPT_TOKEN_BUDGET) -> str:
+    """
+    Minified JSON of the diagnostics that fits within budget tokens
+    Degrades detail step by step; the status vector is always kept
+    """
+    text = ""
+    for detail_level, reason_chars in ((2, PROMPT_MAX_REASON_CHARS), (1, PROMPT_MAX_REASON_CHARS),
+                                       (0, PROMPT_MAX_REASON_CHARS), (0, 60)):
+        encoded = [compact_test(test, detail_level, reason_chars) for test in diagnostics]
+        text = _dumps(encoded)
+        if estimate_tokens(text) <= budget:
+            return text
+    return fit_json_to_budget(encoded, budget)
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, separators=(",", ":"), default=str)
+
+
+def _without(value, field: str):
+    """value with field removed from it (dict) or from each of its objects (list)"""
+    if isinstance(value, dict):
+        return {k: v for k, v in value.items() if k != field}
+    if isinstance(value, list):
+        return [_without(item, field) if isinstance(item, dict) else item for item in value]
+    return value
+
+
+def fit_json_to_budget(value, budget: int) -> str:
+    """
+    Minified JSON of value within budget tokens that still parses
+    Drops LOW_PRIORITY_FIELDS, then trailing list items (or object keys), re-encoding each time
+    """
+    text = _dumps(value)
+    for field in LOW_PRIORITY_FIELDS:
+        if estimate_tokens(text) <= budget:
+            return text
+        value = _without(value, field)
+        text = _dumps(value)
+
+    while estimate_tokens(text) > budget and isinstance(value, (list, dict)) and value:
+        value = value[:-1] if isinstance(value, list) else dict(list(value.items())[:-1])
+        text = _dumps(value)
+    return text
+
+
+def fit_to_budget(text: str, budget: int) -> str:
+    """
+    Hard cap: never exceed budget tokens
+    JSON is trimmed field by field so it stays valid; other text is cut
+    """
+    if estimate_tokens(text) <= budget:
+        return text
+    try:
+        value = json.loads(text)
+    except ValueError:
+        return truncate(text, budget * 4)
+    if not isinstance(value, (list, dict)):
+        return truncate(text, budget * 4)
+    return fit_json_to_budget(value, budget)
@@ -0,0 +1,234 @@
+"""
+Rate Limiter Module
+Shared requests-per-minute / tokens-per-minute budget for Azure OpenAI,
+with bounded queueing, Retry-After aware retries and jittered backoff
+"""
+
+import os
+import random
+import threading
+import time
+import logging
+from typing import Callable, Dict
+
+AI_RATE_LIMIT_RPM = float(os.getenv("AI_RATE_LIMIT_RPM", "60"))
+AI_RATE_LIMIT_TPM = float(os.getenv("AI_RATE_LIMIT_TPM", "60000"))
+AI_MAX_CONCURRENT_CALLS = int(os.getenv("AI_MAX_CONCURRENT_CALLS", "8"))
+# Longest a call may spend queued and backing off before giving up
+AI_RATE_LIMIT_MAX_WAIT_SECONDS = float(os.getenv("AI_RATE_LIMIT_MAX_WAIT_SECONDS", "10"))
+AI_MAX_RETRIES = int(os.getenv("AI_MAX_RETRIES", "3"))
+AI_BACKOFF_BASE_SECONDS = float(os.getenv("AI_BACKOFF_BASE_SECONDS", "0.5"))
+AI_BACKOFF_MAX_SECONDS = float(os.getenv("AI_BACKOFF_MAX_SECONDS", "20"))
+
+RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+class RateLimitExceeded(Exception):
+    """The call could not be admitted (or retried) within the wait bound"""
+
+
+class TokenBucket:
+    """Refills continuously at capacity per minute"""
+
+    def __init__(self, per_minute: float, now: float = None):
+        self.capacity = max(1.0, per_minute)
+        self.rate = self.capacity / 60.0
+        self.available = self.capacity
+        self.updated_at = time.monotonic() if now is None else now
+
+    def _refill(self, now: float):
+        self.available = min(self.capacity, self.available + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until amount is available (0 if it is now)"""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.available >= amount:
+            return 0.0
+        return (amount - self.available) / self.rate
+
+    def take(self, amount: float):
+        self.available -= min(amount, self.capacity)
+
+    def refund(self, amount: float):
+        self.available = min(self.capacity, self.available + amount)
+
+
+def retry_after_seconds(error: Exception):
+    """Retry-After from an SDK error's response headers (retry-after-ms or retry-after)"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000.0
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        pass
+    return None
+
+
+class RateLimiter:
+    def __init__(self, rpm: float = AI_RATE_LIMIT_RPM, tpm: float = AI_RATE_LIMIT_TPM,
+                 max_concurrency: int = AI_MAX_CONCURRENT_CALLS,
+                 max_wait: float = AI_RATE_LIMIT_MAX_WAIT_SECONDS,
+                 max_retries: int = AI_MAX_RETRIES, clock: Callable[[], float] = time.monotonic):
+        # clock is injectable so tests can freeze refills
+        self._clock = clock
+        self.requests = TokenBucket(rpm, clock())
+        self.tokens = TokenBucket(tpm, clock())
+        self.max_wait = max_wait
+        self.max_retries = max_retries
+        self.max_concurrency = max_concurrency
+
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max(1, max_concurrency))
+        # Set from Retry-After: nobody is admitted before this (monotonic time)
+        self._paused_until = 0.0
+
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.calls = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.throttled = 0
+        self.retries = 0
+        self.wait_seconds_total = 0.0
+
+    def acquire(self, tokens: float, deadline: float):
+        """Block until one request and tokens fit both buckets, or raise RateLimitExceeded"""
+        start = self._clock()
+        with self._lock:
+            self.queue_depth += 1
+            self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+        try:
+            while True:
+                with self._lock:
+                    now = self._clock()
+                    wait = max(
+                        self._paused_until - now,
+                        self.requests.wait_time(1, now),
+                        self.tokens.wait_time(tokens, now)
+                    )
+                    if wait <= 0:
+                        self.requests.take(1)
+                        self.tokens.take(tokens)
+                        self.admitted += 1
+                        self.wait_seconds_total += now - start
+                        return
+                    if now + wait > deadline:
+                        self.rejected += 1
+                        raise RateLimitExceeded(f"AI rate limit: no capacity within {self.max_wait}s "
+                                                f"(queue depth {self.queue_depth})")
+                time.sleep(min(wait, 0.25))
+        finally:
+            with self._lock:
+                self.queue_depth -= 1
+
+    def release(self, tokens: float):
+        """Give back a whole reservation (one request plus tokens) for an attempt that did not complete"""
+        with self._lock:
+            self.requests.refund(1)
+            self.tokens.refund(tokens)
+
+    def settle(self, reserved: float, used: float):
+        """Return unused reserved tokens once the real usage is known"""
+        if used is not None and used < reserved:
+            with self._lock:
+                self.tokens.refund(reserved - used)
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        """Retry-After when the service sent one, otherwise full-jitter exponential backoff"""
+        retry_after = retry_after_seconds(error)
+        if retry_after is not None:
+            return retry_after + random.uniform(0, AI_BACKOFF_BASE_SECONDS)
+        return random.uniform(0, min(AI_BACKOFF_MAX_SECONDS, AI_BACKOFF_BASE_SECONDS * (2 ** attempt)))
+
+    def call(self, fn: Callable, estimated_tokens: float = 0):
+        """
+        Run fn() under the shared budget
+        Retries throttling (429) and transient 5xx with backoff; raises RateLimitExceeded
+        when admission or the next retry would exceed the wait bound
+        At most one reservation is held: a failed attempt gives its reservation back before
+        the retry takes a new one, and nothing stays reserved when the call raises.
+        On success the caller owns the reservation and settles it against real usage
+        """
+        deadline = self._clock() + self.max_wait
+        with self._lock:
+            self.calls += 1
+
+        attempt = 0
+        while True:
+            self.acquire(estimated_tokens, deadline)
+            if not self._slots.acquire(timeout=max(0.0, deadline - self._clock())):
+                # The budget was taken for a call that never ran
+                self.release(estimated_tokens)
+                with self._lock:
+                    self.rejected += 1
+                raise RateLimitExceeded(f"AI concurrency limit ({self.max_concurrency}) busy for {self.max_wait}s")
+            try:
+                return fn()
+            except Exception as e:
+                # Retried or re-raised, this attempt's reservation is not kept
+                self.release(estimated_tokens)
+                status = getattr(e, "status_code", None)
+                if status not in RETRYABLE_STATUS_CODES or attempt >= self.max_retries:
+                    raise
+
+                delay = self._backoff(attempt, e)
+                with self._lock:
+                    self.retries += 1
+                    if status == 429:
+                        self.throttled += 1
+                        # Everyone backs off, not just this caller
+                        self._paused_until = max(self._paused_until, self._clock() + delay)
+                logging.warning(f"Azure OpenAI returned {status}, retry {attempt + 1}/{self.max_retries} in {delay:.2f}s")
+
+                if self._clock() + delay > deadline:
+                    with self._lock:
+                        self.rejected += 1
+                    raise RateLimitExceeded(f"Azure OpenAI throttled ({status}); retry after {delay:.1f}s "
+                                            f"exceeds the {self.max_wait}s wait bound") from e
+            finally:
+                self._slots.release()
+            time.sleep(delay)
+            attempt += 1
+
+    def stats(self) -> Dict:
+        """Queue and throttling metrics for monitoring"""
+        with self._lock:
+            now = self._clock()
+            self.requests._refill(now)
+            self.tokens._refill(now)
+            return {
+                "rpm_limit": self.requests.capacity,
+                "tpm_limit": self.tokens.capacity,
+                "requests_available": round(self.requests.available, 2),
+                "tokens_available": round(self.tokens.available),
+                "max_concurrency": self.max_concurrency,
+                "queue_depth": self.queue_depth,
+                "max_queue_depth": self.max_queue_depth,
+                "calls": self.calls,
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+                "throttled": self.throttled,
+                "retries": self.retries,
+                "throttle_rate": round(self.throttled / self.admitted, 4) if self.admitted else 0.0,
+                "avg_wait_ms": round(1000 * self.wait_seconds_total / self.admitted, 2) if self.admitted else 0.0,
+                "paused_for_seconds": round(max(0.0, self._paused_until - now), 2)
+            }
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Return the process-wide Azure OpenAI rate limiter"""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = RateLimiter()
+            logging.info(f"AI rate limiter initialised (rpm={AI_RATE_LIMIT_RPM}, tpm={AI_RATE_LIMIT_TPM})")
+        return _limiter
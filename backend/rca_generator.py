@@ -5,11 +5,78 @@ ENTERPRISE ENHANCED: Dual output (Executive + Technical JSON)
 """
 
 import os
+import io
+import html
 import json
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, Iterable, Iterator, List
 import logging
-from azure.storage.blob import BlobServiceClient, ContentSettings
+from azure.storage.blob import BlobServiceClient
+
+from http_probe import http_phase_timings, slowest_phase
+from report_bundle import (
+    REPORT_STORAGE_FORMAT, BUNDLE_SUFFIX, BUNDLE_CONTENT_TYPE, BUNDLE_CONTENT_ENCODING,
+    new_ulid, bundle_chunks, compress_chunks, unpack_bundle
+)
+from report_storage import create_report_store
+
+REPORT_FORMATS = ("text", "executive", "json", "markdown", "html")
+# What /diagnose has always returned and uploaded
+DEFAULT_REPORT_FORMATS = ("text", "executive", "json")
+
+# format -> (blob name suffix, content type, report_urls key)
+REPORT_UPLOADS = {
+    "text": (".txt", "text/plain", "technical_text"),
+    "executive": ("_executive.txt", "text/plain", "executive_summary"),
+    "json": ("_technical.json", "application/json", "machine_readable_json"),
+    "markdown": ("_report.md", "text/markdown", "markdown"),
+    "html": ("_report.html", "text/html", "html")
+}
+
+FLEET_REPORT_SUFFIX = "_report.txt.gz"
+
+CHANGE_LABELS = (
+    ("recent_firewall_change", "Network firewall configuration"),
+    ("recent_dns_change", "DNS settings"),
+    ("recent_deployment", "Application deployment")
+)
+
+
+def parse_report_formats(formats) -> tuple:
+    """
+    Normalize a formats request value (list or comma-separated string)
+    None means the default set; unknown formats raise ValueError
+    """
+    if formats is None:
+        return DEFAULT_REPORT_FORMATS
+    if isinstance(formats, str):
+        formats = formats.split(",")
+    
+    selected = []
+    for report_format in formats:
+        report_format = str(report_format).strip().lower()
+        if report_format not in REPORT_FORMATS:
+            raise ValueError(f"Unknown report format '{report_format}' (expected: {', '.join(REPORT_FORMATS)})")
+        if report_format not in selected:
+            selected.append(report_format)
+    return tuple(selected)
+
+
+def impact_statement(severity: str) -> str:
+    """Business-language impact for the executive summary"""
+    if severity in ['CRITICAL', 'HIGH']:
+        return "This is a high-priority issue requiring immediate attention."
+    elif severity == 'MEDIUM':
+        return "This issue requires timely resolution to prevent service degradation."
+    return "This is a low-impact issue that should be addressed during regular maintenance."
+
+
+def confidence_note(confidence) -> str:
+    if confidence >= 80:
+        return "(High confidence - recommended to proceed with remediation)"
+    elif confidence >= 60:
+        return "(Moderate confidence - may require additional investigation)"
+    return "(Low confidence - recommend manual investigation)"
 
 class RCAGenerator:
     def __init__(self):
@@ -28,6 +95,9 @@ class RCAGenerator:
         else:
             logging.warning("Azure Storage connection string not configured")
             self.blob_service_client = None
+        
+        # Where reports are streamed to (REPORT_LOCAL_STORE_DIR overrides Blob Storage)
+        self.report_store = create_report_store(self.blob_service_client, self.container_name)
     
     def _ensure_container_exists(self):
         """Create container if it doesn't exist"""
@@ -41,240 +111,484 @@ class RCAGenerator:
         except Exception as e:
             logging.error(f"Error creating container: {str(e)}")
     
-    def generate_report(self, target: str, diagnostics: List[Dict], 
-                       ai_analysis: Dict, incident_context: Dict = None,
-                       recent_changes: Dict = None) -> str:
+    def build_report_model(self, target: str, diagnostics: List[Dict], ai_analysis: Dict,
+                           incident_context: Dict = None, recent_changes: Dict = None) -> Dict:
         """
-        Generate formal RCA report in text format
-        ENTERPRISE ENHANCED: Includes incident context and change awareness
+        Intermediate report model shared by every renderer
+        Walks diagnostics and reads ai_analysis once per request
         """
         timestamp = datetime.utcnow()
+        phase_timings = http_phase_timings(diagnostics)
+        
+        tests = []
+        passed = failed = 0
+        for test in diagnostics:
+            if test["status"] == "PASS":
+                passed += 1
+            elif test["status"] in ["FAIL", "INFERRED_FAIL"]:
+                failed += 1
+            
+            phases = (test.get('details') or {}).get('phase_timings_ms')
+            tests.append({
+                "name": test['test_name'],
+                "status": test['status'],
+                "passed": test["status"] == "PASS",
+                "latency_ms": test['latency_ms'],
+                "failure_reason": test.get('failure_reason'),
+                "details_json": json.dumps(test['details']) if test.get('details') else None,
+                "phases": (
+                    f"DNS {phases.get('dns_ms')} ms | Connect {phases.get('connect_ms')} ms | "
+                    f"TLS {phases.get('tls_ms')} ms | TTFB {phases.get('ttfb_ms')} ms | "
+                    f"Transfer {phases.get('transfer_ms')} ms"
+                ) if phases else None
+            })
+        
+        changes = [label for flag, label in CHANGE_LABELS if (recent_changes or {}).get(flag)]
+        
+        analysis = {
+            "root_cause": ai_analysis.get('root_cause', 'Unknown'),
+            "confidence_percentage": ai_analysis.get('confidence_percentage', 0),
+            "severity": ai_analysis.get('severity', 'UNKNOWN'),
+            "category": ai_analysis.get('category', 'UNKNOWN'),
+            "root_cause_category": ai_analysis.get('root_cause_category', 'Network Issue'),
+            "responsible_team": ai_analysis.get('responsible_team', 'Network Operations'),
+            "responsibility_reason": ai_analysis.get('responsibility_reason', ''),
+            "change_correlation": ai_analysis.get('change_correlation'),
+            "reasoning": ai_analysis.get('reasoning', ''),
+            "evidence": ai_analysis.get('evidence', []),
+            "remediation_steps": ai_analysis.get('remediation_steps', [])
+        }
         
-        report_lines = []
-        report_lines.append("=" * 80)
-        report_lines.append("ROOT CAUSE ANALYSIS REPORT")
-        report_lines.append("=" * 80)
-        report_lines.append("")
+        return {
+            "target": target,
+            "timestamp": timestamp,
+            "incident_context": incident_context,
+            "recent_changes": recent_changes,
+            "changes": changes,
+            "tests": tests,
+            "analysis": analysis,
+            # Text and executive wording keep their own defaults for fields the AI left out
+            "text": {
+                "reasoning": ai_analysis.get('reasoning', 'No reasoning provided')
+            },
+            "executive": {
+                "root_cause": ai_analysis.get('root_cause', 'Unknown issue'),
+                "severity": ai_analysis.get('severity', 'MEDIUM'),
+                "responsible_team": ai_analysis.get('responsible_team', 'Technical Team'),
+                "responsibility_reason": ai_analysis.get('responsibility_reason', 'Based on diagnostic analysis')
+            },
+            # ENTERPRISE FEATURE 3: Technical RCA (Machine-Readable JSON)
+            "technical": {
+                "report_version": "1.0",
+                "report_type": "technical_rca",
+                "generated_at": timestamp.isoformat(),
+                
+                # Incident Metadata
+                "incident": {
+                    "target": target,
+                    "incident_context": incident_context or {},
+                    "recent_changes": recent_changes or {}
+                },
+                
+                # Diagnostic Results
+                "diagnostics": {
+                    "tests_run": len(diagnostics),
+                    "tests_passed": passed,
+                    "tests_failed": failed,
+                    "http_phase_timings_ms": phase_timings,
+                    "slowest_http_phase": slowest_phase(phase_timings),
+                    "results": diagnostics
+                },
+                
+                # Root Cause Analysis (ENTERPRISE FEATURE 4: Responsibility Classification)
+                "root_cause_analysis": analysis,
+                
+                # Metadata
+                "metadata": {
+                    "analysis_engine": "Azure OpenAI",
+                    "platform": "AI-Powered Network RCA",
+                    "version": "2.0-enterprise"
+                }
+            }
+        }
+    
+    def render_reports(self, model: Dict, formats=DEFAULT_REPORT_FORMATS) -> Dict[str, str]:
+        """
+        Render the requested formats from one report model
+        Every renderer's chunks go into the same buffer; each report is a slice of it
+        """
+        formats = parse_report_formats(formats)
+        buffer = io.StringIO()
+        spans = {}
+        for report_format in formats:
+            begin = buffer.tell()
+            for chunk in self.iter_report(model, report_format):
+                buffer.write(chunk)
+            spans[report_format] = (begin, buffer.tell())
+        
+        content = buffer.getvalue()
+        return {report_format: content[begin:end] for report_format, (begin, end) in spans.items()}
+    
+    def iter_report(self, model: Dict, report_format: str) -> Iterator[str]:
+        """One format as a stream of chunks (joined, they equal render_reports' output)"""
+        if report_format not in REPORT_FORMATS:
+            raise ValueError(f"Unknown report format '{report_format}' (expected: {', '.join(REPORT_FORMATS)})")
+        return getattr(self, f"_render_{report_format}")(model)
+    
+    def generate_reports(self, target: str, diagnostics: List[Dict], ai_analysis: Dict,
+                         incident_context: Dict = None, recent_changes: Dict = None,
+                         formats=DEFAULT_REPORT_FORMATS) -> Dict:
+        """
+        Build the model once and render only the requested formats
+        Returns {"model": {...}, "reports": {format: content}}
+        """
+        model = self.build_report_model(target, diagnostics, ai_analysis, incident_context, recent_changes)
+        return {"model": model, "reports": self.render_reports(model, formats)}
+    
+    def _render_text(self, model: Dict) -> Iterator[str]:
+        """Formal RCA report in text format (incident context and change aware)"""
+        analysis = model["analysis"]
+        rule, dash = "=" * 80 + "\n", "-" * 80 + "\n"
+        
+        yield rule
+        yield "ROOT CAUSE ANALYSIS REPORT\n"
+        yield rule
+        yield "\n"
         
         # Header
-        report_lines.append(f"Target:           {target}")
-        report_lines.append(f"Analysis Date:    {timestamp.strftime('%Y-%m-%d %H:%M:%S UTC')}")
-        report_lines.append(f"Severity:         {ai_analysis.get('severity', 'UNKNOWN')}")
-        report_lines.append(f"Category:         {ai_analysis.get('category', 'UNKNOWN')}")
-        report_lines.append("")
+        yield f"Target:           {model['target']}\n"
+        yield f"Analysis Date:    {model['timestamp'].strftime('%Y-%m-%d %H:%M:%S UTC')}\n"
+        yield f"Severity:         {analysis['severity']}\n"
+        yield f"Category:         {analysis['category']}\n"
+        yield "\n"
         
         # Executive Summary
-        report_lines.append("-" * 80)
-        report_lines.append("EXECUTIVE SUMMARY")
-        report_lines.append("-" * 80)
-        report_lines.append("")
-        report_lines.append(f"Root Cause: {ai_analysis.get('root_cause', 'Unknown')}")
-        report_lines.append(f"Confidence: {ai_analysis.get('confidence_percentage', 0)}%")
-        report_lines.append("")
+        yield dash
+        yield "EXECUTIVE SUMMARY\n"
+        yield dash
+        yield "\n"
+        yield f"Root Cause: {analysis['root_cause']}\n"
+        yield f"Confidence: {analysis['confidence_percentage']}%\n"
+        yield "\n"
         
         # Diagnostic Results
-        report_lines.append("-" * 80)
-        report_lines.append("DIAGNOSTIC TEST RESULTS")
-        report_lines.append("-" * 80)
-        report_lines.append("")
-        
-        for test in diagnostics:
-            status_symbol = "✓" if test["status"] == "PASS" else "✗"
-            report_lines.append(f"{status_symbol} {test['test_name']}")
-            report_lines.append(f"  Status:       {test['status']}")
-            report_lines.append(f"  Latency:      {test['latency_ms']} ms")
-            
-            if test.get('failure_reason'):
-                report_lines.append(f"  Failure:      {test['failure_reason']}")
-            
-            if test.get('details'):
-                report_lines.append(f"  Details:      {json.dumps(test['details'])}")
-            
-            report_lines.append("")
+        yield dash
+        yield "DIAGNOSTIC TEST RESULTS\n"
+        yield dash
+        yield "\n"
+        
+        for test in model["tests"]:
+            yield f"{'✓' if test['passed'] else '✗'} {test['name']}\n"
+            yield f"  Status:       {test['status']}\n"
+            yield f"  Latency:      {test['latency_ms']} ms\n"
+            if test['failure_reason']:
+                yield f"  Failure:      {test['failure_reason']}\n"
+            if test['details_json']:
+                yield f"  Details:      {test['details_json']}\n"
+                if test['phases']:
+                    yield f"  Phases:       {test['phases']}\n"
+            yield "\n"
         
         # Analysis & Reasoning
-        report_lines.append("-" * 80)
-        report_lines.append("ANALYSIS & REASONING")
-        report_lines.append("-" * 80)
-        report_lines.append("")
-        report_lines.append(ai_analysis.get('reasoning', 'No reasoning provided'))
-        report_lines.append("")
+        yield dash
+        yield "ANALYSIS & REASONING\n"
+        yield dash
+        yield "\n"
+        yield f"{model['text']['reasoning']}\n"
+        yield "\n"
         
         # Evidence
-        report_lines.append("-" * 80)
-        report_lines.append("SUPPORTING EVIDENCE")
-        report_lines.append("-" * 80)
-        report_lines.append("")
-        
-        evidence = ai_analysis.get('evidence', [])
-        for i, item in enumerate(evidence, 1):
-            report_lines.append(f"{i}. {item}")
-        
-        if not evidence:
-            report_lines.append("No specific evidence provided")
-        
-        report_lines.append("")
+        yield dash
+        yield "SUPPORTING EVIDENCE\n"
+        yield dash
+        yield "\n"
+        for i, item in enumerate(analysis['evidence'], 1):
+            yield f"{i}. {item}\n"
+        if not analysis['evidence']:
+            yield "No specific evidence provided\n"
+        yield "\n"
         
         # Remediation Steps
-        report_lines.append("-" * 80)
-        report_lines.append("RECOMMENDED REMEDIATION STEPS")
-        report_lines.append("-" * 80)
-        report_lines.append("")
-        
-        steps = ai_analysis.get('remediation_steps', [])
-        for i, step in enumerate(steps, 1):
-            report_lines.append(f"{i}. {step}")
-        
-        if not steps:
-            report_lines.append("No remediation steps available")
-        
-        report_lines.append("")
+        yield dash
+        yield "RECOMMENDED REMEDIATION STEPS\n"
+        yield dash
+        yield "\n"
+        for i, step in enumerate(analysis['remediation_steps'], 1):
+            yield f"{i}. {step}\n"
+        if not analysis['remediation_steps']:
+            yield "No remediation steps available\n"
+        yield "\n"
         
         # Footer
-        report_lines.append("=" * 80)
-        report_lines.append("END OF REPORT")
-        report_lines.append("=" * 80)
-        report_lines.append("")
-        report_lines.append("Generated by AI-Powered Network RCA Platform")
-        report_lines.append("Powered by Azure Functions + Azure OpenAI")
-        report_lines.append("")
-        
-        return "\n".join(report_lines)
+        yield rule
+        yield "END OF REPORT\n"
+        yield rule
+        yield "\n"
+        yield "Generated by AI-Powered Network RCA Platform\n"
+        yield "Powered by Azure Functions + Azure OpenAI\n"
     
-    def generate_executive_report(self, target: str, diagnostics: List[Dict],
-                                  ai_analysis: Dict, incident_context: Dict = None,
-                                  recent_changes: Dict = None) -> str:
+    def _render_executive(self, model: Dict) -> Iterator[str]:
         """
-        ENTERPRISE FEATURE 3: Generate Executive RCA (Human-Readable, Non-Technical)
+        ENTERPRISE FEATURE 3: Executive RCA (Human-Readable, Non-Technical)
         Suitable for managers and executives
         """
-        timestamp = datetime.utcnow()
+        target = model["target"]
+        analysis = model["analysis"]
+        executive = model["executive"]
+        incident_context = model["incident_context"]
+        rule, dash = "=" * 80 + "\n", "-" * 80 + "\n"
         
-        report_lines = []
-        report_lines.append("=" * 80)
-        report_lines.append("EXECUTIVE INCIDENT SUMMARY")
-        report_lines.append("=" * 80)
-        report_lines.append("")
+        yield rule
+        yield "EXECUTIVE INCIDENT SUMMARY\n"
+        yield rule
+        yield "\n"
         
         # Incident Overview
-        report_lines.append(f"Service Affected:     {target}")
-        report_lines.append(f"Report Generated:     {timestamp.strftime('%B %d, %Y at %H:%M UTC')}")
-        
+        yield f"Service Affected:     {target}\n"
+        yield f"Report Generated:     {model['timestamp'].strftime('%B %d, %Y at %H:%M UTC')}\n"
         if incident_context:
             if incident_context.get('incident_start_time'):
-                report_lines.append(f"Incident Start Time:  {incident_context['incident_start_time']}")
-            report_lines.append(f"Detection Method:     {incident_context.get('incident_detection_type', 'User-Reported')}")
-            report_lines.append(f"Users Impacted:       {incident_context.get('affected_users_count', 'Unknown')}")
-            report_lines.append(f"Business Priority:    {incident_context.get('business_criticality', 'Medium')}")
-        
-        report_lines.append("")
+                yield f"Incident Start Time:  {incident_context['incident_start_time']}\n"
+            yield f"Detection Method:     {incident_context.get('incident_detection_type', 'User-Reported')}\n"
+            yield f"Users Impacted:       {incident_context.get('affected_users_count', 'Unknown')}\n"
+            yield f"Business Priority:    {incident_context.get('business_criticality', 'Medium')}\n"
+        yield "\n"
         
         # What Happened (Plain English)
-        report_lines.append("-" * 80)
-        report_lines.append("WHAT HAPPENED")
-        report_lines.append("-" * 80)
-        report_lines.append("")
-        
-        # Translate technical root cause to business language
-        root_cause = ai_analysis.get('root_cause', 'Unknown issue')
-        severity = ai_analysis.get('severity', 'MEDIUM')
-        
-        if severity in ['CRITICAL', 'HIGH']:
-            impact_statement = "This is a high-priority issue requiring immediate attention."
-        elif severity == 'MEDIUM':
-            impact_statement = "This issue requires timely resolution to prevent service degradation."
-        else:
-            impact_statement = "This is a low-impact issue that should be addressed during regular maintenance."
-        
-        report_lines.append(f"The service '{target}' experienced an outage or degradation.")
-        report_lines.append(f"Root Cause: {root_cause}")
-        report_lines.append(f"Impact Level: {severity}")
-        report_lines.append(impact_statement)
-        report_lines.append("")
+        yield dash
+        yield "WHAT HAPPENED\n"
+        yield dash
+        yield "\n"
+        yield f"The service '{target}' experienced an outage or degradation.\n"
+        yield f"Root Cause: {executive['root_cause']}\n"
+        yield f"Impact Level: {executive['severity']}\n"
+        yield f"{impact_statement(executive['severity'])}\n"
+        yield "\n"
         
         # Why It Happened
-        report_lines.append("-" * 80)
-        report_lines.append("WHY IT HAPPENED")
-        report_lines.append("-" * 80)
-        report_lines.append("")
-        
-        # Simplify technical reasoning
-        reasoning = ai_analysis.get('reasoning', '')
-        report_lines.append(reasoning)
-        report_lines.append("")
+        yield dash
+        yield "WHY IT HAPPENED\n"
+        yield dash
+        yield "\n"
+        yield f"{analysis['reasoning']}\n"
+        yield "\n"
         
         # Recent Changes (if any)
-        if recent_changes:
-            changes_made = []
-            if recent_changes.get('recent_firewall_change'):
-                changes_made.append("Network firewall configuration")
-            if recent_changes.get('recent_dns_change'):
-                changes_made.append("DNS settings")
-            if recent_changes.get('recent_deployment'):
-                changes_made.append("Application deployment")
-            
-            if changes_made:
-                report_lines.append("Recent Changes That May Be Related:")
-                for change in changes_made:
-                    report_lines.append(f"  • {change}")
-                
-                if ai_analysis.get('change_correlation'):
-                    report_lines.append("")
-                    report_lines.append(f"Analysis: {ai_analysis['change_correlation']}")
-                
-                report_lines.append("")
+        if model["changes"]:
+            yield "Recent Changes That May Be Related:\n"
+            for change in model["changes"]:
+                yield f"  • {change}\n"
+            if analysis['change_correlation']:
+                yield "\n"
+                yield f"Analysis: {analysis['change_correlation']}\n"
+            yield "\n"
         
         # Who Is Responsible
-        report_lines.append("-" * 80)
-        report_lines.append("WHO SHOULD FIX THIS")
-        report_lines.append("-" * 80)
-        report_lines.append("")
-        
-        responsible_team = ai_analysis.get('responsible_team', 'Technical Team')
-        root_cause_category = ai_analysis.get('root_cause_category', 'Network Issue')
-        
-        report_lines.append(f"Responsible Team:     {responsible_team}")
-        report_lines.append(f"Issue Category:       {root_cause_category}")
-        report_lines.append(f"Reason:               {ai_analysis.get('responsibility_reason', 'Based on diagnostic analysis')}")
-        report_lines.append("")
+        yield dash
+        yield "WHO SHOULD FIX THIS\n"
+        yield dash
+        yield "\n"
+        yield f"Responsible Team:     {executive['responsible_team']}\n"
+        yield f"Issue Category:       {analysis['root_cause_category']}\n"
+        yield f"Reason:               {executive['responsibility_reason']}\n"
+        yield "\n"
         
         # Next Steps (Simplified)
-        report_lines.append("-" * 80)
-        report_lines.append("RECOMMENDED NEXT STEPS")
-        report_lines.append("-" * 80)
-        report_lines.append("")
-        
-        steps = ai_analysis.get('remediation_steps', [])
+        yield dash
+        yield "RECOMMENDED NEXT STEPS\n"
+        yield dash
+        yield "\n"
+        steps = analysis['remediation_steps']
         if steps:
-            report_lines.append("The technical team recommends:")
+            yield "The technical team recommends:\n"
             for i, step in enumerate(steps[:3], 1):  # Top 3 steps only for executives
-                report_lines.append(f"{i}. {step}")
+                yield f"{i}. {step}\n"
         else:
-            report_lines.append("Technical team to investigate and provide action plan.")
-        
-        report_lines.append("")
+            yield "Technical team to investigate and provide action plan.\n"
+        yield "\n"
         
         # Confidence
-        confidence = ai_analysis.get('confidence_percentage', 0)
-        report_lines.append(f"Analysis Confidence:  {confidence}%")
-        if confidence >= 80:
-            report_lines.append("(High confidence - recommended to proceed with remediation)")
-        elif confidence >= 60:
-            report_lines.append("(Moderate confidence - may require additional investigation)")
-        else:
-            report_lines.append("(Low confidence - recommend manual investigation)")
-        
-        report_lines.append("")
+        confidence = analysis['confidence_percentage']
+        yield f"Analysis Confidence:  {confidence}%\n"
+        yield f"{confidence_note(confidence)}\n"
+        yield "\n"
         
         # Footer
-        report_lines.append("=" * 80)
-        report_lines.append("END OF EXECUTIVE SUMMARY")
-        report_lines.append("=" * 80)
-        report_lines.append("")
-        report_lines.append("For technical details, refer to the Technical RCA Report.")
-        report_lines.append("")
-        
-        return "\n".join(report_lines)
+        yield rule
+        yield "END OF EXECUTIVE SUMMARY\n"
+        yield rule
+        yield "\n"
+        yield "For technical details, refer to the Technical RCA Report.\n"
+    
+    def _render_json(self, model: Dict) -> Iterator[str]:
+        """Technical RCA as indented JSON"""
+        # Same text as json.dumps(indent=2), encoded piece by piece
+        yield from json.JSONEncoder(indent=2).iterencode(model["technical"])
+    
+    def _render_markdown(self, model: Dict) -> Iterator[str]:
+        """RCA report as Markdown (tickets, wikis, chat)"""
+        analysis = model["analysis"]
+        
+        yield f"# Root Cause Analysis: {model['target']}\n\n"
+        yield f"- **Analysis Date:** {model['timestamp'].strftime('%Y-%m-%d %H:%M:%S UTC')}\n"
+        yield f"- **Severity:** {analysis['severity']}\n"
+        yield f"- **Category:** {analysis['category']}\n"
+        yield f"- **Responsible Team:** {analysis['responsible_team']} ({analysis['root_cause_category']})\n\n"
+        
+        yield "## Summary\n\n"
+        yield f"**Root Cause:** {analysis['root_cause']}  \n"
+        yield f"**Confidence:** {analysis['confidence_percentage']}%\n\n"
+        if analysis['change_correlation']:
+            yield f"**Change Correlation:** {analysis['change_correlation']}\n\n"
+        
+        yield "## Diagnostic Results\n\n"
+        yield "| Test | Status | Latency (ms) | Failure |\n"
+        yield "|---|---|---|---|\n"
+        for test in model["tests"]:
+            failure = (test['failure_reason'] or '').replace('|', '\\|')
+            yield f"| {test['name']} | {'✓' if test['passed'] else '✗'} {test['status']} | {test['latency_ms']} | {failure} |\n"
+        yield "\n"
+        
+        yield "## Analysis & Reasoning\n\n"
+        yield f"{analysis['reasoning'] or 'No reasoning provided'}\n\n"
+        
+        yield "## Supporting Evidence\n\n"
+        for item in analysis['evidence']:
+            yield f"- {item}\n"
+        if not analysis['evidence']:
+            yield "No specific evidence provided\n"
+        yield "\n"
+        
+        yield "## Recommended Remediation Steps\n\n"
+        for i, step in enumerate(analysis['remediation_steps'], 1):
+            yield f"{i}. {step}\n"
+        if not analysis['remediation_steps']:
+            yield "No remediation steps available\n"
+    
+    def _render_html(self, model: Dict) -> Iterator[str]:
+        """Standalone HTML report"""
+        analysis = model["analysis"]
+        e = html.escape
+        
+        yield "<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\">"
+        yield f"<title>RCA: {e(model['target'])}</title></head><body>\n"
+        yield f"<h1>Root Cause Analysis: {e(model['target'])}</h1>\n"
+        yield f"<p>Analysis Date: {model['timestamp'].strftime('%Y-%m-%d %H:%M:%S UTC')}<br>"
+        yield f"Severity: <strong>{e(str(analysis['severity']))}</strong><br>"
+        yield f"Category: {e(str(analysis['category']))}<br>"
+        yield f"Responsible Team: {e(str(analysis['responsible_team']))}</p>\n"
+        
+        yield "<h2>Summary</h2>\n"
+        yield f"<p><strong>Root Cause:</strong> {e(str(analysis['root_cause']))}<br>"
+        yield f"<strong>Confidence:</strong> {e(str(analysis['confidence_percentage']))}%</p>\n"
+        if analysis['change_correlation']:
+            yield f"<p><strong>Change Correlation:</strong> {e(str(analysis['change_correlation']))}</p>\n"
+        
+        yield "<h2>Diagnostic Results</h2>\n<table border=\"1\" cellpadding=\"4\">\n"
+        yield "<tr><th>Test</th><th>Status</th><th>Latency (ms)</th><th>Failure</th></tr>\n"
+        for test in model["tests"]:
+            yield (f"<tr><td>{e(str(test['name']))}</td><td>{e(str(test['status']))}</td>"
+                   f"<td>{e(str(test['latency_ms']))}</td><td>{e(test['failure_reason'] or '')}</td></tr>\n")
+        yield "</table>\n"
+        
+        yield "<h2>Analysis &amp; Reasoning</h2>\n"
+        yield f"<p>{e(str(analysis['reasoning'] or 'No reasoning provided'))}</p>\n"
+        
+        yield "<h2>Supporting Evidence</h2>\n<ul>\n"
+        for item in analysis['evidence']:
+            yield f"<li>{e(str(item))}</li>\n"
+        yield "</ul>\n"
+        
+        yield "<h2>Recommended Remediation Steps</h2>\n<ol>\n"
+        for step in analysis['remediation_steps']:
+            yield f"<li>{e(str(step))}</li>\n"
+        yield "</ol>\n</body></html>\n"
+    
+    def iter_fleet_report(self, batch: Dict, fleet_analysis: Dict = None) -> Iterator[str]:
+        """
+        Fleet report for a batch run (run_batch_diagnostics output), one target at a time
+        Nothing is accumulated, so it can cover thousands of targets; see plan_fleet_report_upload
+        """
+        summary = batch["summary"]
+        rule, dash = "=" * 80 + "\n", "-" * 80 + "\n"
+        
+        yield rule
+        yield "FLEET DIAGNOSTIC REPORT\n"
+        yield rule
+        yield "\n"
+        
+        yield f"Report Generated: {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S UTC')}\n"
+        yield f"Targets:          {summary['total_targets']}\n"
+        yield f"Healthy:          {summary['healthy']}\n"
+        yield f"Unhealthy:        {summary['unhealthy']}\n"
+        yield f"Errors:           {summary['errors']}\n"
+        yield f"Duration:         {summary['duration_ms']} ms\n"
+        yield "\n"
+        
+        if summary['failures_by_test']:
+            yield "First failures by test:\n"
+            for test_name, count in sorted(summary['failures_by_test'].items(), key=lambda kv: -kv[1]):
+                yield f"  {test_name}: {count}\n"
+            yield "\n"
+        
+        common_cause = (fleet_analysis or {}).get('common_cause')
+        if common_cause:
+            yield dash
+            yield "COMMON CAUSE\n"
+            yield dash
+            yield "\n"
+            yield f"Verdict:    {common_cause.get('verdict')}\n"
+            yield f"Confidence: {common_cause.get('confidence_percentage', 0)}%\n"
+            yield f"Affected:   {', '.join(common_cause.get('affected_targets') or [])}\n"
+            if common_cause.get('reasoning'):
+                yield f"{common_cause['reasoning']}\n"
+            yield "\n"
+        
+        yield dash
+        yield "TARGETS\n"
+        yield dash
+        yield "\n"
+        
+        for result in batch["results"]:
+            marker = {"healthy": "✓", "unhealthy": "✗"}.get(result['status'], "!")
+            yield f"{marker} {result['target']} ({result['service_type']})\n"
+            yield f"  Status:       {result['status']}\n"
+            if result.get('first_failure'):
+                yield f"  First Failure: {result['first_failure']}\n"
+            if result.get('error'):
+                yield f"  Error:        {result['error']}\n"
+            for test in result['diagnostics']:
+                reason = f" - {test['failure_reason']}" if test.get('failure_reason') else ""
+                yield f"  {test['test_name']}: {test['status']} ({test['latency_ms']} ms){reason}\n"
+            ai_analysis = result.get('ai_analysis')
+            if ai_analysis:
+                yield (f"  Root Cause:   {ai_analysis.get('root_cause', 'Unknown')} "
+                       f"({ai_analysis.get('confidence_percentage', 0)}% confidence)\n")
+            yield "\n"
+        
+        yield rule
+        yield "END OF FLEET REPORT\n"
+        yield rule
+    
+    def generate_report(self, target: str, diagnostics: List[Dict], 
+                       ai_analysis: Dict, incident_context: Dict = None,
+                       recent_changes: Dict = None) -> str:
+        """
+        Generate formal RCA report in text format
+        ENTERPRISE ENHANCED: Includes incident context and change awareness
+        """
+        return self.generate_reports(target, diagnostics, ai_analysis, incident_context, recent_changes,
+                                     formats=("text",))["reports"]["text"]
+    
+    def generate_executive_report(self, target: str, diagnostics: List[Dict],
+                                  ai_analysis: Dict, incident_context: Dict = None,
+                                  recent_changes: Dict = None) -> str:
+        """
+        ENTERPRISE FEATURE 3: Generate Executive RCA (Human-Readable, Non-Technical)
+        Suitable for managers and executives
+        """
+        return self.generate_reports(target, diagnostics, ai_analysis, incident_context, recent_changes,
+                                     formats=("executive",))["reports"]["executive"]
     
     def generate_technical_report(self, target: str, diagnostics: List[Dict],
                                   ai_analysis: Dict, incident_context: Dict = None,
@@ -283,128 +597,156 @@ class RCAGenerator:
         ENTERPRISE FEATURE 3: Generate Technical RCA (Machine-Readable JSON)
         Structured format for automation and integration
         """
-        return {
-            "report_version": "1.0",
-            "report_type": "technical_rca",
-            "generated_at": datetime.utcnow().isoformat(),
-            
-            # Incident Metadata
-            "incident": {
-                "target": target,
-                "incident_context": incident_context or {},
-                "recent_changes": recent_changes or {}
-            },
-            
-            # Diagnostic Results
-            "diagnostics": {
-                "tests_run": len(diagnostics),
-                "tests_passed": sum(1 for t in diagnostics if t["status"] == "PASS"),
-                "tests_failed": sum(1 for t in diagnostics if t["status"] in ["FAIL", "INFERRED_FAIL"]),
-                "results": diagnostics
-            },
-            
-            # Root Cause Analysis
-            "root_cause_analysis": {
-                "root_cause": ai_analysis.get('root_cause', 'Unknown'),
-                "confidence_percentage": ai_analysis.get('confidence_percentage', 0),
-                "severity": ai_analysis.get('severity', 'UNKNOWN'),
-                "category": ai_analysis.get('category', 'UNKNOWN'),
-                
-                # ENTERPRISE FEATURE 4: Responsibility Classification
-                "root_cause_category": ai_analysis.get('root_cause_category', 'Network Issue'),
-                "responsible_team": ai_analysis.get('responsible_team', 'Network Operations'),
-                "responsibility_reason": ai_analysis.get('responsibility_reason', ''),
-                
-                # Change Correlation
-                "change_correlation": ai_analysis.get('change_correlation'),
-                
-                # Analysis Details
-                "reasoning": ai_analysis.get('reasoning', ''),
-                "evidence": ai_analysis.get('evidence', []),
-                "remediation_steps": ai_analysis.get('remediation_steps', [])
-            },
-            
-            # Metadata
-            "metadata": {
-                "analysis_engine": "Azure OpenAI",
-                "platform": "AI-Powered Network RCA",
-                "version": "2.0-enterprise"
-            }
-        }
+        return self.build_report_model(target, diagnostics, ai_analysis, incident_context, recent_changes)["technical"]
     
-    def save_to_blob(self, report_content: str, target: str, suffix: str = "") -> str:
+    def _blob_name(self, target: str, suffix: str, run_id: str = None) -> str:
+        """rca_<target>_<ULID><suffix>: time-ordered per target, unique across concurrent runs"""
+        safe_target = target.replace('/', '_').replace(':', '_')
+        return f"rca_{safe_target}_{run_id or new_ulid()}{suffix}"
+    
+    def blob_url(self, blob_name: str) -> str:
+        """URL a report will have once stored (computed locally, no request); None without storage"""
+        if not self.report_store:
+            return None
+        return self.report_store.url(blob_name)
+    
+    def upload_stream(self, blob_name: str, chunks: Iterable, content_type: str,
+                      content_encoding: str = None) -> str:
         """
-        Save report to Azure Blob Storage
-        ENTERPRISE ENHANCED: Supports multiple report types via suffix
-        Returns URL to the report or None if storage not configured
+        Stream chunks (str or bytes) into one report and return its URL; raises on failure
+        Blob Storage stages a block per REPORT_BLOCK_SIZE_BYTES and commits the list at the end
         """
-        if not self.blob_service_client:
+        url = self.report_store.write(blob_name, chunks, content_type, content_encoding)
+        logging.info(f"Report saved to storage: {blob_name}")
+        return url
+    
+    def upload_blob(self, blob_name: str, content, content_type: str, content_encoding: str = None) -> str:
+        """Upload one rendered report and return its URL; raises on failure (callers decide on retries)"""
+        return self.upload_stream(blob_name, (content,), content_type, content_encoding)
+    
+    def _upload(self, blob_name: str, chunks: Iterable, content_type: str, content_encoding: str = None) -> str:
+        """Stream one report; returns its URL, or None if storage is not configured or the upload failed"""
+        if not self.report_store:
             logging.warning("Blob storage not configured, skipping upload")
             return None
         
         try:
-            # Generate blob name
-            timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-            safe_target = target.replace('/', '_').replace(':', '_')
-            blob_name = f"rca_{safe_target}_{timestamp}{suffix}.txt"
-            
-            # Upload to blob
-            blob_client = self.blob_service_client.get_blob_client(
-                container=self.container_name,
-                blob=blob_name
-            )
-            
-            blob_client.upload_blob(
-                report_content,
-                overwrite=True,
-                content_settings=ContentSettings(content_type='text/plain')
-            )
-            
-            # Generate URL
-            url = blob_client.url
-            logging.info(f"Report saved to blob storage: {blob_name}")
-            
-            return url
-        
+            return self.upload_stream(blob_name, chunks, content_type, content_encoding)
         except Exception as e:
-            logging.error(f"Failed to save report to blob: {str(e)}")
+            logging.error(f"Failed to save report {blob_name} to blob: {str(e)}")
             return None
     
+    def plan_report_uploads(self, reports: Dict[str, str], target: str,
+                            storage_format: str = REPORT_STORAGE_FORMAT, model: Dict = None) -> List[Dict]:
+        """
+        Blob name, final URL and a chunk source for each object to store
+        "bundle": one gzip object with every format (report_urls key "bundle")
+        "files": one blob per format, as before
+        Names share the run's ULID, so the URLs are known before anything is uploaded
+        item["chunks"]() starts a fresh stream each call, so a failed upload can be retried
+        With the report model, each attempt re-renders from it (like the fleet report) and is
+        staged block by block; otherwise the rendered strings in reports are uploaded
+        """
+        if not reports:
+            return []
+        run_id = new_ulid()
+        
+        if storage_format == "bundle":
+            blob_name = self._blob_name(target, BUNDLE_SUFFIX, run_id)
+            return [{
+                "format": "bundle",
+                "url_key": "bundle",
+                "run_id": run_id,
+                "blob_name": blob_name,
+                "content_type": BUNDLE_CONTENT_TYPE,
+                "content_encoding": BUNDLE_CONTENT_ENCODING,
+                "url": self.blob_url(blob_name),
+                "chunks": lambda: compress_chunks(bundle_chunks(self._report_sources(reports, model), target, run_id))
+            }]
+        
+        plan = []
+        for report_format, content in reports.items():
+            suffix, content_type, url_key = REPORT_UPLOADS[report_format]
+            blob_name = self._blob_name(target, suffix, run_id)
+            if model is not None:
+                chunks = lambda report_format=report_format: self.iter_report(model, report_format)
+            else:
+                chunks = lambda content=content: (content,)
+            plan.append({
+                "format": report_format,
+                "url_key": url_key,
+                "run_id": run_id,
+                "blob_name": blob_name,
+                "content_type": content_type,
+                "content_encoding": None,
+                "url": self.blob_url(blob_name),
+                "chunks": chunks
+            })
+        return plan
+    
+    def _report_sources(self, reports: Dict[str, str], model: Dict = None) -> Dict:
+        """Bundle contents per format: renderer streams (technical report as the object) or the rendered strings"""
+        if model is None:
+            return reports
+        return {
+            report_format: model["technical"] if report_format == "json" else self.iter_report(model, report_format)
+            for report_format in reports
+        }
+    
+    def plan_fleet_report_upload(self, batch: Dict, fleet_analysis: Dict = None) -> List[Dict]:
+        """
+        Upload plan for the fleet report of a batch run: rendered, gzipped and staged
+        block by block while it uploads, never held whole in memory
+        """
+        run_id = new_ulid()
+        blob_name = self._blob_name("fleet", FLEET_REPORT_SUFFIX, run_id)
+        return [{
+            "format": "fleet",
+            "url_key": "fleet_report",
+            "run_id": run_id,
+            "blob_name": blob_name,
+            "content_type": "text/plain",
+            "content_encoding": "gzip",
+            "url": self.blob_url(blob_name),
+            "chunks": lambda: compress_chunks(self.iter_fleet_report(batch, fleet_analysis))
+        }]
+    
+    def save_reports(self, reports: Dict[str, str], target: str) -> Dict[str, str]:
+        """
+        Upload rendered reports (from render_reports) one after another; only the formats present are uploaded
+        Returns report_urls keyed like the /diagnose response (technical_text, executive_summary, ...)
+        See report_uploader for the non-blocking variant
+        """
+        return {
+            item["url_key"]: self._upload(item["blob_name"], item["chunks"](), item["content_type"],
+                                          item["content_encoding"])
+            for item in self.plan_report_uploads(reports, target)
+        }
+    
+    def read_report_bundle(self, blob_name: str) -> Dict:
+        """
+        Download and decode a stored bundle (blob name or full URL)
+        Returns {"run_id", "target", "formats", "reports": {format: content}}; reports["json"] is a dict
+        """
+        if not self.report_store:
+            raise RuntimeError("Blob storage not configured")
+        blob_name = blob_name.split("?")[0].rsplit("/", 1)[-1]
+        return unpack_bundle(self.report_store.read(blob_name))
+    
+    def save_to_blob(self, report_content: str, target: str, suffix: str = "") -> str:
+        """
+        Save report to Azure Blob Storage
+        ENTERPRISE ENHANCED: Supports multiple report types via suffix
+        Returns URL to the report or None if storage not configured
+        """
+        return self._upload(self._blob_name(target, f"{suffix}.txt"), (report_content,), 'text/plain')
+    
     def save_technical_json_to_blob(self, technical_report: Dict, target: str) -> str:
         """
         Save technical JSON report to Azure Blob Storage
         """
-        if not self.blob_service_client:
-            logging.warning("Blob storage not configured, skipping upload")
-            return None
-        
-        try:
-            # Generate blob name
-            timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-            safe_target = target.replace('/', '_').replace(':', '_')
-            blob_name = f"rca_{safe_target}_{timestamp}_technical.json"
-            
-            # Upload to blob
-            blob_client = self.blob_service_client.get_blob_client(
-                container=self.container_name,
-                blob=blob_name
-            )
-            
-            blob_client.upload_blob(
-                json.dumps(technical_report, indent=2),
-                overwrite=True,
-                content_settings=ContentSettings(content_type='application/json')
-            )
-            
-            # Generate URL
-            url = blob_client.url
-            logging.info(f"Technical JSON report saved to blob storage: {blob_name}")
-            
-            return url
-        
-        except Exception as e:
-            logging.error(f"Failed to save technical JSON to blob: {str(e)}")
-            return None
+        return self._upload(self._blob_name(target, "_technical.json"),
+                            json.JSONEncoder(indent=2).iterencode(technical_report), 'application/json')
     
     def generate_json_report(self, target: str, diagnostics: List[Dict], 
                             ai_analysis: Dict) -> Dict:
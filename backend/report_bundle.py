@@ -0,0 +1,94 @@
+"""
+Report Bundle Module
+Storage format for RCA reports: every format rendered for one run goes into a
+single gzip-compressed JSON object named by a ULID (time-ordered, collision-free)
+"""
+
+import os
+import gzip
+import json
+import time
+import zlib
+from typing import Dict, Iterable, Iterator
+
+# "bundle" stores one compressed object per run; "files" keeps one blob per format
+REPORT_STORAGE_FORMAT = os.getenv("REPORT_STORAGE_FORMAT", "bundle").lower()
+REPORT_BUNDLE_COMPRESSION_LEVEL = int(os.getenv("REPORT_BUNDLE_COMPRESSION_LEVEL", "6"))
+
+BUNDLE_VERSION = 1
+BUNDLE_SUFFIX = ".json.gz"
+BUNDLE_CONTENT_TYPE = "application/json"
+BUNDLE_CONTENT_ENCODING = "gzip"
+
+_CROCKFORD = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+
+
+def new_ulid() -> str:
+    """26-character ULID: 48-bit millisecond timestamp + 80 random bits, Crockford base32"""
+    value = (int(time.time() * 1000) << 80) | int.from_bytes(os.urandom(10), "big")
+    chars = []
+    for _ in range(26):
+        chars.append(_CROCKFORD[value & 31])
+        value >>= 5
+    return "".join(reversed(chars))
+
+
+def compress_chunks(chunks: Iterable) -> Iterator[bytes]:
+    """
+    Gzip a stream of str/bytes chunks incrementally (same container as gzip.compress, mtime 0)
+    Only the compressor window is held, never the whole payload
+    """
+    compressor = zlib.compressobj(REPORT_BUNDLE_COMPRESSION_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8") if isinstance(chunk, str) else chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _string_chunks(encoder: json.JSONEncoder, chunks: Iterable[str]) -> Iterator[str]:
+    """One JSON string from a stream of pieces; escaping is per character, so pieces encode independently"""
+    yield '"'
+    for chunk in chunks:
+        yield encoder.encode(chunk)[1:-1]
+    yield '"'
+
+
+def bundle_chunks(reports: Dict, target: str, run_id: str) -> Iterator[str]:
+    """
+    Bundle JSON, one piece at a time
+    Each report is its rendered text or an iterable of text chunks (streamed from the renderer);
+    the technical JSON may also be the object itself. It is re-embedded as an object, without
+    the indentation it is rendered with. Both forms produce the same bytes
+    """
+    encoder = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False)
+    yield (f'{{"bundle_version":{BUNDLE_VERSION},"run_id":{encoder.encode(run_id)},'
+           f'"target":{encoder.encode(target)},"formats":{encoder.encode(list(reports))},"reports":{{')
+    for i, (report_format, content) in enumerate(reports.items()):
+        yield f'{"," if i else ""}{encoder.encode(report_format)}:'
+        if report_format == "json":
+            yield from encoder.iterencode(json.loads(content) if isinstance(content, str) else content)
+        elif isinstance(content, str):
+            yield encoder.encode(content)
+        else:
+            yield from _string_chunks(encoder, content)
+    yield "}}"
+
+
+def pack_bundle(reports: Dict[str, str], target: str, run_id: str) -> bytes:
+    """Compress all rendered formats of one run into one object (see bundle_chunks)"""
+    return b"".join(compress_chunks(bundle_chunks(reports, target, run_id)))
+
+
+def unpack_bundle(data: bytes) -> Dict:
+    """
+    Inverse of pack_bundle; accepts compressed bytes or already-decoded JSON
+    (HTTP clients that honour Content-Encoding hand back the plain JSON)
+    The technical report comes back as a dict under reports["json"]
+    """
+    if data[:2] == b"\x1f\x8b":
+        data = gzip.decompress(data)
+    bundle = json.loads(data)
+    if bundle.get("bundle_version") != BUNDLE_VERSION:
+        raise ValueError(f"Unsupported report bundle version: {bundle.get('bundle_version')}")
+    return bundle
@@ -0,0 +1,240 @@
+"""
+Report History Module
+Local SQLite (WAL) index of every technical RCA, so questions like "all DNS incidents
+for target X last week" are one indexed query instead of listing and downloading blobs
+"""
+
+import os
+import json
+import sqlite3
+import logging
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+from report_bundle import new_ulid
+
+# Default to the temp dir: the app directory is read-only on some deployments
+REPORT_HISTORY_PATH = os.getenv("REPORT_HISTORY_PATH", os.path.join(tempfile.gettempdir(), "rca_history.db"))
+REPORT_HISTORY_PAGE_SIZE = int(os.getenv("REPORT_HISTORY_PAGE_SIZE", "50"))
+REPORT_HISTORY_MAX_PAGE_SIZE = int(os.getenv("REPORT_HISTORY_MAX_PAGE_SIZE", "500"))
+# After the database could not be created, how long requests skip it before trying again
+REPORT_HISTORY_RETRY_SECONDS = float(os.getenv("REPORT_HISTORY_RETRY_SECONDS", "60"))
+
+# Exact-match filters accepted by query(); values compare case-insensitively
+FILTER_COLUMNS = ("target", "category", "severity", "responsible_team", "root_cause_category")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reports (
+    report_id TEXT PRIMARY KEY,
+    target TEXT NOT NULL COLLATE NOCASE,
+    generated_at TEXT NOT NULL,
+    category TEXT COLLATE NOCASE,
+    severity TEXT COLLATE NOCASE,
+    responsible_team TEXT COLLATE NOCASE,
+    root_cause_category TEXT COLLATE NOCASE,
+    root_cause TEXT,
+    confidence_percentage REAL,
+    tests_run INTEGER,
+    tests_failed INTEGER,
+    report_urls TEXT,
+    technical TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_reports_time ON reports (generated_at, report_id);
+CREATE INDEX IF NOT EXISTS idx_reports_target ON reports (target, generated_at, report_id);
+CREATE INDEX IF NOT EXISTS idx_reports_category ON reports (category, generated_at, report_id);
+CREATE INDEX IF NOT EXISTS idx_reports_severity ON reports (severity, generated_at, report_id);
+CREATE INDEX IF NOT EXISTS idx_reports_team ON reports (responsible_team, generated_at, report_id);
+"""
+
+SUMMARY_COLUMNS = (
+    "report_id", "target", "generated_at", "category", "severity", "responsible_team",
+    "root_cause_category", "root_cause", "confidence_percentage", "tests_run", "tests_failed", "report_urls"
+)
+
+
+def _timestamp(value: str, name: str) -> str:
+    """Normalize an ISO-8601 filter bound to the stored format (naive UTC isoformat)"""
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        raise ValueError(f"Invalid '{name}' timestamp: {value} (expected ISO-8601)")
+    if parsed.tzinfo is not None:
+        parsed = (parsed - parsed.utcoffset()).replace(tzinfo=None)
+    return parsed.isoformat()
+
+
+def parse_history_query(params) -> Dict:
+    """Keyword arguments for ReportHistory.query from request query parameters"""
+    return {
+        "filters": {column: params.get(column) for column in FILTER_COLUMNS if params.get(column)},
+        "since": params.get("since"),
+        "until": params.get("until"),
+        "limit": params.get("limit"),
+        "cursor": params.get("cursor"),
+        "include_technical": str(params.get("include_technical", "")).lower() in ("1", "true", "yes")
+    }
+
+
+class ReportHistory:
+    def __init__(self, path: str = REPORT_HISTORY_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.recorded = 0
+        self.failed = 0
+        self.queries = 0
+        self._connect().executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread; WAL lets queries run while a report is being written"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def record(self, technical: Dict, report_urls: Dict = None) -> Optional[str]:
+        """
+        Store one technical RCA (RCAGenerator.generate_technical_report / model["technical"])
+        Returns its report_id, or None if the write failed; never raises into the request
+        """
+        analysis = technical.get("root_cause_analysis", {})
+        diagnostics = technical.get("diagnostics", {})
+        report_id = new_ulid()
+        try:
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    "INSERT INTO reports VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        report_id,
+                        technical.get("incident", {}).get("target"),
+                        technical.get("generated_at") or datetime.utcnow().isoformat(),
+                        analysis.get("category"),
+                        analysis.get("severity"),
+                        analysis.get("responsible_team"),
+                        analysis.get("root_cause_category"),
+                        analysis.get("root_cause"),
+                        analysis.get("confidence_percentage"),
+                        diagnostics.get("tests_run"),
+                        diagnostics.get("tests_failed"),
+                        json.dumps(report_urls) if report_urls else None,
+                        json.dumps(technical, default=str)
+                    )
+                )
+            with self._lock:
+                self.recorded += 1
+            return report_id
+        except Exception as e:
+            with self._lock:
+                self.failed += 1
+            logging.error(f"Failed to record report history: {str(e)}")
+            return None
+
+    def query(self, filters: Dict = None, since: str = None, until: str = None, limit: int = None,
+              cursor: str = None, include_technical: bool = False) -> Dict:
+        """
+        Newest first, keyset-paginated: pass back next_cursor to get the following page
+        filters: any of FILTER_COLUMNS; since/until: ISO-8601 bounds on generated_at (until exclusive)
+        Raises ValueError on bad parameters
+        """
+        try:
+            limit = REPORT_HISTORY_PAGE_SIZE if limit in (None, "") else int(limit)
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid limit: {limit}")
+        if not 1 <= limit <= REPORT_HISTORY_MAX_PAGE_SIZE:
+            raise ValueError(f"limit must be between 1 and {REPORT_HISTORY_MAX_PAGE_SIZE}")
+
+        clauses, params = [], []
+        for column, value in (filters or {}).items():
+            if column not in FILTER_COLUMNS:
+                raise ValueError(f"Unknown filter '{column}' (expected: {', '.join(FILTER_COLUMNS)})")
+            if value not in (None, ""):
+                clauses.append(f"{column} = ?")
+                params.append(str(value))
+        if since:
+            clauses.append("generated_at >= ?")
+            params.append(_timestamp(since, "since"))
+        if until:
+            clauses.append("generated_at < ?")
+            params.append(_timestamp(until, "until"))
+        if cursor:
+            generated_at, _, report_id = str(cursor).partition("|")
+            if not report_id:
+                raise ValueError(f"Invalid cursor: {cursor}")
+            clauses.append("(generated_at, report_id) < (?, ?)")
+            params.extend([generated_at, report_id])
+
+        columns = SUMMARY_COLUMNS + (("technical",) if include_technical else ())
+        sql = f"SELECT {', '.join(columns)} FROM reports"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY generated_at DESC, report_id DESC LIMIT ?"
+        # One extra row tells whether there is a next page without a COUNT(*)
+        rows = self._connect().execute(sql, params + [limit + 1]).fetchall()
+        with self._lock:
+            self.queries += 1
+
+        reports = [self._row(row) for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            last = reports[-1]
+            next_cursor = f"{last['generated_at']}|{last['report_id']}"
+        return {"reports": reports, "count": len(reports), "next_cursor": next_cursor}
+
+    def _row(self, row: sqlite3.Row) -> Dict:
+        report = dict(row)
+        report["report_urls"] = json.loads(report["report_urls"]) if report["report_urls"] else None
+        if "technical" in report:
+            report["technical"] = json.loads(report["technical"])
+        return report
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "path": self.path,
+                "recorded": self.recorded,
+                "failed": self.failed,
+                "queries": self.queries
+            }
+
+
+_history = None
+_history_failed_at = None
+_history_lock = threading.Lock()
+
+
+def get_report_history() -> Optional[ReportHistory]:
+    """
+    Return the process-wide report history (creates the database on first use)
+    Returns None if the database cannot be created (e.g. read-only path); callers skip recording.
+    The failure is remembered, so creation is retried only every REPORT_HISTORY_RETRY_SECONDS
+    """
+    global _history, _history_failed_at
+    with _history_lock:
+        if _history is None:
+            if _history_failed_at is not None and time.monotonic() - _history_failed_at < REPORT_HISTORY_RETRY_SECONDS:
+                return None
+            try:
+                _history = ReportHistory(REPORT_HISTORY_PATH)
+            except (sqlite3.Error, OSError) as e:
+                _history_failed_at = time.monotonic()
+                logging.error(f"Report history unavailable at {REPORT_HISTORY_PATH}, "
+                              f"retrying in {REPORT_HISTORY_RETRY_SECONDS}s: {str(e)}")
+                return None
+            _history_failed_at = None
+        return _history
+
+
+def report_history_stats() -> Dict:
+    """stats() for /api/health, or why the history is unavailable"""
+    history = get_report_history()
+    if history is None:
+        return {"path": REPORT_HISTORY_PATH, "status": "unavailable"}
+    return history.stats()
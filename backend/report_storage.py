@@ -0,0 +1,120 @@
+"""
+Report Storage Module
+Streaming writers for RCA reports: chunks from the renderers go straight to
+storage in fixed-size blocks, so memory stays bounded by the block size rather
+than the report size
+"""
+
+import os
+import base64
+import logging
+from pathlib import Path
+from typing import Iterable, Union
+from azure.storage.blob import BlobBlock, ContentSettings
+
+# Set to store reports on the local filesystem instead of Azure Blob Storage (tests, local development)
+REPORT_LOCAL_STORE_DIR = os.getenv("REPORT_LOCAL_STORE_DIR")
+# Staged block size; also the most a single upload holds in memory
+REPORT_BLOCK_SIZE_BYTES = int(os.getenv("REPORT_BLOCK_SIZE_BYTES", str(4 * 1024 * 1024)))
+
+Chunk = Union[str, bytes]
+
+
+def iter_blocks(chunks: Iterable[Chunk], block_size: int = REPORT_BLOCK_SIZE_BYTES) -> Iterable[bytes]:
+    """Re-cut a stream of str/bytes chunks into blocks of block_size bytes (the last one may be shorter)"""
+    buffer = bytearray()
+    for chunk in chunks:
+        buffer += chunk.encode("utf-8") if isinstance(chunk, str) else chunk
+        while len(buffer) >= block_size:
+            yield bytes(buffer[:block_size])
+            del buffer[:block_size]
+    if buffer:
+        yield bytes(buffer)
+
+
+class BlobReportStore:
+    """Azure block blobs: each block is staged as it fills, then the block list is committed once"""
+
+    def __init__(self, blob_service_client, container_name: str, block_size: int = REPORT_BLOCK_SIZE_BYTES):
+        self.blob_service_client = blob_service_client
+        self.container_name = container_name
+        self.block_size = max(1, block_size)
+
+    def url(self, blob_name: str) -> str:
+        return self.blob_service_client.get_blob_client(container=self.container_name, blob=blob_name).url
+
+    def write(self, blob_name: str, chunks: Iterable[Chunk], content_type: str,
+              content_encoding: str = None) -> str:
+        """Stream chunks into one blob and return its URL; nothing is visible until the commit"""
+        blob_client = self.blob_service_client.get_blob_client(container=self.container_name, blob=blob_name)
+        content_settings = ContentSettings(content_type=content_type, content_encoding=content_encoding)
+
+        blocks = iter_blocks(chunks, self.block_size)
+        first = next(blocks, b"")
+        second = next(blocks, None)
+        if second is None:
+            # Fits in one block: a single Put Blob request
+            blob_client.upload_blob(first, overwrite=True, content_settings=content_settings)
+            return blob_client.url
+
+        block_list = [self._stage(blob_client, 0, first), self._stage(blob_client, 1, second)]
+        for data in blocks:
+            block_list.append(self._stage(blob_client, len(block_list), data))
+        blob_client.commit_block_list(block_list, content_settings=content_settings)
+        logging.info(f"Committed {len(block_list)} blocks to {blob_name}")
+        return blob_client.url
+
+    def _stage(self, blob_client, index: int, data: bytes) -> BlobBlock:
+        # Block IDs must all have the same length within a blob
+        block_id = base64.b64encode(f"{index:08d}".encode()).decode()
+        blob_client.stage_block(block_id, data, length=len(data))
+        return BlobBlock(block_id=block_id)
+
+    def read(self, blob_name: str) -> bytes:
+        return self.blob_service_client.get_blob_client(
+            container=self.container_name, blob=blob_name
+        ).download_blob().readall()
+
+
+class LocalReportStore:
+    """Filesystem stand-in with the same interface; files appear atomically once fully written"""
+
+    def __init__(self, root: str, block_size: int = REPORT_BLOCK_SIZE_BYTES):
+        self.root = Path(root).resolve()
+        self.block_size = max(1, block_size)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, blob_name: str) -> Path:
+        path = (self.root / blob_name).resolve()
+        if path.parent != self.root:
+            raise ValueError(f"Invalid report name: {blob_name}")
+        return path
+
+    def url(self, blob_name: str) -> str:
+        return self._path(blob_name).as_uri()
+
+    def write(self, blob_name: str, chunks: Iterable[Chunk], content_type: str,
+              content_encoding: str = None) -> str:
+        path = self._path(blob_name)
+        partial = path.with_name(path.name + ".part")
+        try:
+            with open(partial, "wb") as f:
+                for data in iter_blocks(chunks, self.block_size):
+                    f.write(data)
+            os.replace(partial, path)
+        except BaseException:
+            partial.unlink(missing_ok=True)
+            raise
+        return path.as_uri()
+
+    def read(self, blob_name: str) -> bytes:
+        return self._path(blob_name).read_bytes()
+
+
+def create_report_store(blob_service_client, container_name: str):
+    """Local directory if REPORT_LOCAL_STORE_DIR is set, else Azure Blob Storage; None when neither is available"""
+    if REPORT_LOCAL_STORE_DIR:
+        return LocalReportStore(REPORT_LOCAL_STORE_DIR)
+    if blob_service_client:
+        return BlobReportStore(blob_service_client, container_name)
+    return None
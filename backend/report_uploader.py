@@ -0,0 +1,193 @@
+"""
+Report Uploader Module
+Moves RCA report uploads off the request path: blob URLs are decided up front,
+uploads run on a bounded background queue with retries, and callers poll the
+upload status by upload_id
+"""
+
+import os
+import copy
+import time
+import uuid
+import queue
+import random
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+REPORT_UPLOAD_WORKERS = int(os.getenv("REPORT_UPLOAD_WORKERS", "4"))
+# Pending blob uploads; when full, the caller uploads inline instead of dropping the report
+REPORT_UPLOAD_QUEUE_SIZE = int(os.getenv("REPORT_UPLOAD_QUEUE_SIZE", "256"))
+REPORT_UPLOAD_MAX_ATTEMPTS = int(os.getenv("REPORT_UPLOAD_MAX_ATTEMPTS", "4"))
+REPORT_UPLOAD_BACKOFF_SECONDS = float(os.getenv("REPORT_UPLOAD_BACKOFF_SECONDS", "0.5"))
+REPORT_UPLOAD_STATUS_MAX_ENTRIES = int(os.getenv("REPORT_UPLOAD_STATUS_MAX_ENTRIES", "2048"))
+REPORT_UPLOAD_STATUS_TTL_SECONDS = float(os.getenv("REPORT_UPLOAD_STATUS_TTL_SECONDS", "3600"))
+
+
+class ReportUploader:
+    def __init__(self, workers: int = REPORT_UPLOAD_WORKERS, queue_size: int = REPORT_UPLOAD_QUEUE_SIZE,
+                 max_attempts: int = REPORT_UPLOAD_MAX_ATTEMPTS):
+        self.max_attempts = max(1, max_attempts)
+        self._queue = queue.Queue(maxsize=max(1, queue_size))
+        self._status = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.retries = 0
+        self.inline = 0
+
+        self._workers = [
+            threading.Thread(target=self._worker, name=f"report-upload-{i}", daemon=True)
+            for i in range(max(1, workers))
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, generator, reports: Dict[str, str], target: str, model: Dict = None) -> Dict:
+        """
+        Queue the rendered reports for upload and return immediately
+        Pass the report model to have workers stream each report from it block by block
+        Returns {"report_urls": {...}, "report_upload": {"upload_id", "status"}}; URLs are final
+        but only resolve once the upload status is complete
+        """
+        return self.submit_plan(generator, generator.plan_report_uploads(reports, target, model=model))
+
+    def submit_plan(self, generator, plan: List[Dict]) -> Dict:
+        """Queue an upload plan (RCAGenerator.plan_*); each item is streamed to storage by a worker"""
+        report_urls = {item["url_key"]: item["url"] for item in plan}
+
+        if not generator.report_store or not plan:
+            if plan:
+                logging.warning("Blob storage not configured, skipping upload")
+            return {"report_urls": report_urls, "report_upload": {"upload_id": None, "status": "skipped"}}
+
+        upload_id = uuid.uuid4().hex
+        with self._lock:
+            self._status[upload_id] = {
+                "upload_id": upload_id,
+                "status": "pending",
+                "uploads": {
+                    item["url_key"]: {"blob_name": item["blob_name"], "url": item["url"],
+                                      "status": "pending", "attempts": 0, "error": None}
+                    for item in plan
+                },
+                "updated_at": time.time()
+            }
+            self._status.move_to_end(upload_id)
+            while len(self._status) > REPORT_UPLOAD_STATUS_MAX_ENTRIES:
+                self._status.popitem(last=False)
+            self.submitted += len(plan)
+
+        for item in plan:
+            try:
+                self._queue.put_nowait((generator, upload_id, item))
+            except queue.Full:
+                # Backpressure: keep the report, pay the latency on this request only
+                with self._lock:
+                    self.inline += 1
+                logging.warning(f"Report upload queue full, uploading {item['blob_name']} inline")
+                self._upload(generator, upload_id, item)
+
+        return {"report_urls": report_urls, "report_upload": {"upload_id": upload_id, "status": "pending"}}
+
+    def _worker(self):
+        while True:
+            generator, upload_id, item = self._queue.get()
+            try:
+                self._upload(generator, upload_id, item)
+            except Exception as e:
+                logging.error(f"Report upload worker error: {str(e)}", exc_info=True)
+            finally:
+                self._queue.task_done()
+
+    def _upload(self, generator, upload_id: str, item: Dict):
+        """Stream one report with jittered exponential backoff between attempts (each attempt re-renders)"""
+        for attempt in range(1, self.max_attempts + 1):
+            self._update(upload_id, item["url_key"], "uploading", attempts=attempt)
+            try:
+                generator.upload_stream(item["blob_name"], item["chunks"](), item["content_type"],
+                                        item.get("content_encoding"))
+                self._update(upload_id, item["url_key"], "complete")
+                with self._lock:
+                    self.completed += 1
+                return
+            except Exception as e:
+                if attempt == self.max_attempts:
+                    logging.error(f"Report upload {item['blob_name']} failed after {attempt} attempts: {str(e)}")
+                    self._update(upload_id, item["url_key"], "failed", error=str(e))
+                    with self._lock:
+                        self.failed += 1
+                    return
+                with self._lock:
+                    self.retries += 1
+                delay = random.uniform(0, REPORT_UPLOAD_BACKOFF_SECONDS * (2 ** (attempt - 1)))
+                logging.warning(f"Report upload {item['blob_name']} failed ({str(e)}), retry in {delay:.2f}s")
+                time.sleep(delay)
+
+    def _update(self, upload_id: str, url_key: str, status: str, attempts: int = None, error: str = None):
+        with self._lock:
+            entry = self._status.get(upload_id)
+            if entry is None:
+                return  # Evicted
+            upload = entry["uploads"][url_key]
+            upload["status"] = status
+            if attempts is not None:
+                upload["attempts"] = attempts
+            if error is not None:
+                upload["error"] = error
+
+            statuses = [u["status"] for u in entry["uploads"].values()]
+            if all(s == "complete" for s in statuses):
+                entry["status"] = "complete"
+            elif all(s in ("complete", "failed") for s in statuses):
+                entry["status"] = "failed"
+            else:
+                entry["status"] = "pending"
+            entry["updated_at"] = time.time()
+
+    def status(self, upload_id: str) -> Optional[Dict]:
+        """Upload status: pending until every report is stored, then complete (or failed)"""
+        with self._lock:
+            entry = self._status.get(upload_id)
+            if entry is not None and entry["updated_at"] + REPORT_UPLOAD_STATUS_TTL_SECONDS <= time.time():
+                del self._status[upload_id]
+                entry = None
+            return copy.deepcopy(entry)
+
+    def wait(self, timeout: float = None) -> bool:
+        """Block until the queue drains (tests, shutdown); False on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "workers": len(self._workers),
+                "queue_depth": self._queue.qsize(),
+                "queue_size": self._queue.maxsize,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "retries": self.retries,
+                "inline_uploads": self.inline
+            }
+
+
+_uploader = None
+_uploader_lock = threading.Lock()
+
+
+def get_report_uploader() -> ReportUploader:
+    """Return the process-wide report uploader (starts its worker threads on first use)"""
+    global _uploader
+    with _uploader_lock:
+        if _uploader is None:
+            _uploader = ReportUploader()
+        return _uploader
@@ -0,0 +1,478 @@
+"""
+Rule Engine Module
+Declarative rule-based root cause analysis: rules are compiled once into a
+decision table keyed by the first failing stage, then evaluated without an LLM
+"""
+
+import re
+import time
+import threading
+import logging
+from typing import Dict, List, Tuple
+
+FAILED_STATUSES = ("FAIL", "INFERRED_FAIL")
+HEALTHY = "HEALTHY"
+
+# Rule conditions ("when"), all optional and AND-ed:
+#   stage          first failing test name, or HEALTHY when every test passed
+#   reason         regex (case-insensitive) searched in that test's failure_reason
+#   http_status    (low, high) inclusive range of the HTTP_STATUS status code
+#   avg_latency_ms [low, high) range of the average latency over all tests
+#   change         recent_changes flag that must be set
+#   failed         test names that must also have failed directly (status FAIL)
+# Rules are tried in list order within a stage; the first match wins.
+# Template strings may use {reason}, {test_name}, {avg_latency}, {latency_ms}, {http_status};
+# "defaults" fills facts that are missing (e.g. a failure without a reason).
+
+_HEALTHY_ANALYSIS = {
+    "root_cause": "No issues detected; all tests passed successfully",
+    "reasoning": "All diagnostic tests (DNS, TCP, HTTP, latency) passed successfully. Average latency: {avg_latency:.0f}ms. The target is reachable and responding normally.",
+    "evidence": [
+        "DNS resolution successful",
+        "TCP connectivity established",
+        "HTTP response received",
+        "Average latency: {avg_latency:.0f}ms"
+    ],
+    "remediation_steps": ["No action required - system is healthy"],
+    "severity": "INFO",
+    "category": "HEALTHY",
+    "root_cause_category": "Network Issue",
+    "responsibility_reason": "All network layers functioning normally - no issues detected",
+    "responsible_team": "Network Operations"
+}
+
+RULES = [
+    # Healthy: confidence falls as latency rises
+    {"name": "healthy_excellent", "when": {"stage": HEALTHY, "avg_latency_ms": (None, 100)},
+     "analysis": dict(_HEALTHY_ANALYSIS, confidence_percentage=95)},
+    {"name": "healthy_good", "when": {"stage": HEALTHY, "avg_latency_ms": (100, 200)},
+     "analysis": dict(_HEALTHY_ANALYSIS, confidence_percentage=90)},
+    {"name": "healthy_degraded", "when": {"stage": HEALTHY, "avg_latency_ms": (200, 500)},
+     "analysis": dict(_HEALTHY_ANALYSIS, confidence_percentage=75)},
+    {"name": "healthy_poor", "when": {"stage": HEALTHY},
+     "analysis": dict(_HEALTHY_ANALYSIS, confidence_percentage=65)},
+
+    {"name": "dns_nxdomain", "when": {"stage": "DNS_RESOLUTION", "reason": r"NXDOMAIN|No A/AAAA records|Name or service not known"},
+     "defaults": {"reason": "Unknown error"},
+     "analysis": {
+         "root_cause": "DNS name does not exist (NXDOMAIN or no address records)",
+         "confidence_percentage": 92,
+         "reasoning": "The DNS servers answered authoritatively that the name has no address records. The resolvers are working; the record itself is missing or misspelled.",
+         "evidence": [
+             "DNS lookup failed: {reason}",
+             "All downstream tests inferred as failed due to DNS failure"
+         ],
+         "remediation_steps": [
+             "Verify the domain name is spelled correctly",
+             "Check that the A/AAAA record exists in the authoritative zone",
+             "Verify domain registration and nameserver delegation",
+             "Review recent DNS zone changes"
+         ],
+         "severity": "HIGH",
+         "category": "DNS",
+         "root_cause_category": "Network Issue",
+         "responsibility_reason": "DNS records and zone configuration are managed by network operations",
+         "responsible_team": "Network Operations"
+     }},
+    {"name": "dns_timeout", "when": {"stage": "DNS_RESOLUTION", "reason": r"no answer within|No usable answer|timed? ?out"},
+     "defaults": {"reason": "Unknown error"},
+     "analysis": {
+         "root_cause": "DNS resolver timeout",
+         "confidence_percentage": 85,
+         "reasoning": "No DNS server answered in time. The resolvers are unreachable or overloaded, so the name could not be resolved and all downstream connectivity failed.",
+         "evidence": [
+             "DNS lookup failed: {reason}",
+             "All downstream tests inferred as failed due to DNS failure"
+         ],
+         "remediation_steps": [
+             "Check reachability of the configured DNS servers (UDP/TCP 53)",
+             "Try alternative DNS servers (e.g., 8.8.8.8, 1.1.1.1)",
+             "Check firewall rules for outbound DNS traffic",
+             "Review DNS server load and health"
+         ],
+         "severity": "HIGH",
+         "category": "DNS",
+         "root_cause_category": "Network Issue",
+         "responsibility_reason": "DNS resolution is a network-layer service managed by network operations",
+         "responsible_team": "Network Operations"
+     }},
+    {"name": "dns_failure", "when": {"stage": "DNS_RESOLUTION"},
+     "defaults": {"reason": "Unknown error"},
+     "analysis": {
+         "root_cause": "DNS resolution failure",
+         "confidence_percentage": 90,
+         "reasoning": "The domain name could not be resolved to an IP address. This is the root cause preventing all downstream connectivity.",
+         "evidence": [
+             "DNS lookup failed: {reason}",
+             "All downstream tests inferred as failed due to DNS failure"
+         ],
+         "remediation_steps": [
+             "Verify the domain name is correct and exists",
+             "Check DNS server configuration",
+             "Try alternative DNS servers (e.g., 8.8.8.8, 1.1.1.1)",
+             "Verify domain registration and nameserver configuration"
+         ],
+         "severity": "HIGH",
+         "category": "DNS",
+         "root_cause_category": "Network Issue",
+         "responsibility_reason": "DNS resolution is a network-layer service managed by network operations",
+         "responsible_team": "Network Operations"
+     }},
+
+    {"name": "tcp_refused", "when": {"stage": "TCP_CONNECTIVITY", "reason": r"refused"},
+     "defaults": {"reason": "Connection refused"},
+     "analysis": {
+         "root_cause": "Service not listening on the target port (connection refused)",
+         "confidence_percentage": 88,
+         "reasoning": "DNS resolution succeeded and the host actively refused the TCP connection. The host is reachable but nothing is accepting connections on the port.",
+         "evidence": [
+             "DNS resolution successful",
+             "TCP connection failed: {reason}"
+         ],
+         "remediation_steps": [
+             "Verify the service is running on the target host",
+             "Check the service is bound to the correct interface and port",
+             "Review service logs for crashes or restarts",
+             "Confirm the correct port number"
+         ],
+         "severity": "HIGH",
+         "category": "APPLICATION",
+         "root_cause_category": "Application Issue",
+         "responsibility_reason": "A refused connection means the host is reachable but the service is not listening",
+         "responsible_team": "Application Team"
+     }},
+    {"name": "tcp_failure", "when": {"stage": "TCP_CONNECTIVITY"},
+     "defaults": {"reason": "Port unreachable"},
+     "analysis": {
+         "root_cause": "TCP port connectivity failure",
+         "confidence_percentage": 85,
+         "reasoning": "DNS resolution succeeded but TCP connection to the target port failed. This suggests a firewall, network ACL, or service availability issue.",
+         "evidence": [
+             "DNS resolution successful",
+             "TCP connection failed: {reason}"
+         ],
+         "remediation_steps": [
+             "Verify the service is running on the target host",
+             "Check firewall rules (host-based and network-based)",
+             "Verify network ACLs and security groups",
+             "Confirm the correct port number",
+             "Check if the service is bound to the correct interface"
+         ],
+         "severity": "HIGH",
+         "category": "FIREWALL",
+         "root_cause_category": "Network Issue",
+         "responsibility_reason": "Port blocking indicates firewall or network ACL configuration issue",
+         "responsible_team": "Network Operations"
+     }},
+
+    {"name": "http_tls", "when": {"stage": "HTTP_STATUS", "reason": r"SSL|TLS|certificate"},
+     "defaults": {"reason": "SSL/TLS error"},
+     "analysis": {
+         "root_cause": "TLS/SSL handshake failure",
+         "confidence_percentage": 88,
+         "reasoning": "DNS and TCP connectivity succeeded but the TLS handshake failed. The certificate is invalid, expired or does not match the host, or the protocol versions are incompatible.",
+         "evidence": [
+             "DNS and TCP connectivity successful",
+             "HTTP request failed: {reason}"
+         ],
+         "remediation_steps": [
+             "Check certificate validity dates and hostname (SAN) match",
+             "Verify the full certificate chain is served",
+             "Check supported TLS versions and cipher suites",
+             "Review recent certificate renewals or load balancer changes"
+         ],
+         "severity": "HIGH",
+         "category": "SSL",
+         "root_cause_category": "Application Issue",
+         "responsibility_reason": "Certificates and TLS termination are configured on the service or its load balancer",
+         "responsible_team": "Application Team"
+     }},
+    {"name": "http_server_error", "when": {"stage": "HTTP_STATUS", "http_status": (500, 599)},
+     "analysis": {
+         "root_cause": "Server-side application error (HTTP {http_status})",
+         "confidence_percentage": 85,
+         "reasoning": "Network connectivity is established and the server answered with HTTP {http_status}. The application or an upstream it depends on is failing.",
+         "evidence": [
+             "DNS and TCP connectivity successful",
+             "HTTP request failed: HTTP {http_status}"
+         ],
+         "remediation_steps": [
+             "Check application and web server error logs",
+             "Verify upstream dependencies (databases, APIs) are healthy",
+             "Check for resource exhaustion (CPU, memory, connections)",
+             "Review recent application deployments or changes"
+         ],
+         "severity": "HIGH",
+         "category": "APPLICATION",
+         "root_cause_category": "Application Issue",
+         "responsibility_reason": "A 5xx response means the service is reachable but failing internally",
+         "responsible_team": "Application Team"
+     }},
+    {"name": "http_client_error", "when": {"stage": "HTTP_STATUS", "http_status": (400, 499)},
+     "analysis": {
+         "root_cause": "Request rejected by the application (HTTP {http_status})",
+         "confidence_percentage": 80,
+         "reasoning": "Network connectivity is established but the server rejected the request with HTTP {http_status}. The URL, authentication or access policy does not match what the client sends.",
+         "evidence": [
+             "DNS and TCP connectivity successful",
+             "HTTP request failed: HTTP {http_status}"
+         ],
+         "remediation_steps": [
+             "Verify the requested URL and path",
+             "Check authentication and access policies (WAF, IP allow lists)",
+             "Review routing and virtual host configuration",
+             "Review recent application deployments or changes"
+         ],
+         "severity": "MEDIUM",
+         "category": "CONFIGURATION",
+         "root_cause_category": "Application Issue",
+         "responsibility_reason": "A 4xx response is returned by the application's own routing or access configuration",
+         "responsible_team": "Application Team"
+     }},
+    {"name": "http_failure", "when": {"stage": "HTTP_STATUS"},
+     "defaults": {"reason": "Unknown error"},
+     "analysis": {
+         "root_cause": "HTTP/Application layer failure",
+         "confidence_percentage": 80,
+         "reasoning": "Network connectivity is established but the HTTP request failed. This indicates an application-level issue.",
+         "evidence": [
+             "DNS and TCP connectivity successful",
+             "HTTP request failed: {reason}"
+         ],
+         "remediation_steps": [
+             "Check web server logs for errors",
+             "Verify SSL/TLS certificate validity",
+             "Check application configuration",
+             "Verify web server is running and not overloaded",
+             "Review recent application deployments or changes"
+         ],
+         "severity": "MEDIUM",
+         "category": "APPLICATION",
+         "root_cause_category": "Application Issue",
+         "responsibility_reason": "HTTP layer failure with successful network connectivity indicates application-level problem",
+         "responsible_team": "Application Team"
+     }},
+
+    # Catch-all for any other stage
+    {"name": "unknown_failure", "when": {},
+     "analysis": {
+         "root_cause": "Unknown failure",
+         "confidence_percentage": 50,
+         "reasoning": "A failure was detected but the specific cause could not be determined.",
+         "evidence": ["Test {test_name} failed"],
+         "remediation_steps": [
+             "Review detailed diagnostic logs",
+             "Perform manual troubleshooting",
+             "Contact network administrator"
+         ],
+         "severity": "MEDIUM",
+         "category": "UNKNOWN",
+         "root_cause_category": "Network Issue",
+         "responsibility_reason": "Unable to determine specific category - defaulting to network operations",
+         "responsible_team": "Network Operations"
+     }}
+]
+
+# Failing stage + reported change -> change_correlation (first match wins)
+CHANGE_CORRELATIONS = [
+    {"stage": "DNS_RESOLUTION", "change": "recent_dns_change",
+     "message": "High correlation: Recent DNS change likely caused resolution failure"},
+    {"stage": "TCP_CONNECTIVITY", "change": "recent_firewall_change",
+     "message": "High correlation: Recent firewall change likely blocked the port"},
+    {"stage": "HTTP_STATUS", "change": "recent_deployment",
+     "message": "High correlation: Recent deployment may have broken the service"}
+]
+
+
+def _compile_value(value):
+    """Template value -> (needs_format, value); lists are compiled element-wise"""
+    if isinstance(value, str):
+        return ("{" in value, value)
+    if isinstance(value, list):
+        return ("list", [_compile_value(item) for item in value])
+    return (False, value)
+
+
+def _render_value(compiled, facts: Dict):
+    kind, value = compiled
+    if kind == "list":
+        return [_render_value(item, facts) for item in value]
+    if kind:
+        return value.format_map(facts)
+    return value
+
+
+class CompiledRule:
+    """One rule with its regex compiled and its template pre-split into static and formatted fields"""
+
+    def __init__(self, rule: Dict):
+        when = rule.get("when", {})
+        unknown = set(when) - {"stage", "reason", "http_status", "avg_latency_ms", "change", "failed"}
+        if unknown:
+            raise ValueError(f"Rule {rule.get('name')}: unknown conditions {', '.join(sorted(unknown))}")
+        if "name" not in rule or "analysis" not in rule:
+            raise ValueError("Rules need a name and an analysis template")
+
+        self.name = rule["name"]
+        self.stage = when.get("stage")
+        self.reason = re.compile(when["reason"], re.IGNORECASE) if when.get("reason") else None
+        self.http_status = when.get("http_status")
+        self.avg_latency_ms = when.get("avg_latency_ms")
+        self.change = when.get("change")
+        self.failed = tuple(when.get("failed", ()))
+        self.defaults = rule.get("defaults", {})
+        self.template = [(field, _compile_value(value)) for field, value in rule["analysis"].items()]
+
+    def matches(self, facts: Dict, recent_changes: Dict) -> bool:
+        if self.reason is not None and not self.reason.search(facts["reason"] or ""):
+            return False
+        if self.http_status is not None:
+            status = facts["http_status"]
+            if status is None or not self.http_status[0] <= status <= self.http_status[1]:
+                return False
+        if self.avg_latency_ms is not None:
+            low, high = self.avg_latency_ms
+            latency = facts["avg_latency"]
+            if (low is not None and latency < low) or (high is not None and latency >= high):
+                return False
+        if self.change is not None and not (recent_changes and recent_changes.get(self.change)):
+            return False
+        for test_name in self.failed:
+            if test_name not in facts["failed"]:
+                return False
+        return True
+
+    def render(self, facts: Dict) -> Dict:
+        if self.defaults:
+            facts = dict(facts)
+            for key, value in self.defaults.items():
+                if facts.get(key) is None:
+                    facts[key] = value
+        return {field: _render_value(value, facts) for field, value in self.template}
+
+
+class RuleEngine:
+    """Decision table: stage -> ordered compiled rules (wildcard rules merged in rule order)"""
+
+    def __init__(self, rules: List[Dict] = None, change_correlations: List[Dict] = None):
+        start = time.perf_counter()
+        compiled = [CompiledRule(rule) for rule in (RULES if rules is None else rules)]
+
+        stages = []
+        for rule in compiled:
+            if rule.stage is not None and rule.stage not in stages:
+                stages.append(rule.stage)
+        self.table = {stage: [r for r in compiled if r.stage in (stage, None)] for stage in stages}
+        self.wildcard = [r for r in compiled if r.stage is None]
+
+        self.correlations = {}
+        for entry in (CHANGE_CORRELATIONS if change_correlations is None else change_correlations):
+            self.correlations.setdefault(entry["stage"], []).append((entry["change"], entry["message"]))
+
+        self.rule_count = len(compiled)
+        logging.info(f"Rule engine compiled {self.rule_count} rules into {len(self.table)} stages "
+                     f"in {(time.perf_counter() - start) * 1000:.2f}ms")
+
+    def _facts(self, diagnostics: List[Dict]) -> Dict:
+        """Everything the rules look at, gathered in one pass"""
+        first_failure = None
+        failed = set()
+        http_status = None
+        total_latency = 0
+        for test in diagnostics:
+            total_latency += test.get("latency_ms", 0) or 0
+            status = test["status"]
+            if status in FAILED_STATUSES:
+                if first_failure is None:
+                    first_failure = test
+                if status == "FAIL":
+                    failed.add(test["test_name"])
+            if test["test_name"] == "HTTP_STATUS" and test.get("details"):
+                http_status = test["details"].get("status_code")
+
+        return {
+            "stage": first_failure["test_name"] if first_failure else HEALTHY,
+            "test_name": first_failure["test_name"] if first_failure else None,
+            "reason": first_failure.get("failure_reason") if first_failure else None,
+            "latency_ms": first_failure.get("latency_ms", 0) if first_failure else 0,
+            "avg_latency": total_latency / len(diagnostics) if diagnostics else 0,
+            "http_status": http_status,
+            "failed": failed
+        }
+
+    def match(self, diagnostics: List[Dict], recent_changes: Dict = None):
+        """(matched rule name, facts) for one diagnostic set"""
+        facts = self._facts(diagnostics)
+        for rule in self.table.get(facts["stage"], self.wildcard):
+            if rule.matches(facts, recent_changes):
+                return rule, facts
+        return None, facts
+
+    def evaluate(self, diagnostics: List[Dict], incident_context: Dict = None,
+                 recent_changes: Dict = None) -> Dict:
+        """Analysis for one diagnostic set, in the AI analysis schema"""
+        rule, facts = self.match(diagnostics, recent_changes)
+        if rule is None:
+            raise ValueError(f"No rule matched stage {facts['stage']}; add a catch-all rule")
+
+        analysis = rule.render(facts)
+        change_correlation = None
+        if recent_changes:
+            for change, message in self.correlations.get(facts["stage"], ()):
+                if recent_changes.get(change):
+                    change_correlation = message
+                    break
+        analysis["change_correlation"] = change_correlation
+        return analysis
+
+    def evaluate_batch(self, items: List[Dict], incident_context: Dict = None,
+                       recent_changes: Dict = None) -> List[Dict]:
+        """
+        Evaluate many diagnostic sets (offline analysis, benchmarks)
+        items: [{"diagnostics": [...], "recent_changes": {...}}, ...]; per-item changes override the shared ones
+        """
+        evaluate = self.evaluate
+        return [
+            evaluate(item["diagnostics"], incident_context, item.get("recent_changes", recent_changes))
+            for item in items
+        ]
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_rule_engine() -> RuleEngine:
+    """Return the process-wide compiled rule engine"""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = RuleEngine()
+        return _engine
+
+
+if __name__ == "__main__":
+    # Throughput check: python rule_engine.py [count]
+    import sys
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    samples = [
+        [{"test_name": "DNS_RESOLUTION", "status": "PASS", "latency_ms": 12, "details": {}, "failure_reason": None},
+         {"test_name": "TCP_CONNECTIVITY", "status": "PASS", "latency_ms": 20, "details": {}, "failure_reason": None},
+         {"test_name": "HTTP_STATUS", "status": "PASS", "latency_ms": 80, "details": {"status_code": 200}, "failure_reason": None}],
+        [{"test_name": "DNS_RESOLUTION", "status": "FAIL", "latency_ms": 30, "details": None,
+          "failure_reason": "DNS resolution failed: NXDOMAIN for example.invalid"},
+         {"test_name": "TCP_CONNECTIVITY", "status": "INFERRED_FAIL", "latency_ms": 0, "details": None,
+          "failure_reason": "Inferred failure: DNS resolution failed"}],
+        [{"test_name": "DNS_RESOLUTION", "status": "PASS", "latency_ms": 12, "details": {}, "failure_reason": None},
+         {"test_name": "TCP_CONNECTIVITY", "status": "PASS", "latency_ms": 20, "details": {}, "failure_reason": None},
+         {"test_name": "HTTP_STATUS", "status": "FAIL", "latency_ms": 80, "details": {"status_code": 503},
+          "failure_reason": "HTTP 503"}]
+    ]
+    items = [{"diagnostics": samples[i % len(samples)]} for i in range(count)]
+
+    engine = get_rule_engine()
+    start = time.perf_counter()
+    engine.evaluate_batch(items, recent_changes={"recent_deployment": True})
+    elapsed = time.perf_counter() - start
+    print(f"{count} diagnostic sets in {elapsed:.3f}s ({count / elapsed:,.0f}/s)")
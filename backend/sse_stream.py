@@ -0,0 +1,109 @@
+"""
+SSE Stream Module
+Server-Sent Events variant of the diagnose pipeline: each diagnostic result,
+the AI analysis tokens and the report URLs are emitted as soon as they exist
+"""
+
+import json
+import time
+import logging
+from datetime import datetime
+from typing import Dict, Iterator, Tuple
+
+from diagnostics import NetworkDiagnostics
+from components import get_ai_analyzer, get_rca_generator
+from rca_generator import DEFAULT_REPORT_FORMATS
+from report_uploader import get_report_uploader
+from report_history import get_report_history
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",  # Disable proxy buffering (nginx, App Service front ends)
+    "Access-Control-Allow-Origin": "*"
+}
+
+
+def format_sse(event: str, data) -> str:
+    """Encode one SSE frame"""
+    payload = json.dumps(data, separators=(",", ":"), default=str)
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+def request_context(req_body: Dict) -> Tuple[Dict, Dict]:
+    """
+    Incident context and recent changes from a diagnose request body
+    Accepts the flat fields sent by the frontend or nested objects
+    """
+    incident_context = req_body.get('incident_context') or {
+        'incident_start_time': req_body.get('incident_start_time'),
+        'incident_detection_type': req_body.get('incident_detection_type', 'User-Reported'),
+        'affected_users_count': req_body.get('affected_users_count', 0),
+        'business_criticality': req_body.get('business_criticality', 'Medium')
+    }
+    recent_changes = req_body.get('recent_changes') or {
+        'recent_firewall_change': req_body.get('recent_firewall_change', False),
+        'recent_dns_change': req_body.get('recent_dns_change', False),
+        'recent_deployment': req_body.get('recent_deployment', False)
+    }
+    return incident_context, recent_changes
+
+
+def stream_diagnosis(diagnostics: NetworkDiagnostics, incident_context: Dict = None,
+                     recent_changes: Dict = None, formats=DEFAULT_REPORT_FORMATS) -> Iterator[str]:
+    """
+    Yield SSE frames for one diagnosis (diagnostics is built, and validated, by the caller):
+      start -> diagnostic (per test, completion order) -> diagnostics (ordered list)
+      -> ai_token (per delta) -> ai_analysis -> reports -> done
+    Any failure ends the stream with an error event
+    """
+    target = diagnostics.target
+    start_time = time.perf_counter()
+    yield format_sse("start", {
+        "target": target,
+        "timestamp": datetime.utcnow().isoformat(),
+        "incident_context": incident_context,
+        "recent_changes": recent_changes
+    })
+
+    try:
+        for result in diagnostics.stream_diagnostics():
+            yield format_sse("diagnostic", result)
+        diagnostic_results = diagnostics.results
+        yield format_sse("diagnostics", diagnostic_results)
+
+        ai_analysis = None
+        for item in get_ai_analyzer().stream_analysis(target, diagnostic_results, incident_context, recent_changes):
+            if item["type"] == "token":
+                yield format_sse("ai_token", {"delta": item["delta"]})
+            else:
+                ai_analysis = item["analysis"]
+        yield format_sse("ai_analysis", ai_analysis)
+
+        rca_generator = get_rca_generator()
+        generated = rca_generator.generate_reports(
+            target, diagnostic_results, ai_analysis, incident_context, recent_changes, formats=formats
+        )
+        reports = generated["reports"]
+        upload = get_report_uploader().submit(rca_generator, reports, target, model=generated["model"])
+        history = get_report_history()
+        report_id = history.record(generated["model"]["technical"], upload["report_urls"]) if history else None
+
+        yield format_sse("reports", {
+            "rca_report": reports.get("text"),
+            "executive_report": reports.get("executive"),
+            "technical_report": generated["model"]["technical"] if "json" in reports else None,
+            "markdown_report": reports.get("markdown"),
+            "html_report": reports.get("html"),
+            "report_urls": upload["report_urls"],
+            "report_upload": upload["report_upload"],
+            "report_id": report_id
+        })
+
+        yield format_sse("done", {
+            "status": "success",
+            "duration_ms": round((time.perf_counter() - start_time) * 1000, 2)
+        })
+
+    except Exception as e:
+        logging.error(f"Streaming diagnosis failed for {target}: {str(e)}", exc_info=True)
+        yield format_sse("error", {"error": str(e), "status": "error"})
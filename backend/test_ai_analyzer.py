@@ -0,0 +1,126 @@
+"""
+Tests for AI worker pool admission and the deadline-bounded streamed analysis
+Jobs and the model stream are stand-ins, no Azure OpenAI access required
+Run: python -m pytest test_ai_analyzer.py
+"""
+
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+import ai_analyzer
+from ai_analyzer import AIAnalyzer, AIBusyError, _submit_ai
+from analysis_cache import fingerprint, get_analysis_cache, get_analysis_updates
+
+
+def test_jobs_beyond_the_inflight_limit_are_rejected_not_queued(monkeypatch):
+    monkeypatch.setattr(ai_analyzer, "AI_ANALYSIS_MAX_INFLIGHT", 1)
+    release = threading.Event()
+    running = _submit_ai(release.wait, 5)
+    rejected = _submit_ai(lambda: "never runs")
+
+    try:
+        rejected.result(timeout=1)
+        raise AssertionError("expected AIBusyError")
+    except AIBusyError:
+        pass
+
+    release.set()
+    assert running.result(timeout=5) is True
+    assert _submit_ai(lambda: "admitted").result(timeout=5) == "admitted"
+
+
+def test_cancelled_job_releases_its_slot(monkeypatch):
+    monkeypatch.setattr(ai_analyzer, "AI_ANALYSIS_MAX_INFLIGHT", ai_analyzer.AI_ANALYSIS_WORKERS + 1)
+    release = threading.Event()
+    blockers = [_submit_ai(release.wait, 5) for _ in range(ai_analyzer.AI_ANALYSIS_WORKERS)]
+    queued = _submit_ai(lambda: "late")
+
+    # Every worker is busy, so the queued job has not started and can be dropped
+    assert queued.cancel()
+    release.set()
+    for blocker in blockers:
+        blocker.result(timeout=5)
+    assert ai_analyzer._inflight == 0
+
+
+def _chunk(text):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+
+
+def _streaming_analyzer(pieces, stall=0.0):
+    """AIAnalyzer whose model streams pieces, pausing stall seconds before the last one"""
+    def create(**kwargs):
+        def chunks():
+            for piece in pieces[:-1]:
+                yield _chunk(piece)
+            time.sleep(stall)
+            yield _chunk(pieces[-1])
+        return chunks()
+
+    analyzer = AIAnalyzer.__new__(AIAnalyzer)
+    analyzer.deployment = "test-deployment"
+    analyzer.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    return analyzer
+
+
+ANSWER = json.dumps({"root_cause": "Upstream refused connections", "confidence_percentage": 40, "category": "NETWORK"})
+DIAGNOSTICS = [
+    {"test_name": "DNS_RESOLUTION", "status": "PASS", "latency_ms": 2.0, "details": None, "failure_reason": None},
+    {"test_name": "TCP_CONNECTIVITY", "status": "FAIL", "latency_ms": 1.0, "details": None,
+     "failure_reason": "Port 443 is closed or unreachable"},
+]
+
+
+def test_stream_within_the_deadline_yields_tokens_then_the_ai_answer():
+    pieces = [ANSWER[:20], ANSWER[20:]]
+    items = list(_streaming_analyzer(pieces).stream_analysis("stream-ok.test", DIAGNOSTICS, deadline=5))
+
+    assert [item["delta"] for item in items[:-1]] == pieces
+    analysis = items[-1]["analysis"]
+    assert analysis["analysis_source"] == "ai" and analysis["root_cause"] == "Upstream refused connections"
+
+
+def test_stalled_stream_falls_back_at_the_deadline_and_delivers_late():
+    analyzer = _streaming_analyzer([ANSWER[:20], ANSWER[20:]], stall=0.5)
+    start = time.perf_counter()
+    items = list(analyzer.stream_analysis("stream-slow.test", DIAGNOSTICS, deadline=0.2))
+
+    assert time.perf_counter() - start < 0.45
+    analysis = items[-1]["analysis"]
+    assert analysis["analysis_source"] == "rule_based" and analysis["ai_pending"] is True
+
+    updates = get_analysis_updates()
+    for _ in range(50):
+        late = updates.get(analysis["analysis_id"])
+        if late["status"] != "pending":
+            break
+        time.sleep(0.05)
+    assert late["status"] == "complete"
+    assert late["ai_analysis"]["root_cause"] == "Upstream refused connections"
+
+
+def test_batch_chunks_that_miss_the_deadline_fall_back_and_are_cached_late():
+    answer = json.dumps({"results": [dict(json.loads(ANSWER), target="batch-slow.test")], "common_cause": None})
+
+    def create(**kwargs):
+        time.sleep(0.5)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=answer))], usage=None)
+
+    analyzer = AIAnalyzer.__new__(AIAnalyzer)
+    analyzer.deployment = "test-deployment"
+    analyzer.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+    start = time.perf_counter()
+    batch = analyzer.analyze_batch([{"target": "batch-slow.test", "diagnostics": DIAGNOSTICS}], deadline=0.2)
+    assert time.perf_counter() - start < 0.45
+    assert batch["results"][0]["ai_analysis"]["analysis_source"] == "rule_based"
+
+    key = fingerprint("batch-slow.test", DIAGNOSTICS, None, None, "test-deployment")
+    for _ in range(50):
+        late = get_analysis_cache().get(key)
+        if late is not None:
+            break
+        time.sleep(0.05)
+    assert late["root_cause"] == "Upstream refused connections"
@@ -0,0 +1,110 @@
+"""
+Tests for the incident fingerprint and the analysis caches
+Run: python -m pytest test_analysis_cache.py
+"""
+
+import json
+import os
+import tempfile
+import time
+
+from analysis_cache import AnalysisCache, AnalysisUpdateStore, failure_class, fingerprint
+
+
+def _diagnostics(latency=20.0, tcp_reason=None):
+    tcp_status = "FAIL" if tcp_reason else "PASS"
+    return [
+        {"test_name": "DNS_RESOLUTION", "status": "PASS", "latency_ms": 3.1, "failure_reason": None},
+        {"test_name": "TCP_CONNECTIVITY", "status": tcp_status, "latency_ms": latency, "failure_reason": tcp_reason},
+    ]
+
+
+def test_fingerprint_ignores_latency_noise_within_a_bucket():
+    base = fingerprint("api.example.com", _diagnostics(latency=20.0))
+    assert fingerprint(" API.example.com ", _diagnostics(latency=41.7)) == base
+    assert fingerprint("api.example.com", _diagnostics(latency=120.0)) != base
+
+
+def test_fingerprint_ignores_key_order_and_reason_wording():
+    first = fingerprint("api", _diagnostics(tcp_reason="Connection refused by 10.0.0.1"),
+                        {"business_criticality": "High"}, {"recent_deployment": True})
+    reordered = [dict(reversed(list(test.items()))) for test in _diagnostics(tcp_reason="Port 443 is closed or unreachable")]
+    second = fingerprint("api", reordered, {"business_criticality": "high"}, {"recent_deployment": 1})
+    assert first == second
+
+
+def test_fingerprint_separates_what_changes_the_answer():
+    base = fingerprint("api", _diagnostics(), model="gpt-4")
+    assert fingerprint("other", _diagnostics(), model="gpt-4") != base
+    assert fingerprint("api", _diagnostics(), model="gpt-4o") != base
+    assert fingerprint("api", _diagnostics(), {"business_criticality": "Critical"}, model="gpt-4") != base
+    assert fingerprint("api", _diagnostics(), recent_changes={"recent_dns_change": True}, model="gpt-4") != base
+
+
+def test_failure_classes():
+    assert failure_class("HTTP 503") == "http_5xx"
+    assert failure_class("Inferred failure: DNS resolution failed") == "inferred"
+    assert failure_class("NXDOMAIN for api.test") == "dns_nxdomain"
+    assert failure_class("Connection timed out") == "timeout"
+    assert failure_class("something odd") == "other"
+    assert failure_class(None) is None
+
+
+def test_cache_returns_copies_and_evicts_least_recently_used():
+    cache = AnalysisCache(max_entries=2, ttl=60, path="")
+    cache.put("a", {"root_cause": "dns"})
+    cache.get("a")["root_cause"] = "mutated"
+    cache.put("b", {"root_cause": "tcp"})
+    cache.get("a")
+    cache.put("c", {"root_cause": "http"})
+
+    assert cache.get("a") == {"root_cause": "dns"}
+    assert cache.get("b") is None
+    stats = cache.stats()
+    assert stats["evictions"] == 1 and stats["hits"] == 3 and stats["misses"] == 1
+
+
+def test_cache_entries_expire():
+    cache = AnalysisCache(ttl=0.05, path="")
+    cache.put("a", {"root_cause": "dns"})
+    time.sleep(0.06)
+    assert cache.get("a") is None
+
+
+def test_cache_persists_live_entries_across_restarts():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "analysis_cache.json")
+        cache = AnalysisCache(ttl=60, path=path)
+        cache.put("a", {"root_cause": "dns"})
+        cache.flush()
+        assert AnalysisCache(ttl=60, path=path).get("a") == {"root_cause": "dns"}
+
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"entries": [["old", {"analysis": {}, "expires_at": time.time() - 1}]]}, f)
+        assert AnalysisCache(ttl=60, path=path).stats()["entries"] == 0
+
+
+def test_puts_are_written_together_off_the_request_thread():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "analysis_cache.json")
+        cache = AnalysisCache(ttl=60, path=path, flush_delay=0.2)
+        for i in range(20):
+            cache.put(str(i), {"root_cause": f"cause {i}"})
+        assert not os.path.exists(path)
+
+        deadline = time.time() + 5
+        while cache.stats()["writes"] == 0 and time.time() < deadline:
+            time.sleep(0.01)
+        assert cache.stats()["writes"] == 1
+        assert AnalysisCache(ttl=60, path=path).stats()["entries"] == 20
+
+
+def test_update_store_tracks_late_answers():
+    store = AnalysisUpdateStore(ttl=60)
+    store.pending("x")
+    assert store.get("x")["status"] == "pending"
+    store.complete("x", {"root_cause": "dns"})
+    assert store.get("x")["ai_analysis"] == {"root_cause": "dns"}
+    store.fail("y", "timeout")
+    assert store.get("y")["error"] == "timeout"
+    assert store.get("missing") is None
@@ -0,0 +1,179 @@
+"""
+Tests for the asyncio diagnostics engine and its synchronous facade
+Uses a local HTTP server on localhost, no network access required
+Run: python -m pytest test_async_diagnostics.py
+"""
+
+import asyncio
+import gc
+import socket
+import threading
+import time
+import warnings
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from async_diagnostics import AsyncNetworkDiagnostics, run_sync
+from diagnostics import NetworkDiagnostics
+
+
+class _OK(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = b"ok"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _start_http_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _OK)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _closed_port() -> int:
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+def test_run_sync_returns_the_coroutine_result():
+    assert run_sync(asyncio.sleep(0, result=42), timeout=5) == 42
+
+
+def test_run_sync_refuses_to_block_the_event_loop():
+    async def nested():
+        try:
+            run_sync(asyncio.sleep(0))
+        except RuntimeError as e:
+            return str(e)
+        return None
+
+    assert "await the coroutine instead" in run_sync(nested(), timeout=5)
+
+
+def test_all_probes_pass_against_a_local_server():
+    server = _start_http_server()
+    try:
+        diag = NetworkDiagnostics(f"localhost:{server.server_address[1]}", "api", latency_samples=3)
+        results = diag.run_all_diagnostics()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert [r["test_name"] for r in results] == ["DNS_RESOLUTION", "TCP_CONNECTIVITY", "HTTP_STATUS", "LATENCY_CHECK"]
+    assert [r["status"] for r in results] == ["PASS"] * 4
+    assert results[2]["details"]["status_code"] == 200
+    assert results[3]["details"]["samples"] == 3
+
+
+def test_closed_port_infers_the_dependent_probes():
+    results = NetworkDiagnostics(f"localhost:{_closed_port()}", "api").run_all_diagnostics()
+    statuses = {r["test_name"]: r["status"] for r in results}
+
+    assert statuses == {"DNS_RESOLUTION": "PASS", "TCP_CONNECTIVITY": "FAIL",
+                        "HTTP_STATUS": "INFERRED_FAIL", "LATENCY": "INFERRED_FAIL"}
+    assert "TCP connection failed" in results[2]["failure_reason"]
+
+
+def test_stream_diagnostics_yields_every_result_then_keeps_the_ordered_list():
+    diag = NetworkDiagnostics(f"localhost:{_closed_port()}", "api")
+    streamed = list(diag.stream_diagnostics())
+
+    assert sorted(r["test_name"] for r in streamed) == sorted(r["test_name"] for r in diag.results)
+    assert diag.results[0]["test_name"] == "DNS_RESOLUTION"
+
+
+def _listener() -> socket.socket:
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    sock.listen()
+    return sock
+
+
+def test_tcp_stage_probes_every_address_and_port():
+    service, extra = _listener(), _listener()
+    try:
+        service_port, extra_port = service.getsockname()[1], extra.getsockname()[1]
+        engine = AsyncNetworkDiagnostics(f"localhost:{service_port}", "api",
+                                         tcp_ports=[extra_port, _closed_port()])
+        # Second loopback address has nothing listening
+        engine.ip_address, engine.addresses = "127.0.0.1", ["127.0.0.1", "127.0.0.2"]
+        result = asyncio.run(engine.test_tcp_connectivity())
+    finally:
+        service.close()
+        extra.close()
+
+    details = result["details"]
+    assert result["status"] == "PASS"
+    assert len(details["results"]) == 2 * 3
+    assert details["ports"][0] == service_port
+    assert details["reachable_addresses"] == 1
+    assert details["by_port"][str(service_port)] == {"open": 1, "closed": 1}
+    assert details["by_port"][str(extra_port)] == {"open": 1, "closed": 1}
+    assert details["partial_failure"] == f"1 of 2 addresses failed on port {service_port}"
+
+
+def test_tcp_stage_fails_when_the_service_port_is_closed_everywhere():
+    extra = _listener()
+    try:
+        port = _closed_port()
+        engine = AsyncNetworkDiagnostics(f"localhost:{port}", "api", tcp_ports=[extra.getsockname()[1]])
+        engine.ip_address, engine.addresses = "127.0.0.1", ["127.0.0.1", "127.0.0.2"]
+        result = asyncio.run(engine.test_tcp_connectivity())
+    finally:
+        extra.close()
+
+    assert result["status"] == "FAIL"
+    assert result["failure_reason"] == f"Port {port} is closed or unreachable"
+    assert {p["status"] for p in result["details"]["results"] if p["port"] == port} == {"refused"}
+
+
+def test_tcp_ports_are_validated():
+    for ports in ([0], [70000], list(range(1, 40))):
+        try:
+            AsyncNetworkDiagnostics("localhost:8080", "api", tcp_ports=ports)
+            raise AssertionError(f"expected ValueError for {ports[:3]}")
+        except ValueError:
+            pass
+
+
+def test_latency_samples_close_their_connections():
+    service = _listener()
+    try:
+        engine = AsyncNetworkDiagnostics(f"localhost:{service.getsockname()[1]}", "api", latency_samples=30)
+        engine.ip_address = "127.0.0.1"
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always", ResourceWarning)
+            result = asyncio.run(engine.test_latency())
+            gc.collect()
+    finally:
+        service.close()
+
+    assert result["status"] == "PASS" and result["details"]["samples"] == 30
+    assert not [w for w in caught if issubclass(w.category, ResourceWarning)]
+
+
+def test_latency_samples_run_concurrently_by_default():
+    assert AsyncNetworkDiagnostics("example.com", "web", latency_samples=50).latency_concurrency == 50
+    assert AsyncNetworkDiagnostics("example.com", "web", latency_samples=50,
+                                   latency_concurrency=5).latency_concurrency == 5
+
+    # Each handshake takes ~50ms: all 20 together take about one handshake, not twenty
+    async def slow_sample(ip_address, index, gate):
+        async with gate:
+            await asyncio.sleep(0.05)
+            return 50.0
+
+    engine = AsyncNetworkDiagnostics("localhost:443", "api", latency_samples=20)
+    engine.ip_address = "127.0.0.1"
+    engine._latency_sample = slow_sample
+    start = time.perf_counter()
+    result = asyncio.run(engine.test_latency())
+    assert result["details"]["samples"] == 20
+    assert time.perf_counter() - start < 0.5
@@ -167,6 +167,60 @@ def test_invalid_input():
         print(f"❌ FAILED: {str(e)}")
         return False
 
+def test_batch_diagnostic():
+    """Test fleet diagnostics with mixed healthy and failing targets"""
+    print("\n" + "="*60)
+    print("TEST 5: Batch Diagnostic (fleet)")
+    print("="*60)
+    
+    try:
+        payload = {
+            "targets": [
+                "google.com",
+                {"target": "github.com", "service_type": "web"},
+                "nonexistent-domain-xyz123.com"
+            ],
+            "max_concurrency": 10,
+            "per_host_concurrency": 2
+        }
+        
+        print(f"Sending request: {json.dumps(payload)}")
+        response = requests.post(
+            f"{API_URL}/diagnose/batch",
+            json=payload,
+            timeout=60
+        )
+        
+        print(f"Status Code: {response.status_code}")
+        
+        if response.status_code == 200:
+            data = response.json()
+            
+            assert "results" in data, "Missing 'results' field"
+            assert "summary" in data, "Missing 'summary' field"
+            assert len(data["results"]) == 3, "Expected one result per target"
+            
+            for result in data["results"]:
+                status_icon = "✅" if result["status"] == "healthy" else "❌"
+                print(f"  {status_icon} {result['target']}: {result['status']}")
+            
+            print(f"\nFleet Summary: {json.dumps(data['summary'], indent=2)}")
+            
+            if data["summary"]["failures_by_test"].get("DNS_RESOLUTION", 0) >= 1:
+                print("\n✅ PASSED: Batch diagnostic test")
+                return True
+            else:
+                print("❌ FAILED: Expected the nonexistent domain to fail DNS")
+                return False
+        else:
+            print(f"❌ FAILED: Status code {response.status_code}")
+            print(response.text)
+            return False
+            
+    except Exception as e:
+        print(f"❌ FAILED: {str(e)}")
+        return False
+
 def main():
     """Run all tests"""
     print("\n" + "="*60)
@@ -182,6 +236,7 @@ def main():
     results.append(("Successful Diagnostic", test_successful_diagnostic()))
     results.append(("DNS Failure", test_dns_failure()))
     results.append(("Invalid Input", test_invalid_input()))
+    results.append(("Batch Diagnostic", test_batch_diagnostic()))
     
     # Summary
     print("\n" + "="*60)
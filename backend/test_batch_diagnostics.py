@@ -0,0 +1,133 @@
+"""
+Tests for fleet diagnostics: request parsing, concurrency limits and batched analysis
+The diagnostics engine is replaced by a stand-in that sleeps, no network access required
+Run: python -m pytest test_batch_diagnostics.py
+"""
+
+import asyncio
+
+import batch_diagnostics
+from batch_diagnostics import analyze_fleet, parse_batch_request, run_batch, summarize_fleet
+
+
+class _Gauge:
+    def __init__(self):
+        self.active = {}
+        self.peak = {}
+        self.total = 0
+        self.peak_total = 0
+
+    def enter(self, host):
+        self.active[host] = self.active.get(host, 0) + 1
+        self.peak[host] = max(self.peak.get(host, 0), self.active[host])
+        self.total += 1
+        self.peak_total = max(self.peak_total, self.total)
+
+    def leave(self, host):
+        self.active[host] -= 1
+        self.total -= 1
+
+
+def _run_with_fake_engine(monkeypatch, specs, failing=(), **limits):
+    gauge = _Gauge()
+
+    class FakeEngine:
+        def __init__(self, target, service_type, **options):
+            self.host = target.split(":")[0]
+            self.target = target
+
+        async def run_all(self):
+            gauge.enter(self.host)
+            try:
+                await asyncio.sleep(0.02)
+            finally:
+                gauge.leave(self.host)
+            if self.target in failing:
+                return [{"test_name": "DNS_RESOLUTION", "status": "FAIL"},
+                        {"test_name": "TCP_CONNECTIVITY", "status": "INFERRED_FAIL"}]
+            return [{"test_name": "DNS_RESOLUTION", "status": "PASS"}]
+
+    monkeypatch.setattr(batch_diagnostics, "AsyncNetworkDiagnostics", FakeEngine)
+    return asyncio.run(run_batch(specs, **limits)), gauge
+
+
+def _specs(targets):
+    return [{"target": t, "service_type": "web", "options": {}} for t in targets]
+
+
+def test_per_host_limit_caps_each_host_independently(monkeypatch):
+    targets = [f"a.test:{8000 + i}" for i in range(6)] + [f"b.test:{8000 + i}" for i in range(6)]
+    batch, gauge = _run_with_fake_engine(monkeypatch, _specs(targets), max_concurrency=100, per_host_concurrency=2)
+
+    assert gauge.peak == {"a.test": 2, "b.test": 2}
+    assert gauge.peak_total == 4
+    assert batch["summary"]["healthy"] == 12
+
+
+def test_global_limit_caps_the_whole_fleet(monkeypatch):
+    targets = [f"host{i}.test" for i in range(10)]
+    _, gauge = _run_with_fake_engine(monkeypatch, _specs(targets), max_concurrency=3, per_host_concurrency=4)
+    assert gauge.peak_total == 3
+
+
+def test_results_keep_request_order_and_classify_failures(monkeypatch):
+    targets = ["ok.test", "down.test", "bad target:notaport"]
+    batch, _ = _run_with_fake_engine(monkeypatch, _specs(targets), failing=("down.test",))
+
+    assert [r["target"] for r in batch["results"]] == targets
+    assert [r["status"] for r in batch["results"]] == ["healthy", "unhealthy", "error"]
+    assert batch["results"][1]["first_failure"] == "DNS_RESOLUTION"
+    summary = batch["summary"]
+    assert (summary["healthy"], summary["unhealthy"], summary["errors"]) == (1, 1, 1)
+    assert summary["failures_by_test"] == {"DNS_RESOLUTION": 1}
+    assert summary["unhealthy_targets"] == ["down.test", "bad target:notaport"]
+
+
+def test_parse_batch_request_normalizes_targets_and_options():
+    specs = parse_batch_request({
+        "targets": ["https://a.test ", {"target": "b.test:8080", "service_type": "api", "http_fetch_mode": "full"}],
+        "service_type": "web"
+    })
+
+    assert [(s["target"], s["service_type"]) for s in specs] == [("a.test", "web"), ("b.test:8080", "api")]
+    assert specs[0]["options"]["http_fetch_mode"] == batch_diagnostics.BATCH_HTTP_FETCH_MODE
+    assert specs[1]["options"]["http_fetch_mode"] == "full"
+
+
+def test_parse_batch_request_rejects_invalid_bodies():
+    for body in ({}, {"targets": []}, {"targets": [42]}, {"targets": ["http://"]}):
+        try:
+            parse_batch_request(body)
+            raise AssertionError(f"expected ValueError for {body}")
+        except ValueError:
+            pass
+
+
+def test_analyze_fleet_sends_only_unhealthy_targets_in_one_batch():
+    class FakeAnalyzer:
+        def __init__(self):
+            self.calls = []
+
+        def analyze_batch(self, targets):
+            self.calls.append([t["target"] for t in targets])
+            return {"results": [{"target": t["target"], "ai_analysis": {"root_cause": f"{t['target']} down"}}
+                                for t in targets],
+                    "common_cause": {"verdict": "shared DNS"}, "llm_calls": 1}
+
+    batch = {"results": [
+        {"target": "ok.test", "status": "healthy", "diagnostics": []},
+        {"target": "a.test", "status": "unhealthy", "diagnostics": []},
+        {"target": "b.test", "status": "unhealthy", "diagnostics": []},
+    ]}
+    analyzer = FakeAnalyzer()
+    fleet = analyze_fleet(batch, analyzer)
+
+    assert analyzer.calls == [["a.test", "b.test"]]
+    assert fleet == {"common_cause": {"verdict": "shared DNS"}, "analyzed_targets": 2, "llm_calls": 1}
+    assert batch["results"][2]["ai_analysis"]["root_cause"] == "b.test down"
+    assert "ai_analysis" not in batch["results"][0]
+    assert analyze_fleet({"results": batch["results"][:1]}, analyzer)["llm_calls"] == 0
+
+
+def test_summary_of_an_empty_fleet():
+    assert summarize_fleet([], 0.0)["total_targets"] == 0
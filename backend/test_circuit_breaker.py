@@ -0,0 +1,89 @@
+"""
+Tests for the Azure OpenAI circuit breaker state machine
+Run: python -m pytest test_circuit_breaker.py
+"""
+
+import time
+
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+
+class _Throttled(Exception):
+    pass
+
+
+def _fail():
+    raise RuntimeError("upstream 500")
+
+
+def _throttled():
+    raise _Throttled("429 from the local rate limiter")
+
+
+def _tripped(**kwargs) -> CircuitBreaker:
+    breaker = CircuitBreaker("test", window=4, min_calls=2, failure_rate=0.5, open_seconds=0.05, **kwargs)
+    for _ in range(2):
+        try:
+            breaker.call(_fail)
+        except RuntimeError:
+            pass
+    assert breaker.state == OPEN
+    return breaker
+
+
+def test_failures_open_the_breaker_and_short_circuit_calls():
+    breaker = _tripped()
+    try:
+        breaker.call(lambda: "never runs")
+        raise AssertionError("expected CircuitOpenError")
+    except CircuitOpenError:
+        pass
+    assert breaker.stats()["short_circuited"] == 1
+
+
+def test_successful_trial_closes_and_failed_trial_reopens():
+    breaker = _tripped()
+    time.sleep(0.06)
+    assert breaker.call(lambda: "ok") == "ok"
+    assert breaker.state == CLOSED
+
+    breaker = _tripped()
+    time.sleep(0.06)
+    try:
+        breaker.call(_fail)
+    except RuntimeError:
+        pass
+    assert breaker.state == OPEN
+
+
+def test_ignored_exception_in_half_open_neither_closes_nor_reopens():
+    breaker = _tripped()
+    time.sleep(0.06)
+
+    try:
+        breaker.call(_throttled, ignore=(_Throttled,))
+        raise AssertionError("expected _Throttled")
+    except _Throttled:
+        pass
+
+    # The trial permit is back, so the next call is the real trial
+    assert breaker.state == HALF_OPEN
+    assert breaker.call(lambda: "ok") == "ok"
+    assert breaker.state == CLOSED
+
+
+def test_ignored_exceptions_do_not_count_as_successes_when_closed():
+    breaker = CircuitBreaker("test", window=4, min_calls=2, failure_rate=0.5)
+    for _ in range(5):
+        try:
+            breaker.call(_throttled, ignore=(_Throttled,))
+        except _Throttled:
+            pass
+    assert breaker.stats()["window_calls"] == 0
+
+
+def test_slow_calls_count_as_failures():
+    breaker = CircuitBreaker("test", window=2, min_calls=2, failure_rate=0.5, slow_call_seconds=0.01)
+    for _ in range(2):
+        breaker.call(lambda: time.sleep(0.02))
+    assert breaker.state == OPEN
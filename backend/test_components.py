@@ -0,0 +1,99 @@
+"""
+Tests for the lazily built, credential-keyed component registry
+Factories are stand-ins and credentials come from the environment, no Azure access required
+Run: python -m pytest test_components.py
+"""
+
+import threading
+
+import components
+from components import _Component
+
+
+def _counting_factory():
+    built = []
+
+    def factory():
+        built.append(object())
+        return built[-1]
+
+    return factory, built
+
+
+def test_instance_is_built_once_and_reused():
+    factory, built = _counting_factory()
+    component = _Component("Thing", factory, lambda: ("endpoint", "key"))
+
+    first = component.get()
+    assert component.get() is first
+    assert len(built) == 1 and component.stats() == {"initialised": True, "builds": 1}
+
+
+def test_credential_change_rebuilds_and_reset_drops_the_instance():
+    factory, built = _counting_factory()
+    credentials = {"key": "old"}
+    component = _Component("Thing", factory, lambda: (credentials["key"],))
+
+    first = component.get()
+    credentials["key"] = "rotated"
+    second = component.get()
+    assert second is not first and component.get() is second
+
+    component.reset()
+    assert component.stats()["initialised"] is False
+    assert component.get() is not second
+    assert len(built) == 3
+
+
+def test_concurrent_first_calls_build_one_instance():
+    factory, built = _counting_factory()
+    component = _Component("Thing", factory, lambda: ())
+    barrier = threading.Barrier(8)
+    seen = []
+
+    def worker():
+        barrier.wait()
+        seen.append(component.get())
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(built) == 1 and all(instance is built[0] for instance in seen)
+
+
+def test_constructor_errors_propagate_and_are_retried():
+    calls = []
+
+    def factory():
+        calls.append(1)
+        raise ValueError("Azure OpenAI credentials not configured")
+
+    component = _Component("Thing", factory, lambda: ())
+    for _ in range(2):
+        try:
+            component.get()
+            raise AssertionError("expected ValueError")
+        except ValueError:
+            pass
+    assert len(calls) == 2 and component.stats()["initialised"] is False
+
+
+def test_background_warm_up_without_credentials_never_raises(monkeypatch):
+    for name in ("AZURE_OPENAI_ENDPOINT", "AZURE_OPENAI_API_KEY", "AZURE_STORAGE_CONNECTION_STRING"):
+        monkeypatch.delenv(name, raising=False)
+    try:
+        components.refresh()
+        thread = components.warm_up_in_background()
+        thread.join(timeout=10)
+        assert not thread.is_alive()
+
+        report = components.warm_up()
+        assert report["ai_analyzer"]["status"] == "unavailable"
+        assert report["rca_generator"]["status"] == "ready"
+        assert report["rule_engine"]["rules"] > 0
+    finally:
+        # The cached components were built without credentials
+        components.refresh()
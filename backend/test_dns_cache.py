@@ -0,0 +1,112 @@
+"""
+Tests for the process-wide DNS cache
+Lookups are stand-in coroutines, no network access required
+Run: python -m pytest test_dns_cache.py
+"""
+
+import asyncio
+import time
+
+from dns_cache import DNSCache, DNSLookupError
+
+
+def _counting_lookup(answers):
+    calls = []
+
+    async def lookup(hostname):
+        calls.append(hostname)
+        await asyncio.sleep(0.01)
+        answer = answers[hostname]
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+    return lookup, calls
+
+
+def test_hit_within_ttl_and_miss_after_expiry():
+    cache = DNSCache()
+    lookup, calls = _counting_lookup({"a.test": {"addresses": ["10.0.0.1"], "ttl": 0.05}})
+
+    async def scenario():
+        first = await cache.resolve("a.test", lookup)
+        second = await cache.resolve("A.TEST", lookup)
+        time.sleep(0.06)
+        third = await cache.resolve("a.test", lookup)
+        return first, second, third
+
+    first, second, third = asyncio.run(scenario())
+    assert (first[1], second[1], third[1]) == (False, True, False)
+    assert second[0]["addresses"] == ["10.0.0.1"]
+    assert len(calls) == 2
+
+
+def test_record_ttl_is_capped_and_missing_ttl_uses_default():
+    cache = DNSCache(default_ttl=60, max_ttl=300)
+    cache.put("long.test", ["10.0.0.1"], ttl=86400)
+    cache.put("plain.test", ["10.0.0.2"])
+
+    assert cache.get("long.test")["ttl"] == 300
+    assert cache.get("plain.test")["ttl"] == 60
+
+
+def test_authoritative_failure_is_cached_negatively():
+    cache = DNSCache(negative_ttl=30)
+    lookup, calls = _counting_lookup({"gone.test": DNSLookupError("NXDOMAIN for gone.test")})
+
+    async def scenario():
+        for _ in range(3):
+            try:
+                await cache.resolve("gone.test", lookup)
+                raise AssertionError("expected DNSLookupError")
+            except DNSLookupError as e:
+                assert "NXDOMAIN" in str(e)
+
+    asyncio.run(scenario())
+    assert len(calls) == 1
+    assert cache.stats()["negative_hits"] == 2
+
+
+def test_negative_ttl_never_exceeds_the_configured_ceiling():
+    cache = DNSCache(negative_ttl=10)
+    cache.put_negative("gone.test", "NXDOMAIN", ttl=600)
+    assert cache.get("gone.test")["ttl"] == 10
+
+
+def test_transient_failure_is_not_cached():
+    cache = DNSCache()
+    lookup, calls = _counting_lookup({"flaky.test": OSError("resolver unreachable")})
+
+    async def scenario():
+        for _ in range(2):
+            try:
+                await cache.resolve("flaky.test", lookup)
+            except OSError:
+                pass
+
+    asyncio.run(scenario())
+    assert len(calls) == 2
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = DNSCache(max_entries=2)
+    cache.put("a.test", ["10.0.0.1"])
+    cache.put("b.test", ["10.0.0.2"])
+    cache.get("a.test")
+    cache.put("c.test", ["10.0.0.3"])
+
+    assert cache.get("b.test") is None
+    assert cache.get("a.test") is not None and cache.get("c.test") is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_concurrent_misses_share_one_lookup():
+    cache = DNSCache()
+    lookup, calls = _counting_lookup({"busy.test": {"addresses": ["10.0.0.9"], "ttl": 60}})
+
+    async def scenario():
+        return await asyncio.gather(*(cache.resolve("busy.test", lookup) for _ in range(20)))
+
+    answers = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert all(answer["addresses"] == ["10.0.0.9"] for answer, _ in answers)
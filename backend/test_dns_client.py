@@ -0,0 +1,299 @@
+"""
+Tests for the built-in DNS client
+Uses a local stand-in DNS server on 127.0.0.1, no network access required
+Run: python -m pytest test_dns_client.py
+"""
+
+import asyncio
+import os
+import socket
+import struct
+import tempfile
+import time
+
+import dns_client
+from dns_cache import DNSCache, DNSLookupError
+from dns_client import dns_lookup, resolve, search_names, DNSResolverError, TYPE_A, TYPE_AAAA
+
+ZONE = {
+    ("svc.example.test", TYPE_A): [("10.0.0.1", 300), ("10.0.0.2", 60)],
+    ("svc.example.test", TYPE_AAAA): [("2001:db8::1", 120)],
+    ("big.example.test", TYPE_A): [("10.9.9.9", 30)],
+    ("big.example.test", TYPE_AAAA): [],
+}
+TRUNCATED = {"big.example.test"}
+
+
+def _answer(query: bytes, truncate: bool) -> bytes:
+    """Build a response for a single-question query from ZONE"""
+    query_id = struct.unpack("!H", query[:2])[0]
+    offset, labels = 12, []
+    while query[offset]:
+        labels.append(query[offset + 1:offset + 1 + query[offset]].decode())
+        offset += 1 + query[offset]
+    qtype = struct.unpack("!H", query[offset + 1:offset + 3])[0]
+    question = query[12:offset + 5]
+    name = ".".join(labels)
+
+    known = any(key[0] == name for key in ZONE)
+    records = ZONE.get((name, qtype), []) if not (truncate and name in TRUNCATED) else []
+    flags = 0x8180 | (0 if known else 3) | (0x0200 if truncate and name in TRUNCATED else 0)
+
+    body = b""
+    for address, ttl in records:
+        family = socket.AF_INET if qtype == TYPE_A else socket.AF_INET6
+        rdata = socket.inet_pton(family, address)
+        body += struct.pack("!HHHIH", 0xC00C, qtype, 1, ttl, len(rdata)) + rdata
+
+    return struct.pack("!HHHHHH", query_id, flags, 1, len(records), 0, 0) + question + body
+
+
+class _StandInUDP(asyncio.DatagramProtocol):
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        self.transport.sendto(_answer(data, truncate=True), addr)
+
+
+async def _stand_in_tcp(reader, writer):
+    length = struct.unpack("!H", await reader.readexactly(2))[0]
+    reply = _answer(await reader.readexactly(length), truncate=False)
+    writer.write(struct.pack("!H", len(reply)) + reply)
+    await writer.drain()
+    writer.close()
+
+
+async def _start_server():
+    """Start UDP + TCP stand-ins on the same port"""
+    loop = asyncio.get_running_loop()
+    tcp_server = await asyncio.start_server(_stand_in_tcp, "127.0.0.1", 0)
+    port = tcp_server.sockets[0].getsockname()[1]
+    udp_transport, _ = await loop.create_datagram_endpoint(_StandInUDP, local_addr=("127.0.0.1", port))
+    return ("127.0.0.1", port), tcp_server, udp_transport
+
+
+def _silent_resolver():
+    """A UDP socket that never answers, to exercise the deadline"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(("127.0.0.1", 0))
+    return sock
+
+
+def test_resolve_returns_all_records_with_ttls():
+    async def scenario():
+        server, tcp_server, udp_transport = await _start_server()
+        try:
+            return await resolve("svc.example.test", [server], deadline=2)
+        finally:
+            tcp_server.close()
+            udp_transport.close()
+
+    answer = asyncio.run(scenario())
+    assert answer["addresses"] == ["10.0.0.1", "10.0.0.2", "2001:db8::1"]
+    assert answer["ttl"] == 60
+    assert answer["resolvers"][0]["status"] == "NOERROR"
+    assert answer["resolvers"][0]["latency_ms"] is not None
+
+
+def test_truncated_answer_falls_back_to_tcp():
+    async def scenario():
+        server, tcp_server, udp_transport = await _start_server()
+        try:
+            return await resolve("big.example.test", [server], deadline=2)
+        finally:
+            tcp_server.close()
+            udp_transport.close()
+
+    answer = asyncio.run(scenario())
+    assert answer["addresses"] == ["10.9.9.9"]
+    assert answer["resolvers"][0]["transport"] == "tcp"
+
+
+def test_nxdomain_is_authoritative_and_negatively_cached():
+    cache = DNSCache(negative_ttl=30)
+
+    async def scenario():
+        server, tcp_server, udp_transport = await _start_server()
+
+        async def lookup(hostname):
+            return await resolve(hostname, [server], deadline=2)
+
+        try:
+            for _ in range(2):
+                try:
+                    await cache.resolve("missing.example.test", lookup)
+                    raise AssertionError("expected NXDOMAIN")
+                except DNSLookupError as e:
+                    assert "NXDOMAIN" in str(e)
+        finally:
+            tcp_server.close()
+            udp_transport.close()
+
+    asyncio.run(scenario())
+    stats = cache.stats()
+    assert stats["misses"] == 1
+    assert stats["negative_hits"] == 1
+
+
+def test_slow_resolver_hits_deadline_but_fast_one_answers():
+    silent = _silent_resolver()
+
+    async def scenario():
+        server, tcp_server, udp_transport = await _start_server()
+        try:
+            return await resolve("svc.example.test", [silent.getsockname(), server], deadline=0.3)
+        finally:
+            tcp_server.close()
+            udp_transport.close()
+
+    try:
+        answer = asyncio.run(scenario())
+    finally:
+        silent.close()
+
+    statuses = [r["status"] for r in answer["resolvers"]]
+    assert statuses == ["TIMEOUT", "NOERROR"]
+    assert "10.0.0.1" in answer["addresses"]
+
+
+def test_all_resolvers_silent_raises_resolver_error():
+    silent = _silent_resolver()
+    try:
+        asyncio.run(resolve("svc.example.test", [silent.getsockname()], deadline=0.2))
+        raise AssertionError("expected DNSResolverError")
+    except DNSResolverError as e:
+        assert "TIMEOUT" in str(e)
+    finally:
+        silent.close()
+
+
+def _system_files(monkeypatch, root: str, hosts: str, resolv_conf: str, resolvers: str):
+    """Point dns_client at stand-in /etc/hosts and resolv.conf and set DNS_RESOLVERS"""
+    monkeypatch.setattr(dns_client, "HOSTS_PATH", os.path.join(root, "hosts"))
+    monkeypatch.setattr(dns_client, "RESOLV_CONF_PATH", os.path.join(root, "resolv.conf"))
+    with open(dns_client.HOSTS_PATH, "w") as f:
+        f.write(hosts)
+    with open(dns_client.RESOLV_CONF_PATH, "w") as f:
+        f.write(resolv_conf)
+    monkeypatch.setenv("DNS_RESOLVERS", resolvers)
+
+
+def test_hosts_file_override_wins_without_querying_resolvers(monkeypatch):
+    silent = _silent_resolver()
+    resolver = "%s:%d" % silent.getsockname()
+    try:
+        with tempfile.TemporaryDirectory() as root:
+            _system_files(monkeypatch, root,
+                          "127.0.0.1 localhost\n10.1.2.3 api.example.test api  # pinned\n::1 api.example.test\n",
+                          "nameserver 192.0.2.1\n", resolver)
+            answer = asyncio.run(asyncio.wait_for(dns_lookup("API.example.test"), 0.5))
+    finally:
+        silent.close()
+
+    assert answer["addresses"] == ["10.1.2.3", "::1"]
+    assert answer["source"] == "hosts"
+
+
+def test_ip_literal_is_not_sent_to_resolvers():
+    answer = asyncio.run(asyncio.wait_for(dns_lookup("10.20.30.40"), 0.5))
+    assert answer["addresses"] == ["10.20.30.40"]
+
+
+def test_search_domains_follow_ndots():
+    assert search_names("svc.example", ["test", "corp"], 1) == ["svc.example", "svc.example.test", "svc.example.corp"]
+    assert search_names("svc.example", ["test"], 5) == ["svc.example.test", "svc.example"]
+    assert search_names("svc.example.", ["test"], 5) == ["svc.example"]
+
+
+def test_short_internal_name_resolves_through_search_domain(monkeypatch):
+    async def scenario():
+        server, tcp_server, udp_transport = await _start_server()
+        monkeypatch.setenv("DNS_RESOLVERS", "%s:%d" % server)
+        try:
+            return await dns_lookup("svc.example")
+        finally:
+            tcp_server.close()
+            udp_transport.close()
+
+    with tempfile.TemporaryDirectory() as root:
+        _system_files(monkeypatch, root, "", "search test\noptions ndots:2\n", "")
+        answer = asyncio.run(scenario())
+    assert answer["addresses"] == ["10.0.0.1", "10.0.0.2", "2001:db8::1"]
+    assert answer["query_name"] == "svc.example.test"
+
+
+def test_resolver_nxdomain_is_final_without_the_system_resolver(monkeypatch):
+    async def no_system_lookup(hostname):
+        raise AssertionError(f"system resolver asked for {hostname}")
+
+    monkeypatch.setattr(dns_client, "system_lookup", no_system_lookup)
+
+    async def scenario():
+        server, tcp_server, udp_transport = await _start_server()
+        monkeypatch.setenv("DNS_RESOLVERS", "%s:%d" % server)
+        try:
+            return await dns_lookup("missing.example.test")
+        finally:
+            tcp_server.close()
+            udp_transport.close()
+
+    with tempfile.TemporaryDirectory() as root:
+        _system_files(monkeypatch, root, "", "", "")
+        try:
+            asyncio.run(scenario())
+            raise AssertionError("expected NXDOMAIN")
+        except DNSLookupError as e:
+            assert "NXDOMAIN" in str(e)
+
+
+def test_system_resolver_is_bounded_by_the_deadline(monkeypatch):
+    async def hanging_lookup(hostname):
+        await asyncio.sleep(30)
+
+    monkeypatch.setattr(dns_client, "system_lookup", hanging_lookup)
+    monkeypatch.setattr(dns_client, "DNS_QUERY_DEADLINE", 0.1)
+    try:
+        asyncio.run(asyncio.wait_for(dns_lookup("intranet"), 2))
+        raise AssertionError("expected DNSResolverError")
+    except DNSResolverError as e:
+        assert "0.1s" in str(e)
+
+
+def test_first_answer_does_not_wait_for_a_dead_resolver():
+    silent = _silent_resolver()
+
+    async def scenario():
+        server, tcp_server, udp_transport = await _start_server()
+        try:
+            started = time.perf_counter()
+            answer = await resolve("svc.example.test", [silent.getsockname(), server], deadline=2)
+            return answer, time.perf_counter() - started
+        finally:
+            tcp_server.close()
+            udp_transport.close()
+
+    try:
+        answer, elapsed = asyncio.run(scenario())
+    finally:
+        silent.close()
+
+    assert elapsed < 1
+    assert [r["status"] for r in answer["resolvers"]] == ["TIMEOUT", "NOERROR"]
+
+
+def test_system_files_are_parsed_again_only_when_they_change(monkeypatch):
+    parses = []
+    parse_hosts = dns_client._parse_hosts_file
+    monkeypatch.setattr(dns_client, "_parse_hosts_file", lambda path: parses.append(path) or parse_hosts(path))
+
+    with tempfile.TemporaryDirectory() as root:
+        _system_files(monkeypatch, root, "10.1.2.3 api.example.test\n", "", "")
+        assert dns_client.hosts_file_lookup("api.example.test") == ["10.1.2.3"]
+        assert dns_client.hosts_file_lookup("other.example.test") == []
+        assert len(parses) == 1
+
+        with open(dns_client.HOSTS_PATH, "w") as f:
+            f.write("10.9.9.9 api.example.test other.example.test\n")
+        assert dns_client.hosts_file_lookup("other.example.test") == ["10.9.9.9"]
+        assert len(parses) == 2
@@ -0,0 +1,112 @@
+"""
+Tests for the incident similarity index and analysis reuse
+Run: python -m pytest test_incident_index.py
+"""
+
+import os
+import tempfile
+
+from incident_index import INCIDENT_REUSE_SIMILARITY, IncidentIndex, latency_profile
+
+
+def _healthy(latency):
+    return [{"test_name": name, "status": "PASS", "latency_ms": latency, "failure_reason": None}
+            for name in ("DNS_RESOLUTION", "TCP_CONNECTIVITY", "HTTP_STATUS", "LATENCY_CHECK")]
+
+
+def _dns_failure(reason="NXDOMAIN for gone.example"):
+    return [{"test_name": "DNS_RESOLUTION", "status": "FAIL", "latency_ms": 30, "failure_reason": reason},
+            {"test_name": "TCP_CONNECTIVITY", "status": "INFERRED_FAIL", "latency_ms": 0,
+             "failure_reason": "Inferred failure: DNS resolution failed"}]
+
+
+ANALYSIS = {"root_cause": "Target healthy", "confidence_percentage": 95, "category": "HEALTHY"}
+
+
+def _reuse(index, diagnostics):
+    return index.reusable(index.search(diagnostics), diagnostics)
+
+
+def test_confident_answers_are_not_reused_until_verified():
+    index = IncidentIndex(path="")
+    incident_id = index.add("fast.example", _healthy(20), ANALYSIS)
+
+    assert _reuse(index, _healthy(22)) is None
+    assert index.verify(incident_id)
+    assert _reuse(index, _healthy(22))["incident_id"] == incident_id
+
+
+def test_healthy_fast_and_healthy_slow_do_not_reuse_each_other():
+    index = IncidentIndex(path="")
+    fast_id = index.add("fast.example", _healthy(20), ANALYSIS, verified=True)
+    slow_id = index.add("slow.example", _healthy(800), dict(ANALYSIS, root_cause="Target slow"), verified=True)
+
+    fast_match = _reuse(index, _healthy(20))
+    slow_match = _reuse(index, _healthy(800))
+    assert fast_match["incident_id"] == fast_id
+    assert slow_match["incident_id"] == slow_id
+
+    # The latency feature alone keeps them below the reuse threshold
+    similarity = {n["incident_id"]: n["similarity"] for n in index.search(_healthy(20))}
+    assert similarity[slow_id] < INCIDENT_REUSE_SIMILARITY
+
+
+def test_same_bucket_is_required_even_above_the_similarity_threshold():
+    index = IncidentIndex(path="")
+    index.add("a.example", _healthy(45), ANALYSIS, verified=True)
+
+    neighbours = index.search(_healthy(55))
+    assert neighbours[0]["similarity"] >= INCIDENT_REUSE_SIMILARITY
+    assert latency_profile(_healthy(45)) != latency_profile(_healthy(55))
+    assert index.reusable(neighbours, _healthy(55)) is None
+
+
+def test_failures_rank_by_failure_class():
+    index = IncidentIndex(path="")
+    nxdomain_id = index.add("a.example", _dns_failure(), {"root_cause": "NXDOMAIN"})
+    index.add("b.example", _dns_failure("DNS resolution failed: SERVFAIL"), {"root_cause": "resolver error"})
+    index.add("c.example", _healthy(20), ANALYSIS)
+
+    neighbours = index.search(_dns_failure("NXDOMAIN for other.example"), k=3)
+    assert neighbours[0]["incident_id"] == nxdomain_id and neighbours[0]["similarity"] > 0.99
+    assert neighbours[-1]["target"] == "c.example"
+
+
+def test_capacity_drops_the_oldest_incident():
+    index = IncidentIndex(max_entries=2, path="")
+    index.add("first.example", _dns_failure(), {"root_cause": "first"})
+    index.add("second.example", _healthy(20), ANALYSIS)
+    index.add("third.example", _healthy(800), ANALYSIS)
+
+    assert {n["target"] for n in index.search(_healthy(20), k=5)} == {"second.example", "third.example"}
+
+
+def test_verified_incidents_persist_across_restarts():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "incidents.json")
+        index = IncidentIndex(path=path)
+        incident_id = index.add("a.example", _healthy(20), ANALYSIS, verified=True)
+        index.flush()
+
+        reloaded = IncidentIndex(path=path)
+        assert _reuse(reloaded, _healthy(20))["incident_id"] == incident_id
+        assert reloaded.stats()["verified"] == 1
+
+
+def test_ring_buffer_keeps_the_newest_incidents_in_order():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "incidents.json")
+        index = IncidentIndex(max_entries=3, path=path, flush_delay=60)
+        ids = [index.add(f"t{i}.example", _healthy(10 * (i + 1)), ANALYSIS, verified=True) for i in range(7)]
+
+        for i in (4, 5, 6):
+            match = _reuse(index, _healthy(10 * (i + 1)))
+            assert match is not None and match["target"] == f"t{i}.example"
+        assert {n["incident_id"] for n in index.search(_healthy(20), k=10)} == set(ids[4:])
+
+        assert index.stats()["writes"] == 0
+        index.flush()
+        reloaded = IncidentIndex(max_entries=3, path=path)
+        assert [entry["incident_id"] for entry in reloaded._entries] == ids[4:]
+        # Reloading into a smaller index keeps the newest
+        assert [entry["incident_id"] for entry in IncidentIndex(max_entries=2, path=path)._entries] == ids[5:]
@@ -0,0 +1,83 @@
+"""
+Tests for the streaming latency estimators
+Run: python -m pytest test_latency_stats.py
+"""
+
+import random
+import statistics
+
+from latency_stats import P2Quantile, StreamingStats
+
+
+def _sample(n: int = 5000, seed: int = 7):
+    rng = random.Random(seed)
+    return [rng.lognormvariate(3.0, 0.5) for _ in range(n)]
+
+
+def test_p2_quantiles_track_exact_percentiles():
+    data = _sample()
+    exact = statistics.quantiles(data, n=100, method="inclusive")
+
+    for q in (0.5, 0.9, 0.99):
+        estimator = P2Quantile(q)
+        for value in data:
+            estimator.add(value)
+        expected = exact[int(q * 100) - 1]
+        assert abs(estimator.value() - expected) / expected < 0.05, (q, estimator.value(), expected)
+
+
+def test_p2_quantile_is_exact_for_the_first_five_samples():
+    data = [40.0, 10.0, 30.0, 20.0]
+    estimator = P2Quantile(0.5)
+    for value in data:
+        estimator.add(value)
+    assert estimator.value() == statistics.quantiles(data, n=2, method="inclusive")[0] == 25.0
+
+
+def test_summary_matches_batch_statistics():
+    data = _sample(1000)
+    stats = StreamingStats()
+    for value in data:
+        stats.add(value)
+    summary = stats.summary()
+
+    assert summary["samples"] == 1000 and summary["loss_pct"] == 0.0
+    assert abs(summary["avg_ms"] - statistics.mean(data)) < 0.01
+    assert abs(summary["stddev_ms"] - statistics.stdev(data)) < 0.01
+    assert summary["min_ms"] == round(min(data), 2) and summary["max_ms"] == round(max(data), 2)
+    exact = statistics.quantiles(data, n=100, method="inclusive")
+    for key, expected in (("p50_ms", exact[49]), ("p90_ms", exact[89]), ("p99_ms", exact[98])):
+        assert abs(summary[key] - expected) / expected < 0.05, (key, summary[key], expected)
+
+
+def test_jitter_is_mean_difference_between_consecutive_samples():
+    stats = StreamingStats()
+    for value in (10.0, 20.0, 15.0, 30.0):
+        stats.add(value)
+    assert stats.summary()["jitter_ms"] == 10.0
+
+
+def test_jitter_follows_send_order_when_samples_complete_out_of_order():
+    sent = [10.0, 50.0, 12.0, 48.0, 11.0]
+    in_order = StreamingStats()
+    for value in sent:
+        in_order.add(value)
+
+    # Concurrent samples come back fastest first
+    completed = StreamingStats()
+    for seq in sorted(range(len(sent)), key=lambda i: sent[i]):
+        completed.add(sent[seq], seq=seq)
+
+    assert completed.summary()["jitter_ms"] == in_order.summary()["jitter_ms"] == 37.75
+
+
+def test_lost_samples_count_as_loss_and_are_skipped_by_jitter():
+    stats = StreamingStats()
+    stats.add(20.0, seq=2)
+    stats.add_loss(seq=1)
+    stats.add(10.0, seq=0)
+    stats.add(40.0, seq=3)
+    summary = stats.summary()
+
+    assert summary["samples_sent"] == 4 and summary["loss_pct"] == 25.0
+    assert summary["jitter_ms"] == 15.0
@@ -0,0 +1,115 @@
+"""
+Tests for the probe dependency graph scheduler
+Probes are stand-in coroutines, no network access required
+Run: python -m pytest test_probe_registry.py
+"""
+
+import asyncio
+import time
+
+from probe_registry import ProbeRegistry, run_probe_graph
+
+
+def _probe(name, status="PASS", delay=0.0, log=None):
+    async def run(engine):
+        if log is not None:
+            log.append(("start", name))
+        await asyncio.sleep(delay)
+        if log is not None:
+            log.append(("end", name))
+        return {"test_name": name, "status": status, "latency_ms": 0, "details": None, "failure_reason": None}
+
+    return run
+
+
+def test_results_follow_registration_order_and_dependencies_run_first():
+    log = []
+    registry = ProbeRegistry()
+    registry.register("DNS", _probe("DNS", delay=0.02, log=log))
+    registry.register("TCP", _probe("TCP", log=log), depends_on=("DNS",))
+    registry.register("HTTP", _probe("HTTP", log=log), depends_on=("TCP",))
+
+    results = asyncio.run(run_probe_graph(None, registry))
+
+    assert [r["test_name"] for r in results] == ["DNS", "TCP", "HTTP"]
+    assert log.index(("end", "DNS")) < log.index(("start", "TCP"))
+    assert log.index(("end", "TCP")) < log.index(("start", "HTTP"))
+
+
+def test_independent_branches_run_concurrently():
+    registry = ProbeRegistry()
+    registry.register("ROOT", _probe("ROOT"))
+    for name in ("A", "B", "C"):
+        registry.register(name, _probe(name, delay=0.1), depends_on=("ROOT",))
+
+    start = time.perf_counter()
+    asyncio.run(run_probe_graph(None, registry))
+    assert time.perf_counter() - start < 0.25
+
+
+def test_failure_propagates_the_root_cause_down_the_graph():
+    completed = []
+    registry = ProbeRegistry()
+    registry.register("DNS", _probe("DNS", status="FAIL"), failure_reason="DNS resolution failed")
+    registry.register("TCP", _probe("TCP"), depends_on=("DNS",), failure_reason="TCP connection failed")
+    registry.register("LATENCY_CHECK", _probe("LATENCY_CHECK"), depends_on=("TCP",), inferred_name="LATENCY")
+
+    results = asyncio.run(run_probe_graph(None, registry, on_result=completed.append))
+
+    assert [r["status"] for r in results] == ["FAIL", "INFERRED_FAIL", "INFERRED_FAIL"]
+    assert results[1]["failure_reason"] == "Inferred failure: DNS resolution failed"
+    assert results[2]["failure_reason"] == "Inferred failure: DNS resolution failed"
+    assert results[2]["test_name"] == "LATENCY"
+    assert len(completed) == 3
+
+
+def test_probe_exception_becomes_a_fail_result():
+    async def broken(engine):
+        raise RuntimeError("plug-in crashed")
+
+    registry = ProbeRegistry()
+    registry.register("BROKEN", broken)
+    registry.register("AFTER", _probe("AFTER"), depends_on=("BROKEN",), failure_reason="unused")
+
+    results = asyncio.run(run_probe_graph(None, registry))
+
+    assert results[0]["status"] == "FAIL" and results[0]["failure_reason"] == "plug-in crashed"
+    assert results[1]["failure_reason"] == "Inferred failure: BROKEN failed"
+
+
+def test_disabled_probe_is_skipped_and_its_dependants_still_run():
+    registry = ProbeRegistry()
+    registry.register("OPTIONAL", _probe("OPTIONAL", status="FAIL"), enabled=lambda engine: False)
+    registry.register("NEXT", _probe("NEXT"), depends_on=("OPTIONAL",))
+
+    results = asyncio.run(run_probe_graph(None, registry))
+    assert [(r["test_name"], r["status"]) for r in results] == [("NEXT", "PASS")]
+
+
+def test_registration_rejects_duplicates_and_unknown_dependencies():
+    registry = ProbeRegistry()
+    registry.register("A", _probe("A"))
+    # Dependencies must already exist, so a cycle can never be declared
+    for name, deps in (("A", ()), ("B", ("C",)), ("B", ("B",))):
+        try:
+            registry.register(name, _probe(name), depends_on=deps)
+            raise AssertionError(f"expected ValueError for {name} -> {deps}")
+        except ValueError:
+            pass
+    assert [p.name for p in registry.probes()] == ["A"]
+
+
+def test_unregister_refuses_while_dependants_exist():
+    registry = ProbeRegistry()
+    registry.register("A", _probe("A"))
+    registry.register("B", _probe("B"), depends_on=("A",))
+
+    try:
+        registry.unregister("A")
+        raise AssertionError("expected ValueError")
+    except ValueError as e:
+        assert "required by: B" in str(e)
+
+    registry.unregister("B")
+    registry.unregister("A")
+    assert registry.probes() == []
@@ -0,0 +1,52 @@
+"""
+Tests for the token-budgeted prompt encoding
+Run: python -m pytest test_prompt_encoder.py
+"""
+
+import json
+
+from prompt_encoder import encode_diagnostics, estimate_tokens, fit_to_budget
+
+
+def _diagnostics(count=4):
+    return [
+        {
+            "test_name": f"TEST_{i}",
+            "status": "FAIL" if i == 0 else "INFERRED_FAIL",
+            "latency_ms": 12.345 * (i + 1),
+            "failure_reason": "Connection refused by upstream " * 10,
+            "details": {"addresses": [f"10.0.0.{n}" for n in range(20)], "port": 443}
+        }
+        for i in range(count)
+    ]
+
+
+def test_generous_budget_keeps_details():
+    encoded = json.loads(encode_diagnostics(_diagnostics(), budget=5000))
+    assert encoded[0]["details"]["port"] == 443
+    assert encoded[0]["latency_ms"] == 12.3
+
+
+def test_small_budgets_always_produce_valid_json_within_budget():
+    for budget in (1, 5, 10, 20, 40, 80, 150):
+        text = encode_diagnostics(_diagnostics(), budget=budget)
+        encoded = json.loads(text)
+        assert isinstance(encoded, list)
+        assert estimate_tokens(text) <= budget, (budget, text)
+
+
+def test_tight_budget_keeps_the_first_tests_status():
+    encoded = json.loads(encode_diagnostics(_diagnostics(), budget=20))
+    assert encoded[0] == {"test": "TEST_0", "status": "FAIL"}
+    assert len(encoded) < 4
+
+
+def test_fit_to_budget_trims_json_structurally_and_cuts_plain_text():
+    text = json.dumps({"root_cause": "dns", "category": "DNS", "notes": ["a" * 50] * 5})
+    fitted = fit_to_budget(text, 15)
+    assert estimate_tokens(fitted) <= 15
+    assert json.loads(fitted) == {"root_cause": "dns", "category": "DNS"}
+
+    plain = fit_to_budget("word " * 100, 10)
+    assert len(plain) == 40 and plain.endswith("[truncated]")
+    assert fit_to_budget("short", 10) == "short"
@@ -0,0 +1,126 @@
+"""
+Tests for the shared Azure OpenAI rate limiter
+Uses a frozen clock so bucket refills cannot hide a leaked budget
+Run: python -m pytest test_rate_limiter.py
+"""
+
+import threading
+
+from rate_limiter import RateLimitExceeded, RateLimiter, TokenBucket
+
+
+class _FrozenClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class _Throttled(Exception):
+    status_code = 429
+
+
+class _Unavailable(Exception):
+    status_code = 503
+
+
+def test_slot_timeout_refunds_the_request_and_token_budget():
+    limiter = RateLimiter(rpm=10, tpm=1000, max_concurrency=1, max_wait=0.05, clock=_FrozenClock())
+    started, release = threading.Event(), threading.Event()
+
+    def busy():
+        started.set()
+        release.wait(5)
+
+    holder = threading.Thread(target=lambda: limiter.call(busy, 100))
+    holder.start()
+    started.wait(5)
+    try:
+        limiter.call(lambda: "never runs", 400)
+        raise AssertionError("expected RateLimitExceeded")
+    except RateLimitExceeded as e:
+        assert "concurrency limit" in str(e)
+    finally:
+        release.set()
+        holder.join(5)
+
+    # Only the call that actually ran keeps its reservation
+    assert limiter.requests.available == 9
+    assert limiter.tokens.available == 900
+    assert limiter.stats()["rejected"] == 1
+
+
+def test_budget_exhaustion_rejects_without_waiting_past_the_bound():
+    limiter = RateLimiter(rpm=2, tpm=1000, max_wait=5, clock=_FrozenClock())
+    limiter.call(lambda: None)
+    limiter.call(lambda: None)
+    try:
+        # The next request slot is 30s away on a frozen clock
+        limiter.call(lambda: None)
+        raise AssertionError("expected RateLimitExceeded")
+    except RateLimitExceeded:
+        pass
+    assert limiter.stats()["admitted"] == 2
+
+
+def test_settle_refunds_unused_tokens():
+    limiter = RateLimiter(tpm=1000, clock=_FrozenClock())
+    limiter.call(lambda: None, 600)
+    limiter.settle(600, 250)
+    assert limiter.tokens.available == 750
+
+
+def test_throttled_call_is_retried_after_retry_after():
+    # Real clock: the Retry-After pause has to elapse
+    limiter = RateLimiter(max_retries=2, max_wait=5)
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            error = _Throttled("429")
+            error.response = type("Response", (), {"headers": {"retry-after-ms": "10"}})()
+            raise error
+        return "ok"
+
+    assert limiter.call(flaky) == "ok"
+    stats = limiter.stats()
+    assert len(attempts) == 2 and stats["throttled"] == 1 and stats["retries"] == 1
+
+
+def test_token_bucket_refills_at_its_per_minute_rate():
+    bucket = TokenBucket(60, now=0.0)
+    bucket.take(60)
+    assert bucket.wait_time(1, now=0.0) == 1.0
+    assert bucket.wait_time(30, now=30.0) == 0.0
+
+
+def test_retries_and_failures_give_the_reservation_back():
+    limiter = RateLimiter(rpm=10, tpm=1000, max_retries=2, max_wait=5, clock=_FrozenClock())
+    attempts = []
+
+    def always_unavailable():
+        attempts.append(1)
+        error = _Unavailable("503")
+        # Zero Retry-After keeps the retries immediate on the frozen clock
+        error.response = type("Response", (), {"headers": {"retry-after-ms": "0"}})()
+        raise error
+
+    try:
+        limiter.call(always_unavailable, 400)
+        raise AssertionError("expected the last 503 to be raised")
+    except _Unavailable:
+        pass
+    assert len(attempts) == 3
+
+    try:
+        limiter.call(lambda: 1 / 0, 400)
+        raise AssertionError("expected ZeroDivisionError")
+    except ZeroDivisionError:
+        pass
+
+    assert limiter.tokens.available == 1000
+    assert limiter.requests.available == 10
+    # Still enough budget for a full-size call
+    limiter.call(lambda: None, 1000)
@@ -0,0 +1,170 @@
+"""
+Tests for report rendering and upload planning
+Uses the local filesystem stand-in store, no Azure account required
+Run: python -m pytest test_rca_generator.py
+"""
+
+import json
+import os
+import tempfile
+
+from rca_generator import DEFAULT_REPORT_FORMATS, REPORT_FORMATS, RCAGenerator, parse_report_formats
+from report_bundle import pack_bundle, unpack_bundle
+from report_storage import BlobReportStore, LocalReportStore
+
+DIAGNOSTICS = [
+    {"test_name": "DNS_RESOLUTION", "status": "PASS", "latency_ms": 12.5,
+     "details": {"ip_address": "10.0.0.1"}, "failure_reason": None},
+    {"test_name": "TCP_CONNECTIVITY", "status": "FAIL", "latency_ms": 3005.1,
+     "details": None, "failure_reason": "Port 443 is closed or unreachable"},
+    {"test_name": "HTTP_STATUS", "status": "INFERRED_FAIL", "latency_ms": 0,
+     "details": None, "failure_reason": "Inferred failure: TCP connection failed"},
+]
+ANALYSIS = {
+    "root_cause": "Firewall blocks port 443", "confidence_percentage": 85, "reasoning": "SYN timed out",
+    "evidence": ["TCP timeout"], "remediation_steps": ["Open 443"], "severity": "HIGH", "category": "FIREWALL",
+    "root_cause_category": "Network Issue", "responsibility_reason": "ACL", "responsible_team": "Network Operations"
+}
+CONTEXT = {"incident_start_time": "2026-10-17T08:00:00Z", "business_criticality": "High"}
+CHANGES = {"recent_firewall_change": True}
+
+
+class _FakeBlobService:
+    """Records staged blocks and single-shot uploads per blob, like the Azure client"""
+
+    def __init__(self):
+        self.staged = {}
+        self.committed = {}
+        self.single_puts = {}
+
+    def get_blob_client(self, container, blob):
+        return _FakeBlobClient(self, blob)
+
+
+class _FakeBlobClient:
+    def __init__(self, service, blob_name):
+        self.service = service
+        self.blob_name = blob_name
+        self.url = f"https://example.blob/{blob_name}"
+
+    def upload_blob(self, data, overwrite=False, content_settings=None):
+        self.service.single_puts[self.blob_name] = data
+
+    def stage_block(self, block_id, data, length=None):
+        self.service.staged.setdefault(self.blob_name, {})[block_id] = data
+
+    def commit_block_list(self, block_list, content_settings=None):
+        staged = self.service.staged[self.blob_name]
+        self.service.committed[self.blob_name] = b"".join(staged[block.id] for block in block_list)
+
+
+def _generator(store_dir=None) -> RCAGenerator:
+    generator = RCAGenerator()
+    generator.report_store = LocalReportStore(store_dir) if store_dir else None
+    return generator
+
+
+def test_rendered_slices_equal_each_streamed_report():
+    generator = _generator()
+    model = generator.build_report_model("api.example.com", DIAGNOSTICS, ANALYSIS, CONTEXT, CHANGES)
+    reports = generator.render_reports(model, REPORT_FORMATS)
+
+    assert list(reports) == list(REPORT_FORMATS)
+    for report_format, content in reports.items():
+        assert content == "".join(generator.iter_report(model, report_format)), report_format
+    assert json.loads(reports["json"]) == model["technical"]
+    assert reports["json"] == json.dumps(model["technical"], indent=2)
+    assert "Firewall blocks port 443" in reports["text"] and "Firewall blocks port 443" in reports["html"]
+
+
+def test_only_requested_formats_are_rendered():
+    generated = _generator().generate_reports("api.example.com", DIAGNOSTICS, ANALYSIS, formats="markdown,text")
+    assert list(generated["reports"]) == ["markdown", "text"]
+    assert generated["model"]["technical"]["root_cause_analysis"]["root_cause"] == "Firewall blocks port 443"
+
+
+def test_parse_report_formats():
+    assert parse_report_formats(None) == DEFAULT_REPORT_FORMATS
+    assert parse_report_formats(" HTML, json,html") == ("html", "json")
+    assert parse_report_formats(["text"]) == ("text",)
+    try:
+        parse_report_formats(["pdf"])
+        raise AssertionError("expected ValueError")
+    except ValueError as e:
+        assert "pdf" in str(e)
+
+
+def test_legacy_wrappers_render_single_formats():
+    generator = _generator()
+    text = generator.generate_report("api.example.com", DIAGNOSTICS, ANALYSIS, CONTEXT, CHANGES)
+    executive = generator.generate_executive_report("api.example.com", DIAGNOSTICS, ANALYSIS, CONTEXT, CHANGES)
+    technical = generator.generate_technical_report("api.example.com", DIAGNOSTICS, ANALYSIS, CONTEXT, CHANGES)
+
+    assert "Firewall blocks port 443" in text and "Firewall blocks port 443" in executive
+    assert technical["root_cause_analysis"]["root_cause"] == "Firewall blocks port 443"
+    assert generator.generate_json_report("api.example.com", DIAGNOSTICS, ANALYSIS)["category"] == "FIREWALL"
+
+
+def test_file_uploads_share_one_run_id_and_land_in_the_store():
+    with tempfile.TemporaryDirectory() as tmp:
+        generator = _generator(tmp)
+        reports = {"text": "plain report\n", "json": "{}"}
+        plan = generator.plan_report_uploads(reports, "api.example.com:443", storage_format="files")
+
+        assert [item["url_key"] for item in plan] == ["technical_text", "machine_readable_json"]
+        assert len({item["run_id"] for item in plan}) == 1
+        assert plan[0]["blob_name"].startswith("rca_api.example.com_443_")
+
+        for item in plan:
+            url = generator.upload_stream(item["blob_name"], item["chunks"](), item["content_type"])
+            assert url == item["url"]
+        assert sorted(os.listdir(tmp)) == sorted(item["blob_name"] for item in plan)
+
+
+def test_bundle_upload_round_trips():
+    with tempfile.TemporaryDirectory() as tmp:
+        generator = _generator(tmp)
+        reports = {"text": "plain report\n", "json": json.dumps({"a": 1})}
+        urls = generator.save_reports(reports, "api.example.com")
+
+        bundle = generator.read_report_bundle(urls["bundle"])
+        assert bundle["target"] == "api.example.com"
+        assert bundle["reports"] == {"text": "plain report\n", "json": {"a": 1}}
+
+
+def test_without_storage_nothing_is_uploaded():
+    generator = _generator()
+    assert generator.blob_url("rca_x.txt") is None
+    assert generator.save_to_blob("report", "api.example.com") is None
+
+
+def test_single_target_bundle_is_staged_from_the_model():
+    generator = _generator()
+    service = _FakeBlobService()
+    generator.report_store = BlobReportStore(service, "reports", block_size=256)
+    model = generator.build_report_model("api.example.com", DIAGNOSTICS, ANALYSIS, CONTEXT, CHANGES)
+    reports = generator.render_reports(model, REPORT_FORMATS)
+
+    [item] = generator.plan_report_uploads(reports, "api.example.com", storage_format="bundle", model=model)
+    for _ in range(2):
+        # Each call re-renders from the model, so a retry starts a fresh stream
+        generator.upload_stream(item["blob_name"], item["chunks"](), item["content_type"], item["content_encoding"])
+
+    assert service.single_puts == {}
+    assert len(service.staged[item["blob_name"]]) > 1
+    committed = service.committed[item["blob_name"]]
+    assert committed == pack_bundle(reports, "api.example.com", item["run_id"])
+    assert unpack_bundle(committed)["reports"]["json"] == model["technical"]
+
+
+def test_single_target_files_stream_each_format_from_the_model():
+    with tempfile.TemporaryDirectory() as tmp:
+        generator = _generator(tmp)
+        model = generator.build_report_model("api.example.com", DIAGNOSTICS, ANALYSIS, CONTEXT, CHANGES)
+        reports = generator.render_reports(model, ("text", "json"))
+        plan = generator.plan_report_uploads(reports, "api.example.com", storage_format="files", model=model)
+
+        for item in plan:
+            generator.upload_stream(item["blob_name"], item["chunks"](), item["content_type"])
+            with open(os.path.join(tmp, item["blob_name"]), encoding="utf-8") as f:
+                assert f.read() == reports[item["format"]]
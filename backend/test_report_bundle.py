@@ -0,0 +1,63 @@
+"""
+Tests for the compressed report bundle format and ULID run ids
+Run: python -m pytest test_report_bundle.py
+"""
+
+import gzip
+import json
+import time
+
+from report_bundle import _CROCKFORD, bundle_chunks, compress_chunks, new_ulid, pack_bundle, unpack_bundle
+
+
+def test_streamed_bundle_matches_one_shot_json():
+    reports = {"text": "Root Cause: \"x\"\n", "json": json.dumps({"a": [1, 2], "b": "ü"}, indent=2)}
+    streamed = b"".join(compress_chunks(bundle_chunks(reports, "t.com", "01RUN")))
+
+    expected = {"bundle_version": 1, "run_id": "01RUN", "target": "t.com", "formats": ["text", "json"],
+                "reports": {"text": reports["text"], "json": {"a": [1, 2], "b": "ü"}}}
+    assert json.loads(gzip.decompress(streamed)) == expected
+    assert streamed == pack_bundle(reports, "t.com", "01RUN")
+    assert unpack_bundle(streamed) == expected
+
+
+def test_chunked_reports_encode_like_the_rendered_strings():
+    reports = {"text": "Root Cause: \"x\"\n\tü\u2028", "json": json.dumps({"a": [1, 2], "b": "ü"}, indent=2)}
+    chunked = {"text": iter(["Root ", "Cause: \"", "x\"\n", "\tü\u2028"]), "json": {"a": [1, 2], "b": "ü"}}
+    assert "".join(bundle_chunks(chunked, "t.com", "01RUN")) == "".join(bundle_chunks(reports, "t.com", "01RUN"))
+
+
+def test_unpack_accepts_decoded_json_and_rejects_other_versions():
+    packed = pack_bundle({"markdown": "# RCA\n"}, "t.com", new_ulid())
+    plain = gzip.decompress(packed)
+    assert unpack_bundle(plain) == unpack_bundle(packed)
+
+    try:
+        unpack_bundle(json.dumps({"bundle_version": 99}).encode())
+        raise AssertionError("expected ValueError")
+    except ValueError as e:
+        assert "99" in str(e)
+
+
+def test_compressed_stream_is_a_standard_gzip_member():
+    chunks = [f"line {i}\n" for i in range(5000)]
+    compressed = b"".join(compress_chunks(chunks))
+    assert gzip.decompress(compressed) == "".join(chunks).encode()
+    assert len(compressed) < len("".join(chunks)) / 3
+
+
+def test_ulids_are_crockford_base32_and_sort_by_time():
+    first = new_ulid()
+    time.sleep(0.002)
+    later = [new_ulid() for _ in range(100)]
+
+    for ulid in [first] + later:
+        assert len(ulid) == 26 and set(ulid) <= set(_CROCKFORD)
+    assert all(first < ulid for ulid in later)
+    assert len(set(later)) == 100
+
+    # The first 10 characters encode the millisecond timestamp
+    millis = 0
+    for char in first[:10]:
+        millis = millis * 32 + _CROCKFORD.index(char)
+    assert abs(millis - time.time() * 1000) < 5000
@@ -0,0 +1,116 @@
+"""
+Tests for the local RCA history store
+Each test uses its own SQLite file in a temporary directory
+Run: python -m pytest test_report_history.py
+"""
+
+import os
+import tempfile
+
+import report_history
+from report_history import ReportHistory, get_report_history, parse_history_query, report_history_stats
+
+
+def _technical(target: str, generated_at: str, category: str = "DNS", severity: str = "HIGH") -> dict:
+    return {
+        "generated_at": generated_at,
+        "incident": {"target": target},
+        "diagnostics": {"tests_run": 4, "tests_failed": 1},
+        "root_cause_analysis": {"category": category, "severity": severity,
+                                "responsible_team": "Network Operations", "root_cause": "NXDOMAIN"}
+    }
+
+
+def _history(tmp: str) -> ReportHistory:
+    history = ReportHistory(os.path.join(tmp, "history.db"))
+    for day in range(1, 15):
+        history.record(_technical("a.com", f"2026-03-{day:02d}T12:00:00", "DNS" if day % 2 else "NETWORK"),
+                       {"bundle": f"https://example/rca_{day}.json.gz"})
+    history.record(_technical("b.com", "2026-03-10T12:00:00"))
+    return history
+
+
+def _history_path(monkeypatch, path: str, retry_seconds: float = 60):
+    """Start get_report_history() over with the database at path"""
+    monkeypatch.setattr(report_history, "REPORT_HISTORY_PATH", path)
+    monkeypatch.setattr(report_history, "REPORT_HISTORY_RETRY_SECONDS", retry_seconds)
+    monkeypatch.setattr(report_history, "_history", None)
+    monkeypatch.setattr(report_history, "_history_failed_at", None)
+
+
+def test_filters_are_indexed_columns_and_case_insensitive():
+    with tempfile.TemporaryDirectory() as tmp:
+        result = _history(tmp).query(filters={"target": "A.COM", "category": "dns"},
+                                     since="2026-03-07", until="2026-03-14T00:00:00Z")
+        assert [r["generated_at"][:10] for r in result["reports"]] == ["2026-03-13", "2026-03-11", "2026-03-09", "2026-03-07"]
+        assert result["reports"][0]["report_urls"] == {"bundle": "https://example/rca_13.json.gz"}
+        assert "technical" not in result["reports"][0]
+        assert result["next_cursor"] is None
+
+
+def test_cursor_pages_through_everything_once():
+    with tempfile.TemporaryDirectory() as tmp:
+        history = _history(tmp)
+        seen, cursor = [], None
+        while True:
+            page = history.query(limit=4, cursor=cursor)
+            seen.extend(r["report_id"] for r in page["reports"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        assert len(seen) == len(set(seen)) == 15
+
+
+def test_include_technical_returns_the_stored_report():
+    with tempfile.TemporaryDirectory() as tmp:
+        report = _history(tmp).query(filters={"target": "b.com"}, include_technical=True)["reports"][0]
+        assert report["technical"]["root_cause_analysis"]["root_cause"] == "NXDOMAIN"
+
+
+def test_invalid_parameters_raise_value_error():
+    with tempfile.TemporaryDirectory() as tmp:
+        history = _history(tmp)
+        queries = [parse_history_query(params) for params in ({"limit": "0"}, {"since": "last week"}, {"cursor": "garbage"})]
+        for query in queries + [{"filters": {"root_cause": "x"}}]:
+            try:
+                history.query(**query)
+                raise AssertionError(f"expected ValueError for {query}")
+            except ValueError:
+                pass
+
+
+def test_unwritable_path_leaves_the_history_unavailable(monkeypatch):
+    with tempfile.TemporaryDirectory() as tmp:
+        _history_path(monkeypatch, os.path.join(tmp, "missing", "history.db"))
+        assert get_report_history() is None
+        assert report_history_stats()["status"] == "unavailable"
+
+
+def test_failed_creation_is_retried_only_after_the_backoff(monkeypatch):
+    attempts = []
+    history_class = report_history.ReportHistory
+
+    def counting(path):
+        attempts.append(path)
+        return history_class(path)
+
+    monkeypatch.setattr(report_history, "ReportHistory", counting)
+    with tempfile.TemporaryDirectory() as tmp:
+        _history_path(monkeypatch, os.path.join(tmp, "later", "history.db"))
+        for _ in range(5):
+            assert get_report_history() is None
+        assert len(attempts) == 1
+
+        # Once the path is writable and the backoff has passed, the next call creates it
+        os.mkdir(os.path.join(tmp, "later"))
+        monkeypatch.setattr(report_history, "REPORT_HISTORY_RETRY_SECONDS", 0)
+        history = get_report_history()
+        assert history is not None and history is get_report_history()
+        assert len(attempts) == 2
+        assert history.record(_technical("a.com", "2026-03-01T12:00:00"))
+        assert report_history_stats()["recorded"] == 1
+
+
+def test_default_path_is_in_the_temp_dir():
+    if not os.getenv("REPORT_HISTORY_PATH"):
+        assert os.path.dirname(report_history.REPORT_HISTORY_PATH) == tempfile.gettempdir()
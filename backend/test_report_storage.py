@@ -0,0 +1,46 @@
+"""
+Tests for streamed report storage
+Uses the local filesystem stand-in backend, no Azure account required
+Run: python -m pytest test_report_storage.py
+"""
+
+from report_storage import LocalReportStore, iter_blocks
+
+
+def test_iter_blocks_recuts_chunks():
+    blocks = list(iter_blocks(["ab", b"cde", "", "fghij", "é"], block_size=4))
+    assert blocks == [b"abcd", b"efgh", b"ij\xc3\xa9"]
+    assert list(iter_blocks([], block_size=4)) == []
+
+
+def test_local_store_streams_in_blocks(tmp_path):
+    store = LocalReportStore(str(tmp_path), block_size=7)
+    url = store.write("rca_a.txt", (f"line {i}\n" for i in range(1000)), "text/plain")
+
+    assert url == (tmp_path / "rca_a.txt").as_uri()
+    assert store.read("rca_a.txt") == "".join(f"line {i}\n" for i in range(1000)).encode()
+    assert [p.name for p in tmp_path.iterdir()] == ["rca_a.txt"]
+
+
+def test_local_store_discards_partial_writes(tmp_path):
+    store = LocalReportStore(str(tmp_path))
+
+    def failing():
+        yield "partial"
+        raise RuntimeError("renderer failed")
+
+    try:
+        store.write("rca_b.txt", failing(), "text/plain")
+    except RuntimeError:
+        pass
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_local_store_rejects_paths(tmp_path):
+    store = LocalReportStore(str(tmp_path / "reports"))
+    try:
+        store.write("../escape.txt", ["x"], "text/plain")
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+
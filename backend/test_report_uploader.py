@@ -0,0 +1,94 @@
+"""
+Tests for the background report upload queue
+The generator is a stand-in that records uploads, no Azure account required
+Run: python -m pytest test_report_uploader.py
+"""
+
+import threading
+
+import report_uploader
+from report_uploader import ReportUploader
+
+
+class _FakeGenerator:
+    """Implements the part of RCAGenerator the uploader uses"""
+
+    def __init__(self, failures=0, block_on=None):
+        self.report_store = object()
+        self.failures = failures
+        self.block_on = block_on
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.uploads = []
+        self.threads = {}
+
+    def upload_stream(self, blob_name, chunks, content_type, content_encoding=None):
+        body = "".join(chunks)
+        if blob_name == self.block_on:
+            self.started.set()
+            self.release.wait(5)
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("storage unavailable")
+        self.uploads.append((blob_name, body))
+        self.threads[blob_name] = threading.current_thread().name
+        return f"memory://{blob_name}"
+
+
+def _item(name):
+    return {"url_key": name, "blob_name": name, "url": f"memory://{name}", "content_type": "text/plain",
+            "content_encoding": None, "chunks": lambda: iter(("report ", name))}
+
+
+def test_failed_upload_is_retried_with_a_fresh_stream(monkeypatch):
+    monkeypatch.setattr(report_uploader, "REPORT_UPLOAD_BACKOFF_SECONDS", 0.01)
+    uploader = ReportUploader(workers=1, max_attempts=3)
+    generator = _FakeGenerator(failures=2)
+    submitted = uploader.submit_plan(generator, [_item("a")])
+    assert submitted["report_urls"] == {"a": "memory://a"}
+    assert uploader.wait(timeout=5)
+
+    status = uploader.status(submitted["report_upload"]["upload_id"])
+    assert status["status"] == "complete" and status["uploads"]["a"]["attempts"] == 3
+    assert generator.uploads == [("a", "report a")]
+    assert uploader.stats()["retries"] == 2
+
+
+def test_upload_fails_after_the_last_attempt(monkeypatch):
+    monkeypatch.setattr(report_uploader, "REPORT_UPLOAD_BACKOFF_SECONDS", 0.01)
+    uploader = ReportUploader(workers=1, max_attempts=2)
+    submitted = uploader.submit_plan(_FakeGenerator(failures=3), [_item("a"), _item("b")])
+    assert uploader.wait(timeout=5)
+
+    status = uploader.status(submitted["report_upload"]["upload_id"])
+    assert status["uploads"]["a"]["status"] == "failed"
+    assert status["uploads"]["a"]["error"] == "storage unavailable"
+    # b fails once, then succeeds on its second attempt
+    assert status["uploads"]["b"]["status"] == "complete"
+    assert status["status"] == "failed"
+    assert uploader.stats()["failed"] == 1
+
+
+def test_full_queue_uploads_inline_instead_of_dropping():
+    uploader = ReportUploader(workers=1, queue_size=1)
+    generator = _FakeGenerator(block_on="a")
+
+    uploader.submit_plan(generator, [_item("a")])
+    assert generator.started.wait(5)
+    # The worker is busy with a: b fills the queue, c has to go inline
+    submitted = uploader.submit_plan(generator, [_item("b"), _item("c")])
+
+    assert generator.threads["c"] == threading.current_thread().name
+    assert uploader.stats()["inline_uploads"] == 1
+    generator.release.set()
+    assert uploader.wait(timeout=5)
+    assert uploader.status(submitted["report_upload"]["upload_id"])["status"] == "complete"
+    assert sorted(name for name, _ in generator.uploads) == ["a", "b", "c"]
+
+
+def test_without_storage_the_upload_is_skipped():
+    generator = _FakeGenerator()
+    generator.report_store = None
+    submitted = ReportUploader(workers=1).submit_plan(generator, [_item("a")])
+    assert submitted["report_upload"] == {"upload_id": None, "status": "skipped"}
+    assert generator.uploads == []
@@ -1,14 +1,25 @@
 import React, { useState } from 'react';
-import axios from 'axios';
 import './App.css';
 
 const API_URL = process.env.REACT_APP_API_URL || 'http://localhost:7071/api';
 
+// Parse one Server-Sent Events frame ("event: x\ndata: {...}")
+const parseSseFrame = (frame) => {
+    let event = 'message';
+    const data = [];
+    frame.split('\n').forEach((line) => {
+        if (line.startsWith('event:')) event = line.slice(6).trim();
+        else if (line.startsWith('data:')) data.push(line.slice(5).trim());
+    });
+    return { event, data: data.length ? JSON.parse(data.join('\n')) : null };
+};
+
 function App() {
     const [target, setTarget] = useState('');
     const [loading, setLoading] = useState(false);
     const [results, setResults] = useState(null);
     const [error, setError] = useState(null);
+    const [aiStream, setAiStream] = useState('');
 
     // ENTERPRISE FEATURE 1: Incident Context (OPTIONAL - for NOC teams)
     const [incidentStartTime, setIncidentStartTime] = useState('');
@@ -33,6 +44,7 @@ function App() {
         setLoading(true);
         setError(null);
         setResults(null);
+        setAiStream('');
 
         try {
             // Build request with enterprise context
@@ -58,16 +70,70 @@ function App() {
                 requestBody.recent_deployment = deployment;
             }
 
-            const response = await axios.post(`${API_URL}/diagnose`, requestBody);
-            setResults(response.data);
+            // Stream results: each test, the AI analysis and the reports render as they arrive
+            const response = await fetch(`${API_URL}/diagnose/stream`, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify(requestBody)
+            });
+
+            if (!response.ok) {
+                const body = await response.json().catch(() => ({}));
+                throw new Error(body.error || 'Failed to run diagnostics. Please try again.');
+            }
+
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+
+            while (true) {
+                const { value, done } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+
+                let boundary;
+                while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                    const frame = buffer.slice(0, boundary);
+                    buffer = buffer.slice(boundary + 2);
+                    if (frame.trim()) handleStreamEvent(parseSseFrame(frame));
+                }
+            }
         } catch (err) {
-            setError(err.response?.data?.error || 'Failed to run diagnostics. Please try again.');
+            setError(err.message || 'Failed to run diagnostics. Please try again.');
             console.error('Diagnostic error:', err);
         } finally {
             setLoading(false);
         }
     };
 
+    const handleStreamEvent = ({ event, data }) => {
+        switch (event) {
+            case 'start':
+                setResults({ ...data, diagnostics: [], ai_analysis: null });
+                break;
+            case 'diagnostic':
+                setResults((prev) => ({ ...prev, diagnostics: [...prev.diagnostics, data] }));
+                break;
+            case 'diagnostics':
+                // Final list in pipeline order replaces the completion-order list
+                setResults((prev) => ({ ...prev, diagnostics: data }));
+                break;
+            case 'ai_token':
+                setAiStream((prev) => prev + data.delta);
+                break;
+            case 'ai_analysis':
+                setResults((prev) => ({ ...prev, ai_analysis: data }));
+                break;
+            case 'reports':
+                setResults((prev) => ({ ...prev, ...data }));
+                break;
+            case 'error':
+                throw new Error(data.error);
+            default:
+                break;
+        }
+    };
+
     const downloadReport = (reportType) => {
         if (!results) return;
 
@@ -354,139 +420,153 @@ function App() {
                             </div>
                         </div>
 
-                        {/* AI Analysis with ENTERPRISE FEATURES */}
-                        <div className="ai-section card">
-                            <h2>🧠 AI Root Cause Analysis</h2>
-
-                            <div className="ai-summary">
-                                {/* Only show confidence badge */}
-                                <div className="confidence-meter">
-                                    {(() => {
-                                        const confidenceInfo = getConfidenceLevel(results.ai_analysis.confidence_percentage);
-                                        return (
-                                            <>
-                                                <div className="confidence-header">
-                                                    <span className="confidence-label">
-                                                        Confidence: {results.ai_analysis.confidence_percentage}%
-                                                    </span>
-                                                    <span className={`confidence-badge ${confidenceInfo.class}`}>
-                                                        {confidenceInfo.label}
-                                                    </span>
-                                                </div>
-                                                <div className="confidence-bar">
-                                                    <div
-                                                        className="confidence-fill"
-                                                        style={{ width: `${results.ai_analysis.confidence_percentage}%` }}
-                                                    ></div>
-                                                </div>
-                                            </>
-                                        );
-                                    })()}
+                        {/* AI Analysis streams in after the diagnostics */}
+                        {!results.ai_analysis && (
+                            <div className="ai-section card">
+                                <h2>🧠 AI Root Cause Analysis</h2>
+                                <div className="reasoning">
+                                    <p>{aiStream || (loading ? 'Waiting for diagnostics to finish...' : 'No analysis available')}</p>
                                 </div>
                             </div>
+                        )}
 
-                            <div className="root-cause">
-                                <h3>🎯 Root Cause</h3>
-                                <p className="root-cause-text">{results.ai_analysis.root_cause}</p>
-                            </div>
-
-                            {/* ENTERPRISE FEATURE 4: Responsibility Classification */}
-                            {results.ai_analysis.root_cause_category && (
-                                <div className="responsibility-section">
-                                    <h3>👥 Responsibility Assignment</h3>
-                                    <div className="responsibility-grid">
-                                        <div className="responsibility-item">
-                                            <span className="resp-label">Issue Category:</span>
-                                            <span className="resp-value category-badge">{results.ai_analysis.root_cause_category}</span>
-                                        </div>
-                                        <div className="responsibility-item">
-                                            <span className="resp-label">Responsible Team:</span>
-                                            <span className="resp-value team-badge">{results.ai_analysis.responsible_team}</span>
-                                        </div>
+                        {/* AI Analysis with ENTERPRISE FEATURES */}
+                        {results.ai_analysis && (
+                            <div className="ai-section card">
+                                <h2>🧠 AI Root Cause Analysis</h2>
+
+                                <div className="ai-summary">
+                                    {/* Only show confidence badge */}
+                                    <div className="confidence-meter">
+                                        {(() => {
+                                            const confidenceInfo = getConfidenceLevel(results.ai_analysis.confidence_percentage);
+                                            return (
+                                                <>
+                                                    <div className="confidence-header">
+                                                        <span className="confidence-label">
+                                                            Confidence: {results.ai_analysis.confidence_percentage}%
+                                                        </span>
+                                                        <span className={`confidence-badge ${confidenceInfo.class}`}>
+                                                            {confidenceInfo.label}
+                                                        </span>
+                                                    </div>
+                                                    <div className="confidence-bar">
+                                                        <div
+                                                            className="confidence-fill"
+                                                            style={{ width: `${results.ai_analysis.confidence_percentage}%` }}
+                                                        ></div>
+                                                    </div>
+                                                </>
+                                            );
+                                        })()}
                                     </div>
-                                    {results.ai_analysis.responsibility_reason && (
-                                        <div className="responsibility-reason">
-                                            <strong>Why this team?</strong> {results.ai_analysis.responsibility_reason}
-                                        </div>
-                                    )}
                                 </div>
-                            )}
 
-                            {/* ENTERPRISE FEATURE 2: Change Correlation */}
-                            {results.ai_analysis.change_correlation && (
-                                <div className="change-correlation">
-                                    <h3>🔗 Change Impact Analysis</h3>
-                                    <p className="correlation-text">{results.ai_analysis.change_correlation}</p>
+                                <div className="root-cause">
+                                    <h3>🎯 Root Cause</h3>
+                                    <p className="root-cause-text">{results.ai_analysis.root_cause}</p>
                                 </div>
-                            )}
 
-                            <div className="reasoning">
-                                <h3>💡 Detailed Analysis</h3>
-                                <p>{results.ai_analysis.reasoning}</p>
-                            </div>
+                                {/* ENTERPRISE FEATURE 4: Responsibility Classification */}
+                                {results.ai_analysis.root_cause_category && (
+                                    <div className="responsibility-section">
+                                        <h3>👥 Responsibility Assignment</h3>
+                                        <div className="responsibility-grid">
+                                            <div className="responsibility-item">
+                                                <span className="resp-label">Issue Category:</span>
+                                                <span className="resp-value category-badge">{results.ai_analysis.root_cause_category}</span>
+                                            </div>
+                                            <div className="responsibility-item">
+                                                <span className="resp-label">Responsible Team:</span>
+                                                <span className="resp-value team-badge">{results.ai_analysis.responsible_team}</span>
+                                            </div>
+                                        </div>
+                                        {results.ai_analysis.responsibility_reason && (
+                                            <div className="responsibility-reason">
+                                                <strong>Why this team?</strong> {results.ai_analysis.responsibility_reason}
+                                            </div>
+                                        )}
+                                    </div>
+                                )}
 
-                            {results.ai_analysis.evidence && results.ai_analysis.evidence.length > 0 && (
-                                <div className="evidence">
-                                    <h3>📋 Supporting Evidence</h3>
-                                    <ul>
-                                        {results.ai_analysis.evidence.map((item, index) => (
-                                            <li key={index}>{item}</li>
-                                        ))}
-                                    </ul>
-                                </div>
-                            )}
+                                {/* ENTERPRISE FEATURE 2: Change Correlation */}
+                                {results.ai_analysis.change_correlation && (
+                                    <div className="change-correlation">
+                                        <h3>🔗 Change Impact Analysis</h3>
+                                        <p className="correlation-text">{results.ai_analysis.change_correlation}</p>
+                                    </div>
+                                )}
 
-                            {results.ai_analysis.remediation_steps && results.ai_analysis.remediation_steps.length > 0 && (
-                                <div className="remediation">
-                                    <h3>🔧 Recommended Actions</h3>
-                                    <ol>
-                                        {results.ai_analysis.remediation_steps.map((step, index) => (
-                                            <li key={index}>{step}</li>
-                                        ))}
-                                    </ol>
+                                <div className="reasoning">
+                                    <h3>💡 Detailed Analysis</h3>
+                                    <p>{results.ai_analysis.reasoning}</p>
                                 </div>
-                            )}
-                        </div>
+
+                                {results.ai_analysis.evidence && results.ai_analysis.evidence.length > 0 && (
+                                    <div className="evidence">
+                                        <h3>📋 Supporting Evidence</h3>
+                                        <ul>
+                                            {results.ai_analysis.evidence.map((item, index) => (
+                                                <li key={index}>{item}</li>
+                                            ))}
+                                        </ul>
+                                    </div>
+                                )}
+
+                                {results.ai_analysis.remediation_steps && results.ai_analysis.remediation_steps.length > 0 && (
+                                    <div className="remediation">
+                                        <h3>🔧 Recommended Actions</h3>
+                                        <ol>
+                                            {results.ai_analysis.remediation_steps.map((step, index) => (
+                                                <li key={index}>{step}</li>
+                                            ))}
+                                        </ol>
+                                    </div>
+                                )}
+                            </div>
+                        )}
 
                         {/* ENTERPRISE FEATURE 3: Dual RCA Output - Download Options */}
-                        <div className="download-section card">
-                            <h2>📄 Download RCA Reports</h2>
-                            <p>Choose the report format that best suits your needs:</p>
-
-                            <div className="download-grid">
-                                {/* Technical Text Report */}
-                                <div className="download-option">
-                                    <div className="download-icon">📄</div>
-                                    <h3>Technical Report</h3>
-                                    <p>Detailed technical analysis for engineers and NOC teams</p>
-                                    <button className="download-button technical" onClick={() => downloadReport('technical')}>
-                                        ⬇️ Download Technical (.txt)
-                                    </button>
-                                </div>
+                        {results.rca_report && (
+                            <div className="download-section card">
+                                <h2>📄 Download RCA Reports</h2>
+                                <p>Choose the report format that best suits your needs:</p>
+
+                                <div className="download-grid">
+                                    {/* Technical Text Report */}
+                                    <div className="download-option">
+                                        <div className="download-icon">📄</div>
+                                        <h3>Technical Report</h3>
+                                        <p>Detailed technical analysis for engineers and NOC teams</p>
+                                        <button className="download-button technical" onClick={() => downloadReport('technical')}>
+                                            ⬇️ Download Technical (.txt)
+                                        </button>
+                                    </div>
 
-                                {/* Executive Summary */}
-                                <div className="download-option">
-                                    <div className="download-icon">👔</div>
-                                    <h3>Executive Summary</h3>
-                                    <p>Plain English summary for managers and stakeholders</p>
-                                    <button className="download-button executive" onClick={() => downloadReport('executive')}>
-                                        ⬇️ Download Executive (.txt)
-                                    </button>
-                                </div>
+                                    {/* Executive Summary */}
+                                    <div className="download-option">
+                                        <div className="download-icon">👔</div>
+                                        <h3>Executive Summary</h3>
+                                        <p>Plain English summary for managers and stakeholders</p>
+                                        <button className="download-button executive" onClick={() => downloadReport('executive')}>
+                                            ⬇️ Download Executive (.txt)
+                                        </button>
+                                    </div>
 
-                                {/* Technical JSON */}
-                                <div className="download-option">
-                                    <div className="download-icon">🤖</div>
-                                    <h3>Machine-Readable JSON</h3>
-                                    <p>Structured data for automation and integration</p>
-                                    <button className="download-button json" onClick={() => downloadReport('json')}>
-                                        ⬇️ Download JSON (.json)
-                                    </button>
+                                    {/* Technical JSON */}
+                                    <div className="download-option">
+                                        <div className="download-icon">🤖</div>
+                                        <h3>Machine-Readable JSON</h3>
+                                        <p>Structured data for automation and integration</p>
+                                        <button className="download-button json" onClick={() => downloadReport('json')}>
+                                            ⬇️ Download JSON (.json)
+                                        </button>
+                                    </div>
                                 </div>
-                            </div>
 
-                            {/* REMOVED: Blob Storage URLs (private) */}
-                        </div>
+                                {/* REMOVED: Blob Storage URLs (private) */}
+                            </div>
+                        )}
                     </>
                 )}
 